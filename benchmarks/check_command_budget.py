@@ -0,0 +1,160 @@
+"""
+Fails when a tool sends more WebDriver commands than its budget.
+
+Replays the tool calls of a recorded benchmark run through mock/replay_driver.py, without a
+browser, and compares the command count of each tool, and of each user_service step the
+tools ran (select_city, fetch_available_appointment_dates...), with
+benchmarks/command_budgets.json. A step's count is that of its most expensive run.
+Record the run once (and again whenever the pages or the flows change on purpose):
+
+    MHRS_DRIVER_RECORD_DIR=recordings python benchmarks/run_benchmarks.py --repeat 1
+    python benchmarks/check_command_budget.py recordings --update
+
+then in CI:
+
+    python benchmarks/check_command_budget.py recordings
+
+A command the recording does not have (a new round trip) fails the check as well. The
+replay keeps all of its state (catalog, locator health, learned timeouts...) in a temporary
+directory, so its counts do not depend on ~/.mhrs-mcp. tests/test_command_budget.py runs
+the check over a small recording kept in tests/fixtures.
+"""
+import argparse
+import glob
+import inspect
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "command_budgets.json")
+
+def isolate_environment(workdir):
+    """
+    Same settings as the recorded benchmark run, minus the recording itself, with every
+    state file in workdir. Must run before anything from core is imported.
+    """
+    os.environ.pop("MHRS_DRIVER_RECORD_DIR", None)
+    os.environ.update({
+        "MHRS_HTTP_BACKEND": "0",
+        "MHRS_DOCTORS_CACHE_TTL": "0", "MHRS_DATES_CACHE_TTL": "0", "MHRS_HOURS_CACHE_TTL": "0",
+        "MHRS_CATALOG_FILE": os.path.join(workdir, "catalog.json"),
+        "MHRS_SESSION_FILE": os.path.join(workdir, "session.bin"),
+        "MHRS_WATCH_FILE": os.path.join(workdir, "watches.json"),
+        "MHRS_METRICS_FILE": os.path.join(workdir, "metrics.json"),
+        "MHRS_SELECTOR_HEALTH_FILE": os.path.join(workdir, "selectors.json"),
+        "MHRS_TIMEOUTS_FILE": os.path.join(workdir, "timeouts.json"),
+        "MHRS_LOG_FILE": os.path.join(workdir, "mhrs.log"),
+    })
+
+def load_budgets(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        sys.exit(f"{path} does not exist; write it with --update from a recorded run")
+
+def budgeted_steps():
+    """The service steps with a budget of their own: the traced functions of user_service."""
+    from core.services import user_service
+    return {name for name, func in vars(user_service).items()
+            if inspect.isfunction(func) and func.__module__ == user_service.__name__ and hasattr(func, "__wrapped__")}
+
+def check(results, steps, budgets):
+    """
+    Returns {tool or step: (commands, budget, misses)} for every tool or step over its budget
+    and every tool with commands the recording lacks.
+    """
+    failures = {}
+    for tool, runs in results.items():
+        commands = max(count for count, _, _ in runs)
+        misses = [miss for _, run_misses, _ in runs for miss in run_misses]
+        budget = budgets.get(tool)
+        if misses or (budget is not None and commands > budget):
+            failures[tool] = (commands, budget, misses)
+    for step, commands in steps.items():
+        budget = budgets.get(step)
+        if budget is not None and commands > budget:
+            failures[step] = (commands, budget, [])
+    return failures
+
+def load_manifest(record_dir):
+    with open(os.path.join(record_dir, "calls.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def recorded_calls(record_dir):
+    from mock.replay_driver import load_calls
+    calls = []
+    for path in glob.glob(os.path.join(record_dir, "driver-*.jsonl")):
+        calls.extend(load_calls(path))
+    return sorted(calls, key=lambda c: c["at"])
+
+def replay(record_dir):
+    """
+    Replays every browser tool call of the manifest in order; returns
+    ({tool: [(commands, misses, ms)]}, {step: most commands of one run}).
+    """
+    from core import api
+    from core.clients.browser_pool import BrowserPool
+    from mock.replay_driver import replay_client, ReplayMiss
+
+    recorded = recorded_calls(record_dir)
+    used = set()
+    results = {}
+    steps = {}
+    budgeted = budgeted_steps()
+    for entry in load_manifest(record_dir):
+        match = next((c for c in recorded if c["call"] == entry["tool"] and id(c) not in used and entry["started"] <= c["at"] <= entry["ended"]), None)
+        if match is None:
+            continue  # answered without the browser
+        used.add(id(match))
+        client = replay_client(None, recorded_call=match)
+        started = time.perf_counter()
+        with BrowserPool().bind(client):
+            try:
+                getattr(api, entry["tool"]).__wrapped__(**entry["kwargs"])
+            except ReplayMiss:
+                pass  # recorded in misses below
+        elapsed = (time.perf_counter() - started) * 1000
+        results.setdefault(entry["tool"], []).append((client.driver.command_count, client.driver.misses, elapsed))
+        for step, commands in client.driver.step_commands.items():
+            if step in budgeted:
+                steps[step] = max(commands, steps.get(step, 0))
+    return results, steps
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the WebDriver commands per tool against their budget")
+    parser.add_argument("record_dir", help="directory written by run_benchmarks.py with MHRS_DRIVER_RECORD_DIR")
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS)
+    parser.add_argument("--update", action="store_true", help="write the current counts as the new budgets")
+    args = parser.parse_args()
+
+    isolate_environment(tempfile.mkdtemp(prefix="mhrs-budget-"))
+    results, steps = replay(args.record_dir)
+    counts = {tool: max(commands for commands, _, _ in runs) for tool, runs in results.items()}
+
+    if args.update:
+        with open(args.budgets, "w", encoding="utf-8") as f:
+            json.dump(dict(counts, **steps), f, indent=2, sort_keys=True)
+        print(f"wrote {len(counts) + len(steps)} budgets to {args.budgets}")
+        sys.exit(0)
+
+    budgets = load_budgets(args.budgets)
+    failures = check(results, steps, budgets)
+    print(f"{'tool':<44} {'commands':>9} {'budget':>7} {'replay ms':>10}")
+    for tool, runs in sorted(results.items()):
+        budget = budgets.get(tool)
+        over = budget is not None and counts[tool] > budget
+        mean_ms = sum(ms for _, _, ms in runs) / len(runs)
+        print(f"{tool:<44} {counts[tool]:>9} {budget if budget is not None else '-':>7} {mean_ms:>10.2f}{'  OVER BUDGET' if over else ''}")
+        for command, params in failures.get(tool, (0, 0, []))[2][:3]:
+            print(f"    not in the recording: {command} {params[:120]}")
+    for step, commands in sorted(steps.items()):
+        budget = budgets.get(step)
+        over = budget is not None and commands > budget
+        print(f"  {step:<42} {commands:>9} {budget if budget is not None else '-':>7} {'':>10}{'  OVER BUDGET' if over else ''}")
+    sys.exit(1 if failures else 0)
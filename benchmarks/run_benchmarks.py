@@ -0,0 +1,231 @@
+"""
+End-to-end benchmarks of the MCP tools against the local mock MHRS app.
+
+Starts mock/mhrs_spa_server.py in-process, points the server code at it and calls every tool
+the way the MCP client does (the async handlers in core/api.py), recording the wall-clock
+latency and the WebDriver commands of each call. Needs Firefox and geckodriver, but no MHRS
+account and no network.
+
+    python benchmarks/run_benchmarks.py --repeat 5 --latency 300 --output results.json
+
+Availability caches are disabled unless --warm-cache is given, so every repetition does the
+browser work again; the first login is reported separately as `startup`. With
+MHRS_DRIVER_RECORD_DIR set, the run is recorded for check_command_budget.py.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from mock.mhrs_spa_server import start_spa_server, parse_latencies, APP_PREFIX, FULL_CLINIC
+
+SEARCH = {"city": "İZMİR", "district": "URLA", "specialty": "DERMATOLOJİ (CİLDİYE)", "hospital": "URLA DEVLET HASTANESİ"}
+POLL_SECONDS = 0.2
+
+class CommandCounter:
+    """Counts the WebDriver commands sent by any driver of the process, by command name."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def install(self):
+        from selenium.webdriver.remote.webdriver import WebDriver
+        execute = WebDriver.execute
+        counter = self
+
+        def counting_execute(driver, driver_command, params=None):
+            with counter.lock:
+                counter.counts[driver_command] += 1
+            return execute(driver, driver_command, params)
+        WebDriver.execute = counting_execute
+
+    def snapshot(self):
+        with self.lock:
+            return Counter(self.counts)
+
+def configure_environment(args, base_url, workdir):
+    """Points the server modules at the mock; must run before anything from core is imported."""
+    env = {
+        "MHRS_BASE_URL": base_url,
+        "MHRS_USERNAME": "12345678901",
+        "MHRS_PASSWORD": "benchmark",
+        "MHRS_HTTP_BACKEND": "0",
+        "MHRS_BROWSER_POOL_SIZE": str(args.sessions),
+        "MHRS_WARM_UP_SESSIONS": "0",
+        "MHRS_SESSION_FILE": os.path.join(workdir, "session.bin"),
+        "MHRS_CATALOG_FILE": os.path.join(workdir, "catalog.json"),
+        "MHRS_WATCH_FILE": os.path.join(workdir, "watches.json"),
+        "MHRS_METRICS_FILE": os.path.join(workdir, "metrics.json"),
+        "MHRS_TIMEOUTS_FILE": os.path.join(workdir, "timeouts.json"),
+        "MHRS_LOG_FILE": os.path.join(workdir, "mhrs.log"),
+    }
+    if not args.warm_cache:
+        env.update({"MHRS_DOCTORS_CACHE_TTL": "0", "MHRS_DATES_CACHE_TTL": "0", "MHRS_HOURS_CACHE_TTL": "0"})
+    os.environ.update(env)
+
+def pick_targets(mhrs):
+    """The doctor, day and a free slot of the benchmark search, read from the mock's fixture."""
+    key = (SEARCH["city"], SEARCH["district"], SEARCH["specialty"], SEARCH["hospital"])
+    with mhrs.lock:
+        doctor = mhrs.doctors[mhrs.searches[key][0]]
+        day = next(day for day, clocks in doctor["slots"].items() if clocks)
+        return {"doctor_name": doctor["name"], "date": day, "time": doctor["slots"][day][-1]}
+
+def revertable_doctor(mhrs):
+    with mhrs.lock:
+        return next(a["doctor"] for a in mhrs.appointments if a["status"] == "Geri Alınabilir Randevu")
+
+async def call_tool(tool, **kwargs):
+    result = tool(**kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+async def until_status(list_tool, item_id, statuses, timeout):
+    """Polls a watch / hold listing until the item reaches one of statuses."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        listing = await call_tool(list_tool)
+        item = next((i for i in listing["data"] if i["id"] == item_id), None)
+        if item and item["status"] in statuses:
+            return item
+        await asyncio.sleep(POLL_SECONDS)
+    return {"status": "TIMEOUT"}
+
+def status_of(result):
+    if isinstance(result, dict):
+        status = result.get("status")
+        return getattr(status, "value", str(status))
+    return "OK" if result else str(result)
+
+def summarize(samples):
+    times = sorted(s["ms"] for s in samples)
+    commands = Counter()
+    for s in samples:
+        commands.update(s["commands"])
+    return {
+        "runs": len(samples),
+        "statuses": dict(Counter(s["status"] for s in samples)),
+        "p50_ms": round(statistics.median(times), 1),
+        "mean_ms": round(statistics.mean(times), 1),
+        "min_ms": round(times[0], 1),
+        "max_ms": round(times[-1], 1),
+        "commands_per_call": round(sum(commands.values()) / len(samples), 1),
+        "commands": {name: round(count / len(samples), 1) for name, count in commands.most_common()},
+    }
+
+async def run(args, server):
+    # imported only now: the modules read their settings from the environment at import time
+    from core import api
+    from core.services.watch_service import MIN_INTERVAL
+    from utils.tracing import tracer
+
+    counter = CommandCounter()
+    counter.install()
+    samples = {}
+    record_dir = os.getenv("MHRS_DRIVER_RECORD_DIR")
+
+    async def measure(name, tool, **kwargs):
+        before = counter.snapshot()
+        started_at = time.time()
+        started = time.perf_counter()
+        result = await call_tool(tool, **kwargs)
+        elapsed = (time.perf_counter() - started) * 1000
+        if record_dir and hasattr(tool, "__wrapped__"):
+            # lets check_command_budget.py replay the recorded browser tool calls
+            with open(os.path.join(record_dir, "calls.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"tool": tool.__name__, "kwargs": kwargs, "started": started_at, "ended": time.time()}, ensure_ascii=False) + "\n")
+        commands = counter.snapshot() - before
+        samples.setdefault(name, []).append({"ms": elapsed, "commands": dict(commands), "status": status_of(result)})
+        print(f"  {name:<48} {elapsed:>9.1f} ms {sum(commands.values()):>5} commands  {status_of(result)}")
+        return result
+
+    print("startup (Firefox + login)")
+    await measure("startup", api.get_active_appointments_tool)
+    startup = samples.pop("startup")[0]
+
+    full_search = dict(SEARCH, specialty=FULL_CLINIC)
+    for repetition in range(args.repeat):
+        print(f"repetition {repetition + 1}/{args.repeat}")
+        server.mhrs.reset_appointments()
+        target = pick_targets(server.mhrs)
+
+        await measure("get_active_appointments_tool", api.get_active_appointments_tool)
+        await measure("appointment_check_doctor_tool", api.appointment_check_doctor_tool, **SEARCH)
+        await measure("appointment_check_dates_tool", api.appointment_check_dates_tool, **SEARCH, doctor_name=target["doctor_name"])
+        await measure("appointment_check_hours_tool", api.appointment_check_hours_tool, **SEARCH, doctor_name=target["doctor_name"], date=target["date"])
+        await measure("appointment_check_full_availability_tool", api.appointment_check_full_availability_tool, **SEARCH, max_doctors=2, max_dates=2)
+        await measure("appointment_sweep_slots_tool", api.appointment_sweep_slots_tool, **SEARCH)
+        await measure("appointment_book_tool", api.appointment_book_tool, **SEARCH, **target)
+        await measure("cancel_appointment_tool", api.cancel_appointment_tool, appointment_identifier=target["doctor_name"])
+        await measure("revert_appointment_tool", api.revert_appointment_tool, appointment_identifier=revertable_doctor(server.mhrs))
+
+        await measure("appointment_check_doctor_tool[RND4030]", api.appointment_check_doctor_tool, **full_search)
+        await measure("get_modal_text_if_present_tool", api.get_modal_text_if_present_tool)
+        await measure("accept_notification_modal_tool", api.accept_notification_modal_tool)
+
+        # background features: timed from registration until the watch / hold reaches its outcome
+        watch = await call_tool(api.watch_register_tool, **SEARCH)
+        await measure("watch_register_tool[until matched]", until_status, list_tool=api.watch_list_tool, item_id=watch["id"],
+                      statuses=("MATCHED", "BOOKED"), timeout=MIN_INTERVAL * 4 + 60)
+        await call_tool(api.watch_cancel_tool, watch_id=watch["id"])
+        if args.sessions >= 2:
+            hold = await call_tool(api.strike_hold_tool, **SEARCH, **pick_targets(server.mhrs))
+            if status_of(hold) == "SUCCESS":
+                await measure("strike_hold_tool[until booked]", until_status, list_tool=api.strike_list_tool, item_id=hold["data"]["id"],
+                              statuses=("BOOKED", "FAILED", "EXPIRED"), timeout=120)
+                await call_tool(api.strike_release_tool, hold_id=hold["data"]["id"])
+
+        for tool in (api.watch_list_tool, api.strike_list_tool, api.scheduler_stats_tool, api.get_recent_traces_tool, api.get_step_metrics_tool):
+            await measure(tool.__name__, tool)
+
+    results = {name: summarize(runs) for name, runs in samples.items()}
+    api.browser_pool.close_all()
+    return {
+        "startup": {"ms": round(startup["ms"], 1), "commands": startup["commands"], "status": startup["status"]},
+        "tools": results,
+        "step_metrics": tracer.metrics()["steps"],
+        "mock_api_calls": dict(server.mhrs.calls),
+    }
+
+def print_table(report):
+    print()
+    print(f"{'tool':<48} {'p50 ms':>9} {'mean ms':>9} {'min ms':>9} {'commands':>9}")
+    for name, result in report["tools"].items():
+        print(f"{name:<48} {result['p50_ms']:>9} {result['mean_ms']:>9} {result['min_ms']:>9} {result['commands_per_call']:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the MCP tools end to end against the mock MHRS app")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions of the whole tool sequence")
+    parser.add_argument("--sessions", type=int, default=2, help="browser pool size (the strike benchmark needs 2)")
+    parser.add_argument("--latency", type=float, default=200, help="milliseconds the mock adds to every API call")
+    parser.add_argument("--jitter", type=float, default=50)
+    parser.add_argument("--action-latency", action="append", metavar="ACTION=MS", help="latency of one mock API action, e.g. search=1500")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--warm-cache", action="store_true", help="keep the availability caches enabled")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    server = start_spa_server(latency=args.latency, jitter=args.jitter, action_latency=parse_latencies(args.action_latency), seed=args.seed)
+    workdir = tempfile.mkdtemp(prefix="mhrs-benchmark-")
+    configure_environment(args, f"http://127.0.0.1:{server.server_port}{APP_PREFIX}/#/", workdir)
+    try:
+        report = asyncio.run(run(args, server))
+    finally:
+        server.shutdown()
+
+    report["config"] = {k: v for k, v in vars(args).items() if k != "output"}
+    print_table(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nwrote {args.output}")
@@ -1,11 +1,11 @@
 from mcp.server.fastmcp import FastMCP
+import asyncio
+import functools
 import sys
 import os
 
 # Add the project root to the path to fix imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.clients.auth_client import AuthClient
-
 from utils.appointment_status import AppointmentStatus
 from utils.selection_status import SelectionStatus
 
@@ -15,17 +15,73 @@ from core.services.appointment_service import (
     appointment_doctor_available_dates,
     appointment_available_hours_on,
     appointment_book_time,
+    query_available_doctors,
+    query_available_dates,
+    query_available_hours,
+    query_full_availability,
+    sweep_slot_matrix,
+    book_appointment,
     accept_notification_modal,
     get_modal_text_if_present,
 )
-from core.clients.browser_client import BrowserClient
-
-auth_client = AuthClient()
-browser = BrowserClient()
+from core.services.watch_service import WatchScheduler
+from core.services.strike_service import StrikeManager
+from core.clients.browser_pool import BrowserPool, TOOL_TIMEOUT
+from core.clients.session_monitor import CallCancelled
+from core.clients.event_waits import ClickError
+from core.clients.locators import LocatorRegistry, LocatorBroken
+from core.clients.adaptive_timeouts import TimeoutBook
+from utils.tracing import tracer
+from utils.log import logger
+from utils.status import Status
+
+browser_pool = BrowserPool()
+watch_scheduler = WatchScheduler()
+strike_manager = StrikeManager()
 
 mcp = FastMCP("mhrs")
 
+def with_browser_session(sticky=False, timeout=TOOL_TIMEOUT, when_busy=None):
+    """
+    Runs the tool on a logged-in browser session checked out from the pool.
+
+    The tool becomes an async handler: the blocking Selenium work runs on the pool's tool
+    executor, so one slow call does not hold up the others. A call still running after
+    `timeout` seconds is abandoned with Status.TIMEOUT and stopped at its next browser wait.
+
+    sticky=True asks for the session released most recently, for tools that act on a
+    modal left open by the previous call. A button that could not be clicked ends the call
+    with Status.FAILURE and the reason (see event_waits.ClickError), and so does a page
+    element whose locator is known to be broken (see locators.LocatorBroken).
+
+    With when_busy set the call never waits for a session: it runs on one that is idle right
+    now, or returns when_busy when every session is busy.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                # lazy: calls answered over HTTP never wait for a browser session
+                if when_busy is not None:
+                    result = await browser_pool.run_async(func, *args, sticky=sticky, timeout=timeout, idle_only=True, **kwargs)
+                    return when_busy if result is None else result
+                return await browser_pool.run_async(func, *args, sticky=sticky, lazy=True, timeout=timeout, **kwargs)
+            except asyncio.TimeoutError:
+                logger.warning("{} did not finish within {}s", func.__name__, timeout)
+                return {"status": Status.TIMEOUT, "message": f"The call did not finish within {timeout} seconds"}
+            except CallCancelled:
+                return {"status": Status.CANCELLED}
+            except ClickError as e:
+                logger.warning("{} stopped: {}", func.__name__, e)
+                return {"status": Status.FAILURE, "message": str(e), "reason": e.reason}
+            except LocatorBroken as e:
+                logger.warning("{} stopped: {}", func.__name__, e)
+                return {"status": Status.FAILURE, "message": str(e), "reason": "locator_broken"}
+        return wrapper
+    return decorator
+
 @mcp.tool()
+@with_browser_session()
 def cancel_appointment_tool(appointment_identifier):
     """
     Cancels an existing appointment that matches the given identifier string.
@@ -57,6 +113,7 @@ def cancel_appointment_tool(appointment_identifier):
     return cancel_appointment(appointment_identifier)
    
 @mcp.tool()
+@with_browser_session()
 def revert_appointment_tool(appointment_identifier):
     """
     Reverts a pending or recently modified appointment that matches the given identifier.
@@ -87,6 +144,7 @@ def revert_appointment_tool(appointment_identifier):
     return revert_appointment(appointment_identifier)
 
 @mcp.tool()
+@with_browser_session()
 def get_active_appointments_tool():
     """
     Fetches and returns a list of active appointments for the currently logged-in user from the MHRS system.
@@ -124,6 +182,7 @@ def get_active_appointments_tool():
     return get_active_appointments()
 
 @mcp.tool()
+@with_browser_session()
 def appointment_book_tool(city, district, specialty, hospital, doctor_name, date, time):
     """
     Books an appointment with a specific doctor at a given time and date.
@@ -161,22 +220,10 @@ def appointment_book_tool(city, district, specialty, hospital, doctor_name, date
         >>> print(result)
         {'status': Status.SUCCESS}
     """
-    response = appointment_doctor_available(city, district, specialty, hospital)
-    if not response["status"] == SelectionStatus.SUCCESS:
-        return response
-
-    if not appointment_doctor_available_dates(doctor_name):
-        return {"status": AppointmentStatus.NO_DOCTOR_AVAILABLE}   
-
-    if not appointment_available_hours_on(date):
-        return {"status": AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR}
-
-    if not appointment_book_time(time):
-        return {"status": AppointmentStatus.NO_AVAILABLE_HOURS_ON_DATE}
-
-    return {"status": AppointmentStatus.SUCCESS}
+    return book_appointment(city, district, specialty, hospital, doctor_name, date, time)
 
 @mcp.tool()
+@with_browser_session()
 def appointment_check_hours_tool(city, district, specialty, hospital, doctor_name, date):
     """
     Checks available appointment hours for a specific doctor on a given date.
@@ -214,20 +261,10 @@ def appointment_check_hours_tool(city, district, specialty, hospital, doctor_nam
             'data': ['09:00', '09:20', '09:40', '10:00']
         }
     """
-    response = appointment_doctor_available(city, district, specialty, hospital)
-    if not response["status"] == SelectionStatus.SUCCESS:
-        return response
-
-    if not appointment_doctor_available_dates(doctor_name):
-        return {"status": AppointmentStatus.NO_DATE_AVAILABLE}
-
-    available_hours = appointment_available_hours_on(date)
-    if not available_hours:
-        return {"status": AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR}
-    
-    return {"status": AppointmentStatus.SUCCESS, "data": available_hours}
+    return query_available_hours(city, district, specialty, hospital, doctor_name, date)
     
 @mcp.tool()
+@with_browser_session()
 def appointment_check_dates_tool(city, district, specialty, hospital, doctor_name):
     """
     Retrieves available appointment dates for a specific doctor.
@@ -262,17 +299,10 @@ def appointment_check_dates_tool(city, district, specialty, hospital, doctor_nam
             'data': ['09.05.2025', '10.05.2025', '11.05.2025']
         }
     """
-    response = appointment_doctor_available(city, district, specialty, hospital)
-    if not response["status"] == SelectionStatus.SUCCESS:
-        return response
-
-    available_dates = appointment_doctor_available_dates(doctor_name)
-    if not available_dates:
-        return {"status": AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR}
-   
-    return {"status": AppointmentStatus.SUCCESS, "data": available_dates}
+    return query_available_dates(city, district, specialty, hospital, doctor_name)
     
 @mcp.tool()
+@with_browser_session()
 def appointment_check_doctor_tool(city, district, specialty, hospital):
     """
     Checks for available doctors in a specified location and specialty.
@@ -306,11 +336,263 @@ def appointment_check_doctor_tool(city, district, specialty, hospital):
             'data': ['Dr. Eylem Yılmaz', 'Dr. Ali Kaya']
         }
     """
-    result = appointment_doctor_available(city, district, specialty, hospital)
+    result = query_available_doctors(city, district, specialty, hospital)
     
     return result
     
 @mcp.tool()
+@with_browser_session()
+def appointment_check_full_availability_tool(city, district, specialty, hospital, max_doctors=None, max_dates=None):
+    """
+    Lists available doctors together with their available dates and the time slots of each date.
+
+    This function runs the search once and walks doctor → dates → hours from the page it is
+    already on, instead of calling the doctor, dates and hours tools one after another.
+
+    Args:
+        city (str): City where the hospital is located (e.g., "İZMİR")
+        district (str): District where the hospital is located (e.g., "URLA")
+        specialty (str): Medical specialty (e.g., "CİLDİYE")
+        hospital (str): Name of the hospital (e.g., "URLA")
+        max_doctors (int, optional): Only check the first N doctors
+        max_dates (int, optional): Only check the first N dates of each doctor
+
+    Returns:
+        dict: A dictionary containing:
+            - 'status' (Status): Result of the search
+            - 'data' (list): One entry per doctor with a 'dates' list of {'date', 'hours'}
+
+    Example:
+        >>> result = appointment_check_full_availability_tool(
+        ...     city="İZMİR",
+        ...     district="URLA",
+        ...     specialty="CİLDİYE",
+        ...     hospital="URLA",
+        ...     max_doctors=2,
+        ...     max_dates=3
+        ... )
+        >>> print(result)
+        {
+            'status': Status.SUCCESS,
+            'data': [
+                {
+                    'doctor': 'Dr. Eylem Yılmaz',
+                    ...
+                    'dates': [
+                        {'date': '09.05.2025', 'hours': [{'main_hour': '15:00', 'sub_hours': [{'sub_hour': '15:40'}]}]}
+                    ]
+                }
+            ]
+        }
+    """
+    return query_full_availability(city, district, specialty, hospital, max_doctors, max_dates)
+
+@mcp.tool()
+@with_browser_session()
+def appointment_sweep_slots_tool(city, district, specialty, hospital, doctor_name=None):
+    """
+    Collects every available date and time slot of a doctor, or of all doctors of a hospital.
+
+    Use this to find the earliest slot that fits: it goes through all date tabs instead of one
+    date per call, and spreads the doctors over several browser sessions when available.
+
+    Args:
+        city (str): City where the hospital is located (e.g., "İZMİR")
+        district (str): District where the hospital is located (e.g., "URLA")
+        specialty (str): Medical specialty (e.g., "CİLDİYE")
+        hospital (str): Name of the hospital (e.g., "URLA")
+        doctor_name (str, optional): Doctor's name (e.g., "eylem"); all doctors when omitted
+
+    Returns:
+        dict: A dictionary containing:
+            - 'status' (Status): Result of the sweep
+            - 'data' (list): One entry per doctor with a 'dates' list of {'date', 'hours'}
+            - 'stats' (dict): elapsed_seconds, doctors, dates, slots and sessions used
+
+    Example:
+        >>> result = appointment_sweep_slots_tool(
+        ...     city="İZMİR",
+        ...     district="URLA",
+        ...     specialty="CİLDİYE",
+        ...     hospital="URLA"
+        ... )
+        >>> print(result["stats"])
+        {'sessions': 2, 'elapsed_seconds': 41.3, 'doctors': 3, 'dates': 9, 'slots': 57}
+    """
+    return sweep_slot_matrix(city, district, specialty, hospital, doctor_name)
+
+@mcp.tool()
+def watch_register_tool(city, district, specialty, hospital, doctor_name=None, date=None, time_from=None, time_to=None, auto_book=False):
+    """
+    Starts watching a search for freed-up slots, e.g. after Status.NOTIFY_WHEN_AVAILABLE.
+
+    The watch is checked in the background, more often right after availability changed and
+    around the times of day when cancelled slots are usually released. When a slot matching
+    the filters appears, the watch becomes MATCHED, or with auto_book=True the earliest
+    matching slot is booked right away (the watch is BOOKING meanwhile) and the watch
+    becomes BOOKED.
+
+    Args:
+        city (str): City where the hospital is located (e.g., "İZMİR")
+        district (str): District where the hospital is located (e.g., "URLA")
+        specialty (str): Medical specialty (e.g., "CİLDİYE")
+        hospital (str): Name of the hospital (e.g., "URLA")
+        doctor_name (str, optional): Only watch this doctor (e.g., "eylem")
+        date (str, optional): Only accept slots on this date (e.g., "09.05.2025")
+        time_from (str, optional): Earliest acceptable time (e.g., "09:00")
+        time_to (str, optional): Latest acceptable time (e.g., "12:00")
+        auto_book (bool): Book the first matching slot instead of only reporting it
+
+    Returns:
+        dict: The registered watch, including its 'id'
+
+    Example:
+        >>> result = watch_register_tool(
+        ...     city="İZMİR",
+        ...     district="URLA",
+        ...     specialty="CİLDİYE",
+        ...     hospital="URLA",
+        ...     doctor_name="eylem",
+        ...     auto_book=True
+        ... )
+        >>> print(result["id"], result["status"])
+        3f9a1c2e ACTIVE
+    """
+    return watch_scheduler.register(city, district, specialty, hospital, doctor_name, date, time_from, time_to, auto_book)
+
+@mcp.tool()
+def watch_list_tool():
+    """
+    Lists all watches with their status, number of checks, current interval, the matched slot
+    (if any) and their most recent events.
+    """
+    return {"status": Status.SUCCESS, "data": watch_scheduler.list()}
+
+@mcp.tool()
+def watch_cancel_tool(watch_id):
+    """
+    Stops a watch. A watch that is BOOKING its match cannot stop that booking; it reports
+    BOOKED if the booking went through.
+
+    Args:
+        watch_id (str): The 'id' returned by watch_register_tool or watch_list_tool
+
+    Returns:
+        dict: {'status': Status.SUCCESS, 'data': <the cancelled watch>} or {'status': Status.FAILURE}
+              when no watch has that id.
+    """
+    watch = watch_scheduler.cancel(watch_id)
+    if watch is None:
+        return {"status": Status.FAILURE}
+    return {"status": Status.SUCCESS, "data": watch}
+
+@mcp.tool()
+def strike_hold_tool(city, district, specialty, hospital, doctor_name, date, time, max_minutes=30):
+    """
+    Parks a dedicated browser session on a doctor's date page and books the given slot the
+    moment it shows up ("hold and strike").
+
+    Use this instead of appointment_book_tool for a contested slot, e.g. one expected to be
+    released at a known time: the session stays on the doctor's page and refreshes the day
+    every few seconds, so the booking needs no search funnel once the slot appears. The hold
+    occupies one browser session until it books, fails, expires or is released.
+
+    Args:
+        city (str): City where the hospital is located (e.g., "İZMİR")
+        district (str): District where the hospital is located (e.g., "URLA")
+        specialty (str): Medical specialty (e.g., "CİLDİYE")
+        hospital (str): Name of the hospital (e.g., "URLA")
+        doctor_name (str): Doctor's name (e.g., "eylem")
+        date (str): Appointment date (e.g., "09.05.2025")
+        time (str): Appointment time (e.g., "15:40")
+        max_minutes (float): Give up after this many minutes
+
+    Returns:
+        dict: {'status': Status.SUCCESS, 'data': <the hold, including its 'id'>} or
+              {'status': Status.FAILURE, 'message': ...} when no session can be spared.
+
+    Example:
+        >>> result = strike_hold_tool("İZMİR", "URLA", "CİLDİYE", "URLA", "eylem", "09.05.2025", "15:40")
+        >>> print(result["data"]["status"])
+        PARKING
+    """
+    return strike_manager.hold(city, district, specialty, hospital, doctor_name, date, time, max_minutes)
+
+@mcp.tool()
+def strike_list_tool():
+    """
+    Lists the holds with their status (PARKING, PARKED, BOOKED, FAILED, EXPIRED, RELEASED),
+    their last probe and strike, plus latency figures of the recent strikes.
+    """
+    return {"status": Status.SUCCESS, "data": strike_manager.list(), "latency": strike_manager.latency()}
+
+@mcp.tool()
+def strike_release_tool(hold_id):
+    """
+    Stops a hold and returns its browser session to the pool.
+
+    Args:
+        hold_id (str): The 'id' returned by strike_hold_tool or strike_list_tool
+    """
+    hold = strike_manager.release(hold_id)
+    if hold is None:
+        return {"status": Status.FAILURE}
+    return {"status": Status.SUCCESS, "data": hold}
+
+@mcp.tool()
+def scheduler_stats_tool():
+    """
+    Shows how tool calls are waiting for browser sessions: per job class (booking, query,
+    background) the queued and running calls, the concurrency limit, completed calls and the
+    average / p95 / max seconds waited for a session.
+    """
+    return {"status": Status.SUCCESS, "data": browser_pool.scheduler_stats()}
+
+@mcp.tool()
+def get_recent_traces_tool(limit=10):
+    """
+    Returns the most recent tool call traces, newest first, to see where a slow call spent
+    its time.
+
+    Each trace is a tree of spans: the tool call, the service steps under it (select_city,
+    fetch_all_available_doctor_names, ...) and the browser waits and clicks under those, each
+    with its duration in ms, status ('ok', 'error' or 'timeout') and counters such as retries.
+
+    Args:
+        limit (int): Number of traces to return (default 10)
+    """
+    return {"status": Status.SUCCESS, "data": tracer.recent_traces(limit)}
+
+@mcp.tool()
+def get_step_metrics_tool():
+    """
+    Returns latency metrics per step since the server started: call count, p50/p95/p99/max
+    duration in ms, error, timeout and retry counts, and for steps that waited on the page
+    the total ms spent waiting on the network (network_ms) vs rendering (render_ms). The same
+    data is written periodically to the metrics file (MHRS_METRICS_FILE).
+    """
+    return {"status": Status.SUCCESS, "data": tracer.metrics()}
+
+@mcp.tool()
+def get_selector_health_tool():
+    """
+    Returns the health of every page locator used so far: the strategy (primary selector or
+    a fallback) that matched last, hits per strategy, misses, and since when a locator is
+    considered broken. A fallback in use or a broken locator means the MHRS pages changed.
+    """
+    return {"status": Status.SUCCESS, "data": LocatorRegistry().health()}
+
+@mcp.tool()
+def get_wait_timeouts_tool():
+    """
+    Returns the browser waits by step and condition (e.g. "select_city/settle") with how many
+    durations were observed, their p50 / p99, how often the wait timed out and the timeout
+    currently learned from them (null while a wait still uses its default).
+    """
+    return {"status": Status.SUCCESS, "data": TimeoutBook().snapshot()}
+
+@mcp.tool()
+@with_browser_session(sticky=True, timeout=60)
 def accept_notification_modal_tool():
     """
     Accepts the notification modal that appears when an appointment is not available.
@@ -320,9 +602,13 @@ def accept_notification_modal_tool():
     return accept_notification_modal()
 
 @mcp.tool()
+@with_browser_session(sticky=True, timeout=30, when_busy={"status": Status.FAILURE, "message": "No modal: every browser session is busy with another call"})
 def get_modal_text_if_present_tool():
     """
     Checks if a pop-up message (modal) is present on the page and returns the text if present.
+
+    Looks at the session the previous call used, or another idle one, without waiting: while
+    every session is busy it answers that there is no modal.
     """
     return get_modal_text_if_present()
 
@@ -330,7 +616,9 @@ if __name__ == "__main__":
     """
     Runs the MCP server for handling appointment-related requests.
     """
-    print("MHRS appointment server is running...")
+    logger.info("MHRS appointment server is running...")
+    browser_pool.warm_up()  # log in while the stdio transport is already serving
+    watch_scheduler.start()
     mcp.run(transport='stdio')
     #browser.wait_warping()
     #print(cancel_appointment_tool("eylem")) #works
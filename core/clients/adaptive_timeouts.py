@@ -0,0 +1,188 @@
+from collections import deque
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from utils.tracing import tracer, percentile, TIMEOUT_ERRORS
+from utils.log import logger
+
+load_dotenv()
+
+TIMEOUTS_FILE = os.path.expanduser(os.getenv("MHRS_TIMEOUTS_FILE", "~/.mhrs-mcp/timeouts.json"))
+ADAPTIVE_TIMEOUTS = os.getenv("MHRS_ADAPTIVE_TIMEOUTS", "1") != "0"
+# A learned timeout is p99 of the recent durations times FACTOR, kept within FLOOR / CEILING
+TIMEOUT_FACTOR = float(os.getenv("MHRS_TIMEOUT_FACTOR", "3"))
+TIMEOUT_FLOOR = float(os.getenv("MHRS_TIMEOUT_FLOOR", "3"))
+TIMEOUT_CEILING = float(os.getenv("MHRS_TIMEOUT_CEILING", "60"))
+# Durations seen before a wait stops using its default timeout
+MIN_SAMPLES = int(os.getenv("MHRS_TIMEOUT_MIN_SAMPLES", "20"))
+# Each timeout in a row multiplies a learned timeout by this, up to the wait's default
+TIMEOUT_BACKOFF = float(os.getenv("MHRS_TIMEOUT_BACKOFF", "1.5"))
+# Fixed timeouts per tool, e.g. {"appointment_sweep_slots_tool": 90} or, per wait condition,
+# {"appointment_book_tool": {"settle": 45}}; "*" applies to every tool
+TIMEOUT_OVERRIDES = json.loads(os.getenv("MHRS_TIMEOUT_OVERRIDES", "{}"))
+SAMPLES_PER_WAIT = 200
+SAVE_INTERVAL = 30
+
+def _context():
+    """(tool, step) of the current span: the root span's name and the innermost non-browser span's."""
+    span = tracer.current()
+    step = None
+    while span is not None:
+        if step is None and not span.name.startswith("browser."):
+            step = span.name
+        if span.parent is None:
+            return span.name, step
+        span = span.parent
+    return None, None
+
+def _override(tool, condition):
+    for key in (tool, "*"):
+        value = TIMEOUT_OVERRIDES.get(key)
+        if isinstance(value, dict):
+            value = value.get(condition)
+        if value is not None:
+            return float(value)
+    return None
+
+class TimeoutBook:
+    """
+    Timeouts of the browser waits learned from how long they took before, per service step
+    and wait condition (e.g. "select_city/settle", "accept_appointment/click:modal.footer_second_button").
+
+    Until a wait has MIN_SAMPLES durations it keeps its default timeout; after that it gets
+    p99 x TIMEOUT_FACTOR within [TIMEOUT_FLOOR, TIMEOUT_CEILING], so a hung step fails in a
+    few seconds and a slow one is given more than the default. Timeouts are not durations:
+    they are counted apart, and each one in a row stretches the learned timeout by
+    TIMEOUT_BACKOFF, never past the default, so a step that keeps hanging costs no more
+    than it did with fixed timeouts. Both are written to TIMEOUTS_FILE and loaded on start;
+    TIMEOUT_OVERRIDES pin timeouts per tool.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TimeoutBook, cls).__new__(cls)
+            cls._instance.path = TIMEOUTS_FILE
+            cls._instance.lock = threading.Lock()
+            state = cls._instance._load()
+            cls._instance.samples = {key: deque(values, maxlen=SAMPLES_PER_WAIT) for key, values in state.get("samples", {}).items()}
+            # key -> {"total": timeouts seen, "in_a_row": timeouts since the last completed wait}
+            cls._instance.timeouts = state.get("timeouts", {})
+            cls._instance.last_save = time.monotonic()
+        return cls._instance
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            if not isinstance(state, dict):
+                raise ValueError("not a JSON object")
+            return state if "samples" in state else {"samples": state}  # durations only, as first written
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning("Ignoring unreadable timeouts file: {}", e)
+            return {}
+
+    def save(self):
+        with self.lock:
+            data = {"samples": {key: list(values) for key, values in self.samples.items()}, "timeouts": {key: dict(counts) for key, counts in self.timeouts.items()}}
+            self.last_save = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write timeouts file: {}", e)
+
+    def learned(self, key, default=None):
+        """
+        The learned timeout of a wait, or None while it has too few durations. With the
+        wait's default given, timeouts in a row stretch it towards that default.
+        """
+        with self.lock:
+            samples = self.samples.get(key)
+            if not samples or len(samples) < MIN_SAMPLES:
+                return None
+            p99 = percentile(sorted(samples), 0.99)
+            in_a_row = self.timeouts.get(key, {}).get("in_a_row", 0)
+        limit = min(TIMEOUT_CEILING, max(TIMEOUT_FLOOR, p99 * TIMEOUT_FACTOR))
+        if in_a_row and default is not None:
+            limit = min(max(limit, default), limit * TIMEOUT_BACKOFF ** in_a_row)
+        return limit
+
+    def observe(self, key, seconds):
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=SAMPLES_PER_WAIT)).append(round(seconds, 3))
+            if key in self.timeouts:
+                self.timeouts[key]["in_a_row"] = 0
+        self._save_soon()
+
+    def timed_out(self, key):
+        with self.lock:
+            counts = self.timeouts.setdefault(key, {"total": 0, "in_a_row": 0})
+            counts["total"] += 1
+            counts["in_a_row"] += 1
+        self._save_soon()
+
+    def _save_soon(self):
+        with self.lock:
+            save = time.monotonic() - self.last_save > SAVE_INTERVAL
+        if save:
+            self.save()
+
+    @contextmanager
+    def limit(self, condition, default, timeout=None):
+        """
+        Yields the timeout for a wait: an override of the current tool, else the caller's
+        explicit timeout, else the learned one, else default. Records how long the wait took.
+        """
+        tool, step = _context()
+        key = f"{step or '-'}/{condition}"
+        override = _override(tool, condition)
+        if override is not None:
+            limit = override
+        elif timeout is not None:
+            limit = timeout
+        else:
+            limit = (self.learned(key, default) if ADAPTIVE_TIMEOUTS else None) or default
+        started = time.monotonic()
+        try:
+            yield limit
+        except BaseException as e:
+            if type(e).__name__ in TIMEOUT_ERRORS:
+                self.timed_out(key)
+                if limit < default:
+                    logger.warning("{} timed out after its learned {:.1f}s", key, limit)
+            raise
+        else:
+            self.observe(key, time.monotonic() - started)
+
+    def snapshot(self):
+        """
+        Per wait: durations seen, p50 / p99 in ms, timeouts (in total and in a row) and the
+        learned timeout before any stretching for timeouts.
+        """
+        with self.lock:
+            keys = list(self.samples)
+            stats = {}
+            for key in keys:
+                values = sorted(self.samples[key])
+                stats[key] = {
+                    "samples": len(values),
+                    "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                    "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                    "timeouts": self.timeouts.get(key, {}).get("total", 0),
+                    "timeouts_in_a_row": self.timeouts.get(key, {}).get("in_a_row", 0),
+                }
+        for key in keys:
+            stats[key]["timeout_s"] = self.learned(key)
+        return stats
+
+timeout_book = TimeoutBook()
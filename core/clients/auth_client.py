@@ -2,21 +2,35 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 import os
 import sys
+import time
 from dotenv import load_dotenv
 
 # Add the project root to the path to fix imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.clients.browser_client import BrowserClient
+from core.clients.session_store import SessionStore
+from core.clients.browser_client import HOME_PAGE, MHRS_URL
+from core.clients.http_client import HttpMhrsClient
+from core.clients.locators import selector_list
+from core.clients.event_waits import ClickTimeout
+from utils.tracing import traced
+from utils.log import logger
 
 # Load environment variables
 load_dotenv()
 
 # URL and credentials
-url = "https://mhrs.gov.tr/vatandas/#/"
+url = MHRS_URL
 username = os.getenv("MHRS_USERNAME")
 password = os.getenv("MHRS_PASSWORD")
 
-browser = BrowserClient()
+# MHRS drops idle tokens after a while; sessions older than TTL - margin are renewed on checkout
+SESSION_TTL = float(os.getenv("MHRS_SESSION_TTL", "1800"))
+SESSION_REFRESH_MARGIN = float(os.getenv("MHRS_SESSION_REFRESH_MARGIN", "120"))
+# Seconds the "neyim var" modal MHRS shows after some logins gets to appear
+NEYIM_VAR_TIMEOUT = 5
+
+session_store = SessionStore()
+http_client = HttpMhrsClient()
 
 class AuthClient:
     _instance = None
@@ -24,39 +38,98 @@ class AuthClient:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(AuthClient, cls).__new__(cls)
-            cls._instance.is_logged_in = False
         return cls._instance
     
-    def login(self):
+    # Login state lives on each BrowserClient session, not on the process
+    @traced("auth.login")
+    def login(self, browser):
         try:
             browser.initialize_driver()  # Initialize the driver and wait
 
-            print("entering username")
-            username_input = browser.wait.until(EC.presence_of_element_located((By.ID, "LoginForm_username")))
+            logger.debug("entering username")
+            username_input = browser.find("login.username")
             username_input.send_keys(username)
-            print("entered password")
+            logger.debug("entered password")
 
-            print("entering password")
-            password_input = browser.wait.until(EC.presence_of_element_located((By.ID, "LoginForm_password")))
+            logger.debug("entering password")
+            password_input = browser.find("login.password")
             password_input.send_keys(password)
-            print("entered password")
-            # Wait until spinner is gone
-            browser.wait_loading_screen()
+            logger.debug("entered password")
 
-
-            # Now click the login button
-            print("clicking login button")
-            browser.click_button(".ant-btn.ant-btn-teal.ant-btn-block") #login button selector
-            print("clicked login button")
-            browser.wait_loading_screen() # wait until loggin in
-            print("waiting for login")
-            browser.click_button(".ant-modal-confirm-btns > button:nth-child(1)") #neyim var button
-            print("clicked neyim var button")
-            self.is_logged_in = True
+            # Now click the login button; click_button waits out the spinner before and after
+            logger.debug("clicking login button")
+            browser.click_button("login.submit") #login button selector
+            logger.debug("clicked login button")
+            try:
+                browser.click_button("modal.confirm_first_button", timeout=NEYIM_VAR_TIMEOUT, required=False) #neyim var button
+                logger.debug("clicked neyim var button")
+            except ClickTimeout as e:
+                # not every login shows it; the credentials were accepted either way
+                logger.debug("no neyim var modal to close ({})", e.reason)
+            browser.mark_logged_in()
+            browser.reset_nav_state(HOME_PAGE)
+            session_store.save(browser.driver)
+            http_client.set_token_from_driver(browser.driver)
             return "Login is successful"
         except Exception as e:
+            logger.warning("Login failed: {}", e)
             return f"Error: {e}"
 
-    def check_login(self):
-        if not self.is_logged_in:
-            self.login() 
\ No newline at end of file
+    @traced("auth.restore_session")
+    def restore_session(self, browser):
+        try:
+            browser.initialize_driver()
+            # a session that would be renewed on its next checkout anyway is not worth restoring
+            logged_in_at = session_store.restore(browser.driver, max_login_age=SESSION_TTL - SESSION_REFRESH_MARGIN)
+            if logged_in_at is None:
+                return False
+
+            # One cheap check: the SPA either shows the login form or the logged-in landing cards
+            browser.wait_loading_screen()
+            browser.locate(f"{selector_list('login.username')}, {selector_list('home.cards')}")
+            if browser.find("login.username", required=False) is not None:
+                logger.info("saved session was rejected, logging in again")
+                session_store.clear()
+                browser.driver.delete_all_cookies()
+                browser.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+                return False
+
+            for button in browser.find_all("modal.confirm_first_button", required=False):
+                button.click()  # neyim var button
+            # keep the original login time so the proactive refresh runs when MHRS expects it
+            browser.mark_logged_in(time.monotonic() - (time.time() - logged_in_at))
+            browser.reset_nav_state(HOME_PAGE)
+            http_client.set_token_from_driver(browser.driver)
+            logger.info("restored saved session")
+            return True
+        except Exception as e:
+            logger.warning("Could not restore saved session: {}", e)
+            return False
+
+    @traced("auth.relogin")
+    def relogin(self, browser):
+        """Drops the dead session's cookies and token, then logs in from scratch."""
+        logger.info("re-authenticating browser session")
+        browser.is_logged_in = False
+        browser.session_expired = False
+        browser.reset_nav_state()
+        session_store.clear()
+        try:
+            browser.driver.delete_all_cookies()
+            browser.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            browser.driver.get(url)
+        except Exception as e:
+            logger.warning("Could not reset browser session, starting a new driver: {}", e)
+            browser.quit()
+        return self.login(browser)
+
+    def needs_refresh(self, browser):
+        if not browser.is_logged_in or browser.logged_in_at is None:
+            return False
+        return time.monotonic() - browser.logged_in_at >= SESSION_TTL - SESSION_REFRESH_MARGIN
+
+    def check_login(self, browser):
+        if browser.session_expired or self.needs_refresh(browser):
+            self.relogin(browser)
+        elif not browser.is_logged_in and not self.restore_session(browser):
+            self.login(browser) 
\ No newline at end of file
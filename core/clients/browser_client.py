@@ -1,49 +1,214 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 import time
 import os
+import sys
+from dotenv import load_dotenv
+
+# Add the project root to the path to fix imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.clients.session_monitor import SessionAwareWait, CallCancelled, detect_logout
+from core.clients.driver_recorder import start_recording
+from core.clients.event_waits import click_when_ready, wait_until_settled, ClickTimeout
+from core.clients.locators import LocatorRegistry, LocatorBroken, PROBE_SCRIPT, ANCHORS
+from core.clients.adaptive_timeouts import timeout_book
+from utils.tracing import tracer
+from utils.log import logger
+
+load_dotenv()
 
 # Set up Firefox options for headless mode
 os.environ["webdriver.gecko.driver"] = "/opt/homebrew/bin/geckodriver"
 
+# Points at the local mock (mock/mhrs_spa_server.py) for offline runs and benchmarks
+MHRS_URL = os.getenv("MHRS_BASE_URL", "https://mhrs.gov.tr/vatandas/#/")
+
+# Pages of the search funnel, in the order a search walks through them
+HOME_PAGE = "home"
+SEARCH_FORM_PAGE = "search_form"
+DOCTOR_LIST_PAGE = "doctor_list"
+DOCTOR_DATES_PAGE = "doctor_dates"
+DAY_HOURS_PAGE = "day_hours"
+UNKNOWN_PAGE = "unknown"
+
+# Seconds a wait or a click may take before it fails, until one is learned (see adaptive_timeouts)
+WAIT_TIMEOUT = 30
+
+locator_registry = LocatorRegistry()
+
 options = Options()
 options.headless = True  # Enable headless mode
 options.add_argument("--headless")
 
 class BrowserClient:
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(BrowserClient, cls).__new__(cls)
-            cls._instance.driver = None
-            cls._instance.wait = None
-        return cls._instance
+    # One BrowserClient is one Firefox session; BrowserPool hands them out per tool call
+    def __init__(self):
+        self.driver = None
+        self.wait = None
+        self.is_logged_in = False
+        self.session_expired = False
+        self.logged_in_at = None
+        self.last_used = time.monotonic()
+        self.cancel_event = None  # set by BrowserPool while a cancellable tool call holds the session
+        self.job = None  # the RequestScheduler job the session is checked out for
+        self.script_timeout = None
+        self.reset_nav_state()
 
     def initialize_driver(self):
         if self.driver is None:
             self.driver = webdriver.Firefox(options=options)
-            self.driver.get("https://mhrs.gov.tr/vatandas/#/")
-            self.wait = WebDriverWait(self.driver, 30)  # You can adjust this timeout value as needed 
+            start_recording(self)  # only when MHRS_DRIVER_RECORD_DIR is set
+            self.driver.get(MHRS_URL)
+            self.wait = SessionAwareWait(self, self.driver, WAIT_TIMEOUT)
+
+    def reset_nav_state(self, page=UNKNOWN_PAGE):
+        """
+        Forgets where the funnel is. `form` holds the (city, town, clinic, hospital) selections
+        already made on the search form, `search` the full selection the results belong to and
+        `searched_at` the time.monotonic() the results were asked for.
+        """
+        self.nav_state = {"page": page, "form": (), "search": None, "searched_at": None, "doctors": None, "doctor": None, "date": None}
 
-    def click_button(self, button_selector):
-        for attempt in range(3):
+    def set_nav_state(self, **changes):
+        self.nav_state.update(changes)
+
+    def mark_logged_in(self, logged_in_at=None):
+        # logged_in_at: the time.monotonic() of a login that happened earlier, e.g. a restored one
+        self.is_logged_in = True
+        self.session_expired = False
+        self.logged_in_at = time.monotonic() if logged_in_at is None else logged_in_at
+
+    def mark_expired(self):
+        self.is_logged_in = False
+        self.session_expired = True
+
+    def raise_if_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise CallCancelled("Tool call was cancelled")
+
+    def is_alive(self):
+        if self.driver is None:
+            return False
+        try:
+            self.driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        if self.driver is not None:
             try:
-                self.wait_loading_screen()  # Ensure loading screen is gone first
-                self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, button_selector))).click()
-                self.wait_loading_screen()  # Wait after click
-                break
+                self.driver.quit()
             except Exception as e:
-                print(f"[!] Attempt {attempt + 1}: {type(e).__name__} - {e}")
-                time.sleep(0.5)
-    
-    def wait_loading_screen(self):
-        self.wait.until(EC.invisibility_of_element_located((By.CSS_SELECTOR, ".ant-spin-spinning")))
+                logger.warning("Error closing browser session: {}", e)
+        self.driver = None
+        self.wait = None
+        self.script_timeout = None
+        self.is_logged_in = False
+        self.session_expired = False
+        self.logged_in_at = None
+        self.reset_nav_state()
+
+    def set_script_timeout(self, seconds):
+        # a round trip only when the timeout actually changes
+        if seconds != self.script_timeout:
+            self.driver.set_script_timeout(seconds)
+            self.script_timeout = seconds
+
+    def click_button(self, button_selector, timeout=None, required=True):
+        """
+        Clicks the button (a locator name or CSS selector) as soon as no spinner, modal or
+        disabled state stands in its way and returns once the page has settled after the
+        click, all in the page (see event_waits). Raises ClickTimeout / ClickFailed when the
+        click does not go through, LocatorBroken right away for a locator known to be broken.
+        Without a timeout the click gets the one learned for it (or WAIT_TIMEOUT).
+        required=False is for buttons that may not be there (an optional modal): not finding
+        one raises ClickTimeout (reason not_found) and never marks the locator broken.
+        """
+        strategies = locator_registry.strategies(button_selector)
+        with tracer.span("browser.click_button", selector=button_selector) as span:
+            if locator_registry.is_broken(button_selector) and not self.driver.execute_script(PROBE_SCRIPT, strategies, False):
+                if not required:
+                    raise ClickTimeout(button_selector, "not_found", 0)
+                raise LocatorBroken(button_selector)
+            try:
+                with timeout_book.limit(f"click:{button_selector}", WAIT_TIMEOUT, timeout) as limit:
+                    span.attrs["timeout"] = limit
+                    result = click_when_ready(self, button_selector, limit, strategies=strategies)
+            except ClickTimeout as e:
+                if e.reason == "not_found" and required:
+                    self._record_miss(button_selector)
+                raise
+            locator_registry.record(button_selector, result["strategy"])
+            span.attrs.update(waited_ms=result["waited_ms"], strategy=result["strategy"])
+            self._record_settle(span, result)
+
+    def locate(self, name, usable=False, required=True, timeout=None):
+        """
+        Returns (css, elements) for the first strategy of a locator (see locators.LOCATORS) or
+        CSS selector that matches, probing all strategies in one script per poll. usable=True
+        only counts visible, enabled elements. Waits up to timeout seconds (by default the
+        learned timeout, see adaptive_timeouts) for a match; with
+        required=False it looks once and may return no elements. A locator known to be broken
+        is looked at once and raises LocatorBroken instead of waiting out the timeout.
+        """
+        strategies = locator_registry.strategies(name)
+
+        def probe(driver):
+            return driver.execute_script(PROBE_SCRIPT, strategies, usable)
+
+        if not required or locator_registry.is_broken(name):
+            found = probe(self.driver)
+            if not found:
+                if required:
+                    raise LocatorBroken(name)
+                return strategies[locator_registry.active(name)], []
+        else:
+            try:
+                found = self.wait.until(probe, timeout=timeout, condition=f"locate:{name}")
+            except TimeoutException:
+                self._record_miss(name)
+                raise
+        locator_registry.record(name, found["strategy"])
+        return strategies[found["strategy"]], found["elements"]
+
+    def _record_miss(self, name):
+        # drift only when the page the locator belongs to is there: a logged-out page or a
+        # missing anchor means the element is absent for a reason, not that it moved
+        anchor = ANCHORS.get(name)
+        drift = anchor is not None and detect_logout(self.driver) is None and bool(self.driver.execute_script(PROBE_SCRIPT, [anchor], False))
+        locator_registry.record(name, None, drift=drift)
+
+    def find(self, name, **kwargs):
+        """The first element of locate(name), or None (only with required=False)."""
+        elements = self.locate(name, **kwargs)[1]
+        return elements[0] if elements else None
+
+    def find_all(self, name, **kwargs):
+        return self.locate(name, **kwargs)[1]
+
+    def wait_loading_screen(self, timeout=None):
+        """Waits until no spinner is shown and no XHR / fetch request is in flight."""
+        with tracer.span("browser.wait_loading_screen") as span:
+            with timeout_book.limit("settle", WAIT_TIMEOUT, timeout) as limit:
+                span.attrs["timeout"] = limit
+                result = wait_until_settled(self, limit)
+            self._record_settle(span, result)
+
+    def _record_settle(self, span, result):
+        # network vs render time also adds up on the service step that waited
+        span.attrs.update(network_ms=result["network_ms"], render_ms=result["render_ms"], slices=result["slices"])
+        if result["attempts"] > 1:
+            span.count("retries", result["attempts"] - 1)
+        if span.parent is not None:
+            span.parent.count("network_ms", result["network_ms"])
+            span.parent.count("render_ms", result["render_ms"])
 
     def wait_warping(self):
-        self.wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, "ant-modal-wrap")))
-        
-   
\ No newline at end of file
+        with tracer.span("browser.wait_warping"):
+            self.wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, "ant-modal-wrap")))
+
+
@@ -0,0 +1,446 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import functools
+import threading
+import time
+import os
+import sys
+from dotenv import load_dotenv
+
+# Add the project root to the path to fix imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.clients.browser_client import BrowserClient
+from core.clients.auth_client import AuthClient
+from core.clients.session_monitor import SessionExpired, CallCancelled
+from core.clients.request_scheduler import RequestScheduler
+from utils.tracing import tracer
+from utils.log import logger
+
+load_dotenv()
+
+POOL_SIZE = int(os.getenv("MHRS_BROWSER_POOL_SIZE", "2"))
+MAX_IDLE_SECONDS = float(os.getenv("MHRS_BROWSER_MAX_IDLE", "600"))
+ACQUIRE_TIMEOUT = float(os.getenv("MHRS_BROWSER_ACQUIRE_TIMEOUT", "120"))
+WARM_UP_SESSIONS = int(os.getenv("MHRS_WARM_UP_SESSIONS", "1"))
+SESSION_RETRIES = int(os.getenv("MHRS_SESSION_RETRIES", "1"))
+# Threads running tool calls; a few more than sessions so HTTP-served calls are not stuck behind browser work
+TOOL_WORKERS = int(os.getenv("MHRS_TOOL_WORKERS", str(POOL_SIZE + 2)))
+TOOL_TIMEOUT = float(os.getenv("MHRS_TOOL_TIMEOUT", "300"))
+
+auth_client = AuthClient()
+
+class BrowserPoolTimeout(Exception):
+    pass
+
+class BrowserPool:
+    """
+    Hands out logged-in BrowserClient sessions, one per tool call.
+
+    Sessions are created lazily up to `size`, health-checked on checkout and evicted after
+    `max_idle` seconds without use. Callers beyond capacity wait in the order RequestScheduler
+    gives them: by job class (see `scheduled`), then FIFO.
+    The session checked out by a thread is reachable through the module level `browser`
+    proxy so the services keep using `browser.driver` / `browser.wait` unchanged.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(BrowserPool, cls).__new__(cls)
+            cls._instance.size = max(1, POOL_SIZE)
+            cls._instance.max_idle = MAX_IDLE_SECONDS
+            cls._instance.idle = []  # LIFO, the most recently used session is reused first
+            cls._instance.sessions = []
+            cls._instance.creating = 0
+            cls._instance.warming = 0
+            cls._instance.scheduler = RequestScheduler(cls._instance.size)
+            cls._instance.last_released = None
+            cls._instance.condition = threading.Condition()
+            cls._instance.local = threading.local()
+            cls._instance.executor = ThreadPoolExecutor(max_workers=max(1, TOOL_WORKERS), thread_name_prefix="mhrs-tool")
+        return cls._instance
+
+    def current(self):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            scope = getattr(self.local, "scope", None)
+            if scope is None:
+                raise RuntimeError("No browser session is checked out for this thread; use BrowserPool().session()")
+            # Lazy scope: check the session out on first use of the browser
+            with tracer.span("browser_pool.acquire", job=(scope["job"] or ("query",))[0]):
+                client = self.acquire(timeout=scope["timeout"], preferred=scope["preferred"], cancel_event=scope["cancel"], job=scope["job"])
+            client.cancel_event = scope["cancel"]
+            self.local.client = client
+        return client
+
+    def checked_out(self):
+        return getattr(self.local, "client", None)
+
+    def raise_if_cancelled(self):
+        """Raises CallCancelled when the calling thread's tool call was cancelled."""
+        scope = getattr(self.local, "scope", None)
+        if scope is not None and scope["cancel"] is not None and scope["cancel"].is_set():
+            raise CallCancelled("Tool call was cancelled")
+
+    @contextmanager
+    def session(self, sticky=False, lazy=False, timeout=ACQUIRE_TIMEOUT, cancel_event=None, job=None):
+        """
+        Scopes a browser session to the calling thread. With lazy=True nothing is checked out
+        until the code inside actually touches `browser`, so calls served without the browser
+        never wait for a session. Setting cancel_event makes the session's waits raise
+        CallCancelled. job is the (class, affinity) the checkout is scheduled as.
+        """
+        # Re-entrant: nested calls on the same thread share the outer session
+        if getattr(self.local, "scope", None) is not None:
+            yield self.checked_out() if lazy else self.current()
+            return
+
+        self.local.scope = {"preferred": self.last_released if sticky else None, "timeout": timeout, "cancel": cancel_event, "job": job}
+        self.local.client = None
+        try:
+            yield None if lazy else self.current()
+        finally:
+            client = self.local.client
+            self.local.scope = None
+            self.local.client = None
+            if client is not None:
+                client.cancel_event = None
+                if cancel_event is not None and cancel_event.is_set():
+                    client.reset_nav_state()  # abandoned somewhere in the middle of a flow
+                self.release(client)
+
+    @contextmanager
+    def bind(self, client):
+        """
+        Makes client the calling thread's session without it belonging to the pool, e.g. a
+        BrowserClient driving mock/replay_driver.py's ReplayDriver in tests.
+        """
+        previous = (getattr(self.local, "scope", None), getattr(self.local, "client", None))
+        self.local.scope = {"preferred": None, "timeout": ACQUIRE_TIMEOUT, "cancel": None, "job": None}
+        self.local.client = client
+        try:
+            yield client
+        finally:
+            self.local.scope, self.local.client = previous
+
+    def run(self, func, *args, sticky=False, lazy=False, cancel_event=None, job=None, **kwargs):
+        """
+        Calls func on a checked-out session. If the MHRS session expired while it ran, whether
+        func raised SessionExpired or swallowed it, the session is re-authenticated and func
+        is retried from the start, since the funnel it was in is gone after a re-login.
+        """
+        with self.session(sticky=sticky, lazy=lazy, cancel_event=cancel_event, job=job):
+            for attempt in range(SESSION_RETRIES + 1):
+                try:
+                    result = func(*args, **kwargs)
+                    client = self.checked_out()
+                    if client is None or not client.session_expired:
+                        return result
+                except SessionExpired:
+                    if attempt == SESSION_RETRIES:
+                        raise
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CallCancelled("Tool call was cancelled")
+                if attempt < SESSION_RETRIES:
+                    logger.info("retrying {} after re-login (attempt {})", getattr(func, '__name__', func), attempt + 2)
+                    tracer.count("session_retries")
+                    client = self.checked_out()
+                    if client is not None:  # a lazy scope may not hold a session at all
+                        auth_client.relogin(client)
+            return result
+
+    async def run_async(self, func, *args, sticky=False, lazy=False, timeout=TOOL_TIMEOUT, idle_only=False, **kwargs):
+        """
+        Awaitable run(): func runs on the tool executor so the event loop keeps serving other
+        calls. When the deadline passes (asyncio.TimeoutError) or the awaiting task is
+        cancelled, a call still queued never starts and a running one stops at its next wait.
+
+        idle_only=True never queues: func runs on a session that is idle right now (see
+        try_acquire), or is not called at all and the result is None when every session is busy.
+        """
+        cancel_event = threading.Event()
+        if idle_only:
+            call = functools.partial(self._run_on_idle, func, *args, sticky=sticky, cancel_event=cancel_event, **kwargs)
+            executor = None  # a short look, not stuck behind the tool executor's queue either
+        else:
+            call = functools.partial(self._run_traced, func, *args, sticky=sticky, lazy=lazy, cancel_event=cancel_event, **kwargs)
+            executor = self.executor
+        future = asyncio.get_running_loop().run_in_executor(executor, call)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            cancel_event.set()
+            raise
+
+    def submit(self, job_class, affinity, func, *args, **kwargs):
+        """
+        Runs func as a job of job_class. Inside a session scope that has not checked out a
+        session yet, the job decides how the coming checkout is scheduled; outside any scope
+        func gets its own lazy scope. An outer job always wins over the jobs nested in it.
+        """
+        scope = getattr(self.local, "scope", None)
+        if scope is None:
+            return self.run(func, *args, lazy=True, job=(job_class, affinity), **kwargs)
+        if scope["job"] is None:
+            scope["job"] = (job_class, affinity)
+        return func(*args, **kwargs)
+
+    def scheduler_stats(self):
+        with self.condition:
+            stats = self.scheduler.stats()
+            stats["sessions"] = {"open": len(self.sessions), "idle": len(self.idle), "size": self.size}
+            return stats
+
+    def _run_traced(self, func, *args, **kwargs):
+        # The root span of a tool call; everything the call does nests under it
+        with tracer.span(getattr(func, "__name__", "call")) as span:
+            result = self.run(func, *args, **kwargs)
+            status = result.get("status") if isinstance(result, dict) else None
+            if status is not None:
+                span.attrs["result"] = getattr(status, "value", status)
+            return result
+
+    def _run_on_idle(self, func, *args, sticky=False, cancel_event=None, **kwargs):
+        client = self.try_acquire(preferred=self.last_released if sticky else None)
+        if client is None:
+            logger.debug("every browser session is busy, not running {}", getattr(func, "__name__", func))
+            return None
+        with tracer.span(getattr(func, "__name__", "call")):
+            return self.run_on(client, func, *args, cancel_event=cancel_event, **kwargs)
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT, preferred=None, cancel_event=None, job=None):
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            ticket = self.scheduler.enqueue(*(job or (None, None)))
+            try:
+                while True:
+                    self._evict_idle()
+                    if self.scheduler.is_next(ticket, self.idle):
+                        client = self._take_idle(preferred, ticket.affinity)
+                        if client is not None:
+                            break
+                        # Sessions still warming up will be ours shortly, don't start another login
+                        if not self.warming and len(self.sessions) + self.creating < self.size:
+                            self.creating += 1
+                            client = None
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise BrowserPoolTimeout(f"No browser session became available within {timeout}s")
+                    if cancel_event is not None:
+                        if cancel_event.is_set():
+                            raise CallCancelled("Tool call was cancelled while waiting for a browser session")
+                        remaining = min(remaining, 0.5)
+                    self.condition.wait(remaining)
+                self.scheduler.start(ticket)
+            finally:
+                self.scheduler.remove(ticket)
+                self.condition.notify_all()
+
+        try:
+            if client is None:
+                client = self._create_session()
+            client = self._ensure_healthy(client)
+        except BaseException:
+            with self.condition:
+                self.scheduler.finish(ticket)
+                self.condition.notify_all()
+            raise
+        client.job = ticket
+        return client
+
+    def try_acquire(self, job=None, preferred=None):
+        """
+        Non-blocking acquire() for extra parallel work, e.g. the chunks of a sweep: an idle
+        session when one is idle right now and nobody is queued for it, else None so the
+        caller does the work itself. The job class limit is not applied, a job arriving
+        meanwhile waits for at most the extra work's own run.
+        """
+        with self.condition:
+            self._evict_idle()
+            if self.scheduler.queue or not self.idle:
+                return None
+            ticket = self.scheduler.enqueue(*(job or (None, None)))
+            self.scheduler.start(ticket)
+            client = self._take_idle(preferred, ticket.affinity)
+
+        try:
+            client = self._ensure_healthy(client)
+        except BaseException:
+            with self.condition:
+                self.scheduler.finish(ticket)
+                self.condition.notify_all()
+            raise
+        client.job = ticket
+        return client
+
+    def run_on(self, client, func, *args, cancel_event=None, **kwargs):
+        """
+        Calls func with client, a session from try_acquire(), as the calling thread's session
+        and releases it afterwards. There is no re-login and retry as in run(): a session that
+        expired raises SessionExpired and the caller redoes the work on its own session.
+        """
+        client.cancel_event = cancel_event
+        self.local.scope = {"preferred": None, "timeout": ACQUIRE_TIMEOUT, "cancel": cancel_event, "job": client.job}
+        self.local.client = client
+        try:
+            result = func(*args, **kwargs)
+            if client.session_expired:
+                raise SessionExpired("MHRS session has expired")
+            return result
+        finally:
+            self.local.scope = None
+            self.local.client = None
+            client.cancel_event = None
+            if cancel_event is not None and cancel_event.is_set():
+                client.reset_nav_state()  # abandoned somewhere in the middle of a flow
+            self.release(client)
+
+    def warm_up(self, count=WARM_UP_SESSIONS):
+        """
+        Launches Firefox and logs in on a background thread so the first tool call finds a
+        ready session. Calls arriving meanwhile wait for it instead of logging in again.
+        """
+        with self.condition:
+            count = min(count, self.size - len(self.sessions) - self.creating)
+            if count <= 0:
+                return []
+            self.creating += count
+            self.warming += count
+
+        threads = []
+        for _ in range(count):
+            thread = threading.Thread(target=self._warm_up_session, name="mhrs-warm-up", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _warm_up_session(self):
+        try:
+            started = time.monotonic()
+            client = self._create_session()
+            logger.info("browser session warmed up in {:.1f}s", time.monotonic() - started)
+            self.release(client)
+        except Exception as e:
+            logger.warning("Browser warm-up failed: {}", e)
+        finally:
+            with self.condition:
+                self.warming -= 1
+                self.condition.notify_all()
+
+    def release(self, client):
+        with self.condition:
+            client.last_used = time.monotonic()
+            if client.job is not None:
+                self.scheduler.finish(client.job)
+                client.job = None
+            if client.driver is None:
+                # Session died while checked out, free its slot
+                if client in self.sessions:
+                    self.sessions.remove(client)
+            else:
+                self.idle.append(client)
+                self.last_released = client
+            self.condition.notify_all()
+
+    def close_all(self):
+        with self.condition:
+            sessions = list(self.sessions)
+            self.sessions.clear()
+            self.idle.clear()
+            self.last_released = None
+            self.condition.notify_all()
+        for client in sessions:
+            client.quit()
+
+    def _take_idle(self, preferred, affinity=None):
+        if not self.idle:
+            return None
+        if preferred is not None and preferred in self.idle:
+            self.idle.remove(preferred)
+            return preferred
+        if affinity is not None:
+            for client in reversed(self.idle):
+                if client.nav_state["search"] == affinity:
+                    self.idle.remove(client)
+                    return client
+        return self.idle.pop()
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        expired = [c for c in self.idle if now - c.last_used > self.max_idle]
+        for client in expired:
+            logger.info("evicting browser session idle for {:.0f}s", now - client.last_used)
+            self.idle.remove(client)
+            self.sessions.remove(client)
+            if self.last_released is client:
+                self.last_released = None
+            # quitting a driver can take a while, keep it off the lock holder's critical path
+            threading.Thread(target=client.quit, daemon=True).start()
+
+    def _create_session(self):
+        client = BrowserClient()
+        try:
+            auth_client.check_login(client)
+            if client.driver is None:
+                raise RuntimeError("Could not start a browser session")
+            if not client.is_logged_in:
+                raise RuntimeError("Could not log in to MHRS")
+        except Exception:
+            client.quit()
+            raise
+        finally:
+            with self.condition:
+                self.creating -= 1
+                if client.driver is not None:
+                    self.sessions.append(client)
+                self.condition.notify_all()
+        return client
+
+    def _ensure_healthy(self, client):
+        try:
+            if not client.is_alive():
+                logger.info("browser session failed health check, replacing it")
+                client.quit()
+                client.initialize_driver()
+            auth_client.check_login(client)
+            if not client.is_logged_in:
+                raise RuntimeError("Could not log in to MHRS")
+            return client
+        except Exception:
+            # Drop the session so its slot can be filled by a new one on a later checkout
+            client.quit()
+            with self.condition:
+                if client in self.sessions:
+                    self.sessions.remove(client)
+                if self.last_released is client:
+                    self.last_released = None
+                self.condition.notify_all()
+            raise
+
+
+class CurrentBrowser:
+    # Proxy for the BrowserClient checked out by the calling thread
+    def __getattr__(self, name):
+        return getattr(BrowserPool().current(), name)
+
+    def __setattr__(self, name, value):
+        setattr(BrowserPool().current(), name, value)
+
+
+browser = CurrentBrowser()
+
+
+def scheduled(job_class, affinity=None):
+    """
+    Marks a service entry point as a BrowserPool job of job_class. affinity, when given, is
+    called with the entry point's arguments and returns the nav_state["search"] key it needs.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = affinity(*args, **kwargs) if affinity else None
+            return BrowserPool().submit(job_class, key, func, *args, **kwargs)
+        return wrapper
+    return decorator
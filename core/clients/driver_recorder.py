@@ -0,0 +1,152 @@
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+from utils.tracing import tracer
+from utils.log import logger
+
+load_dotenv()
+
+RECORD_DIR = os.getenv("MHRS_DRIVER_RECORD_DIR")
+
+# Typed text is never written to a recording (it includes the password)
+REDACTED_PARAMS = {"elementSendKeys": ("text", "value")}
+
+# Commands whose "script" parameter is JavaScript source
+SCRIPT_COMMANDS = ("w3cExecuteScript", "w3cExecuteScriptAsync", "executeScript", "executeAsyncScript")
+
+_script_names = {}
+
+def script_name(source):
+    """
+    What a script is recorded as: the name of the module constant holding it (e.g.
+    "event_waits.PAGE_SCRIPT"), or a hash of the source for inline scripts and Selenium's
+    own atoms, so that recordings do not carry (and are not tied to) the script text.
+    """
+    name = _script_names.get(source)
+    if name is None:
+        holders = [(module, attr)
+                   for module_name, module in sorted(list(sys.modules.items()), key=lambda item: item[0])
+                   if module_name.startswith("core.") and module is not None
+                   for attr, value in list(vars(module).items())
+                   if attr.endswith("_SCRIPT") and value == source]
+        # the module defining the constant rather than one importing it
+        holders.sort(key=lambda holder: not _defines(*holder))
+        if holders:
+            module, attr = holders[0]
+            name = f"{module.__name__.rsplit('.', 1)[-1]}.{attr}"
+        else:
+            name = "sha1:" + hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+        _script_names[source] = name
+    return name
+
+def _defines(module, attr):
+    try:
+        return re.search(rf"^{attr}\s*=", inspect.getsource(module), re.MULTILINE) is not None
+    except (OSError, TypeError):
+        return False
+
+def recorded_params(command, params):
+    """The parameters of a command as written to a recording: no session id, typed text or script source."""
+    params = {k: v for k, v in (params or {}).items() if k != "sessionId" and k not in REDACTED_PARAMS.get(command, ())}
+    if command in SCRIPT_COMMANDS and isinstance(params.get("script"), str):
+        params["script"] = script_name(params["script"])
+    return params
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _without_numbers(value):
+    if isinstance(value, list):
+        return [_without_numbers(v) for v in value if not _is_number(v)]
+    if isinstance(value, dict):
+        return {k: _without_numbers(v) for k, v in value.items() if not _is_number(v)}
+    return value
+
+def command_key(command, params):
+    """
+    What a replayed command is matched on: its name plus its recorded parameters (see
+    recorded_params). Numbers passed to scripts are timeouts and settle times, tuned and
+    learned per machine, so they are left out and a retuned wait still finds its response.
+    Navigations are matched on the page of the app only, not on the host serving it (the
+    mock app of a recorded benchmark run, MHRS for the replay).
+    """
+    if command in SCRIPT_COMMANDS:
+        params = dict(params, args=_without_numbers(params.get("args", [])))
+    elif command == "get" and isinstance(params.get("url"), str):
+        url = urlsplit(params["url"])
+        params = dict(params, url=f"{url.path}#{url.fragment}")
+    return command, json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+def _root_span():
+    span = tracer.current()
+    while span is not None and span.parent is not None:
+        span = span.parent
+    return span
+
+class RecordingExecutor:
+    """
+    Wraps a driver's command executor and appends every WebDriver command (see
+    recorded_params) with its raw response to a JSON lines file, for mock/replay_driver.py
+    to serve back from memory.
+
+    Commands are grouped by the tool call (root span) they ran in: the first command of a
+    call is preceded by a header line with the call's name and the session's nav_state at
+    that point, so a replay can start the same call from the same page.
+    """
+    def __init__(self, executor, client, path):
+        self.executor = executor
+        self.client = client
+        self.path = path
+        self.lock = threading.Lock()
+        self.call_ids = itertools.count(1)
+        self.root = None
+        self.call_id = 0
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
+
+    def execute(self, command, params):
+        response = self.executor.execute(command, params)
+        try:
+            self._write(command, params, response)
+        except Exception as e:
+            logger.warning("Could not record WebDriver command {}: {}", command, e)
+        return response
+
+    def _write(self, command, params, response):
+        lines = []
+        root = _root_span()
+        with self.lock:
+            if root is not self.root:
+                self.root = root
+                self.call_id = next(self.call_ids)
+                lines.append({
+                    "call": root.name if root is not None else None,
+                    "call_id": self.call_id,
+                    "at": time.time(),
+                    # what nav_state's time.monotonic() stamps are measured against
+                    "monotonic": time.monotonic(),
+                    "nav_state": self.client.nav_state,
+                })
+            lines.append({"command": command, "params": recorded_params(command, params), "response": response, "call_id": self.call_id})
+            with open(self.path, "a", encoding="utf-8") as f:
+                for line in lines:
+                    f.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+
+def start_recording(client):
+    """Records the client's driver to RECORD_DIR/driver-<session id>.jsonl when MHRS_DRIVER_RECORD_DIR is set."""
+    if not RECORD_DIR or client.driver is None:
+        return
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    path = os.path.join(RECORD_DIR, f"driver-{client.driver.session_id}.jsonl")
+    client.driver.command_executor = RecordingExecutor(client.driver.command_executor, client, path)
+    logger.info("recording WebDriver commands to {}", path)
@@ -0,0 +1,285 @@
+from selenium.common.exceptions import (
+    ElementClickInterceptedException, ElementNotInteractableException, JavascriptException,
+    StaleElementReferenceException, TimeoutException
+)
+import os
+import random
+import time
+from dotenv import load_dotenv
+
+from core.clients.session_monitor import SessionExpired, detect_logout, CHECK_GRACE_SECONDS, CHECK_INTERVAL_SECONDS
+from utils.log import logger
+
+load_dotenv()
+
+CLICK_ATTEMPTS = int(os.getenv("MHRS_CLICK_ATTEMPTS", "3"))
+CLICK_BACKOFF = float(os.getenv("MHRS_CLICK_BACKOFF", "0.1"))
+CLICK_BACKOFF_MAX = float(os.getenv("MHRS_CLICK_BACKOFF_MAX", "2"))
+# How long the page must stay without a spinner after a click to count as settled; covers
+# the gap between the click and the spinner of the request it starts
+CLICK_SETTLE_MS = int(os.getenv("MHRS_CLICK_SETTLE_MS", "60"))
+# Headroom of the driver's script timeout over one in-page wait
+SCRIPT_TIMEOUT_MARGIN = 5
+
+NETWORK_IDLE = os.getenv("MHRS_NETWORK_IDLE", "1") != "0"
+# Requests (URL regex) the page is never waited for, e.g. analytics or long polling
+NETWORK_IGNORE = os.getenv("MHRS_NETWORK_IGNORE", "")
+# A request still open after this long stops counting as the page loading
+NETWORK_STALE_MS = int(os.getenv("MHRS_NETWORK_STALE_MS", "10000"))
+
+# Counts the page's in-flight XHR and fetch requests in window.__mhrsNet and fires an
+# 'mhrs-network' event whenever the count changes. Installed once per document by the first
+# wait that runs in it; requests started before that are only covered by the spinner check.
+# A fetch counts until its response headers arrive, reading the body counts as rendering.
+NETWORK_MONITOR_SCRIPT = """
+if (!window.__mhrsNet) {
+    var net = window.__mhrsNet = {open: {}, next: 0, requests: 0};
+    var ignore = network.ignore ? new RegExp(network.ignore) : null;
+    var notify = function () { window.dispatchEvent(new Event('mhrs-network')); };
+    var begin = function (url) {
+        if (ignore && ignore.test(url)) { return null; }
+        var id = ++net.next;
+        net.open[id] = Date.now();
+        net.requests++;
+        notify();
+        return id;
+    };
+    var end = function (id) {
+        if (id === null || !(id in net.open)) { return; }
+        delete net.open[id];
+        notify();
+    };
+    net.inflight = function (staleMs) {
+        var now = Date.now(), count = 0;
+        for (var id in net.open) { if (now - net.open[id] < staleMs) { count++; } }
+        return count;
+    };
+    var xhrOpen = XMLHttpRequest.prototype.open, xhrSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.open = function (method, url) { this.__mhrsUrl = String(url); return xhrOpen.apply(this, arguments); };
+    XMLHttpRequest.prototype.send = function () {
+        var id = begin(this.__mhrsUrl || '');
+        this.addEventListener('loadend', function () { end(id); });
+        return xhrSend.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var pageFetch = window.fetch;
+        window.fetch = function (input) {
+            var id = begin(typeof input === 'string' ? input : (input && input.url) || String(input));
+            return pageFetch.apply(this, arguments).then(
+                function (response) { end(id); return response; },
+                function (error) { end(id); throw error; });
+        };
+    }
+}
+"""
+
+# Waits in the page until the button (found by the first of the selectors that matches) is
+# clickable, clicks it, then waits until the page has been settled (no spinner, no request
+# in flight) for settleMs. Clickability is re-checked on DOM mutations and network events
+# instead of polling; the interval only covers changes that mutate nothing (transitions,
+# scrolling). Without selectors (phase 'settle') it only waits for the page to settle.
+# While settling, the time is split into waiting on the network (requests in flight) and on
+# rendering (spinner still up after the responses arrived). Returns after sliceMs at the
+# latest so the caller can check for cancellation and logout between slices.
+# window.__mhrsClick remembers the last click, so a retried call (phase 'resume') does not
+# click a second time.
+PAGE_SCRIPT = """
+var selectors = arguments[0], phase = arguments[1], sliceMs = arguments[2], settleMs = arguments[3], network = arguments[4];
+var done = arguments[arguments.length - 1];
+if (network) {
+""" + NETWORK_MONITOR_SCRIPT + """
+}
+var started = Date.now(), finished = false, blockedBy = null, waitedMs = null, strategy = null;
+var observer = null, fallback = null, sliceTimer = null, settleTimer = null;
+var networkMs = 0, renderMs = 0, mark = null, waitingOn = null;
+
+function spinning() { return document.querySelector('.ant-spin-spinning') !== null; }
+function query() {
+    for (var i = 0; i < selectors.length; i++) {
+        var el = document.querySelector(selectors[i]);
+        if (el) { return {el: el, strategy: i}; }
+    }
+    return {el: null, strategy: null};
+}
+function inflight() { return network && window.__mhrsNet ? window.__mhrsNet.inflight(network.stale_ms) : 0; }
+function blocker(el) {
+    if (!el) { return 'not_found'; }
+    if (el.disabled || el.getAttribute('aria-disabled') === 'true' || el.classList.contains('ant-btn-loading')) { return 'disabled'; }
+    if (el.getClientRects().length === 0) { return 'hidden'; }
+    if (spinning()) { return 'spinner'; }
+    var rect = el.getBoundingClientRect();
+    if (rect.top < 0 || rect.bottom > window.innerHeight) { el.scrollIntoView({block: 'center'}); rect = el.getBoundingClientRect(); }
+    var hit = document.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+    return hit && (hit === el || el.contains(hit)) ? null : 'obscured';
+}
+function account() {
+    var now = Date.now();
+    if (waitingOn === 'network') { networkMs += now - mark; }
+    else if (waitingOn === 'render') { renderMs += now - mark; }
+    mark = now;
+    waitingOn = inflight() > 0 ? 'network' : spinning() ? 'render' : null;
+    return waitingOn === null;
+}
+function finish(state) {
+    if (finished) { return; }
+    if (mark !== null) { account(); }
+    finished = true;
+    observer.disconnect();
+    window.removeEventListener('mhrs-network', check);
+    clearInterval(fallback); clearTimeout(sliceTimer); clearTimeout(settleTimer);
+    done({state: state, blocker: blockedBy, strategy: strategy, waited_ms: waitedMs, network_ms: networkMs, render_ms: renderMs, ms: Date.now() - started});
+}
+function check() {
+    if (finished) { return; }
+    if (phase !== 'settle') {
+        var found = query();
+        blockedBy = blocker(found.el);
+        if (blockedBy) { return; }
+        window.__mhrsClick = {selector: selectors.join(', '), at: Date.now()};
+        strategy = found.strategy;
+        found.el.click();
+        waitedMs = Date.now() - started;
+        phase = 'settle';
+    }
+    if (!account()) { clearTimeout(settleTimer); settleTimer = null; return; }
+    if (settleMs <= 0) { finish('settled'); return; }
+    if (settleTimer === null) {
+        settleTimer = setTimeout(function () { settleTimer = null; if (account()) { finish('settled'); } }, settleMs);
+    }
+}
+
+var last = window.__mhrsClick;
+if (phase === 'click') { window.__mhrsClick = null; }
+else if (phase === 'resume' && last && last.selector === selectors.join(', ')) { phase = 'settle'; }
+observer = new MutationObserver(check);
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'style', 'disabled']});
+window.addEventListener('mhrs-network', check);
+fallback = setInterval(check, 250);
+sliceTimer = setTimeout(function () { finish(phase === 'settle' ? 'settling' : 'blocked'); }, sliceMs);
+check();
+"""
+
+class ClickError(Exception):
+    """A click_button that did not go through; `reason` says what stood in the way."""
+    def __init__(self, selector, reason, attempts=1):
+        super().__init__(f"Could not click {selector}: {reason} (attempts: {attempts})")
+        self.selector = selector
+        self.reason = reason
+        self.attempts = attempts
+
+class ClickTimeout(ClickError):
+    # The button never became clickable (reason: not_found, disabled, hidden, spinner,
+    # obscured), or the page kept its spinner after the click (reason: settling)
+    pass
+
+class ClickFailed(ClickError):
+    # The driver failed in a way retrying does not fix, or every attempt failed
+    pass
+
+# Errors that a fresh attempt can get past: the page re-rendered or navigated under the
+# click, or the browser was too busy to answer the script in time (Selenium raises
+# TimeoutException for a script timeout)
+RETRYABLE_ERRORS = (StaleElementReferenceException, ElementClickInterceptedException, ElementNotInteractableException, TimeoutException)
+
+def is_retryable(error):
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    # Firefox aborts a running script with "Document was unloaded" when the page navigates
+    return isinstance(error, JavascriptException) and "unloaded" in str(error).lower()
+
+class RetryPolicy:
+    """Exponential backoff with jitter between the attempts of a retryable action."""
+    def __init__(self, attempts=CLICK_ATTEMPTS, base=CLICK_BACKOFF, factor=2, max_delay=CLICK_BACKOFF_MAX, jitter=0.2):
+        self.attempts = max(1, attempts)
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, retry):
+        """Seconds to wait before the retry-th retry (0-based)."""
+        delay = min(self.max_delay, self.base * self.factor ** retry)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+CLICK_RETRY_POLICY = RetryPolicy()
+
+def _network_options():
+    return {"ignore": NETWORK_IGNORE, "stale_ms": NETWORK_STALE_MS} if NETWORK_IDLE else None
+
+def _run_page_script(client, selector, selectors, phase, timeout, policy, settle_ms, timeout_error):
+    """
+    Runs PAGE_SCRIPT slice by slice until the page reports 'settled'; returns the totals
+    {"waited_ms", "strategy", "network_ms", "render_ms", "ms", "slices", "attempts"}.
+    `selector` names the button in errors, `selectors` are the CSS strategies to find it. Raises
+    timeout_error(reason, attempts) at the deadline, ClickFailed on driver errors of a click
+    that retries did not fix, and SessionExpired / CallCancelled like SessionAwareWait does.
+    """
+    if not client.is_logged_in and client.session_expired:
+        raise SessionExpired("MHRS session has expired")
+    client.set_script_timeout(CHECK_INTERVAL_SECONDS + SCRIPT_TIMEOUT_MARGIN)
+
+    network = _network_options()
+    started = time.monotonic()
+    deadline = started + timeout
+    last_check = started
+    attempt = 1
+    totals = {"waited_ms": None, "strategy": None, "network_ms": 0, "render_ms": 0, "slices": 0}
+    while True:
+        client.raise_if_cancelled()
+        slice_ms = int(max(0.0, min(CHECK_INTERVAL_SECONDS, deadline - time.monotonic())) * 1000)
+        try:
+            result = client.driver.execute_async_script(PAGE_SCRIPT, selectors, phase, slice_ms, settle_ms, network) or {}
+        except Exception as e:
+            retryable = is_retryable(e)
+            if not retryable or attempt >= policy.attempts or time.monotonic() >= deadline:
+                if selector is None:
+                    raise  # a plain wait fails with the driver's own error
+                reason = f"{type(e).__name__}: {e}" if not retryable else f"{type(e).__name__} on every attempt"
+                raise ClickFailed(selector, reason, attempt) from e
+            logger.warning("Attempt {} to {}: {} - {}", attempt, f"click {selector}" if selector else "wait for the page", type(e).__name__, e)
+            time.sleep(min(policy.delay(attempt - 1), max(0.0, deadline - time.monotonic())))
+            attempt += 1
+            if phase == "click":
+                phase = "resume"
+            continue
+
+        totals["slices"] += 1
+        totals["network_ms"] += result.get("network_ms") or 0
+        totals["render_ms"] += result.get("render_ms") or 0
+        if result.get("waited_ms") is not None:
+            totals["waited_ms"] = result["waited_ms"]
+            totals["strategy"] = result.get("strategy")
+        state = result.get("state")
+        if state == "settled":
+            return dict(totals, ms=round((time.monotonic() - started) * 1000, 1), attempts=attempt)
+
+        now = time.monotonic()
+        if now >= deadline:
+            raise timeout_error("settling" if state == "settling" else result.get("blocker") or "not_found", attempt)
+        if client.is_logged_in and now - started >= CHECK_GRACE_SECONDS and now - last_check >= CHECK_INTERVAL_SECONDS:
+            last_check = now
+            reason = detect_logout(client.driver)
+            if reason:
+                logger.warning("MHRS session expired ({})", reason)
+                client.mark_expired()
+                raise SessionExpired(f"MHRS session has expired ({reason})")
+        phase = "settle" if state == "settling" else "resume"
+
+def click_when_ready(client, selector, timeout, policy=CLICK_RETRY_POLICY, settle_ms=CLICK_SETTLE_MS, strategies=None):
+    """
+    Clicks the button matching selector (or the first of strategies that matches) as soon as
+    the page lets it be clicked and returns once the page has settled after the click.
+    Raises ClickTimeout when that does not happen within timeout seconds.
+    """
+    def timeout_error(reason, attempts):
+        return ClickTimeout(selector, reason, attempts)
+    return _run_page_script(client, selector, strategies or [selector], "click", timeout, policy, settle_ms, timeout_error)
+
+def wait_until_settled(client, timeout, policy=CLICK_RETRY_POLICY):
+    """
+    Returns as soon as the page shows no spinner and has no request in flight. Raises
+    TimeoutException like the WebDriverWait it replaces when that takes over timeout seconds.
+    """
+    def timeout_error(reason, attempts):
+        return TimeoutException(f"Page did not settle within {timeout}s")
+    return _run_page_script(client, None, None, "settle", timeout, policy, 0, timeout_error)
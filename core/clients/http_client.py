@@ -0,0 +1,279 @@
+from requests.adapters import HTTPAdapter
+import requests
+import base64
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+
+# Add the project root to the path to fix imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.clients.session_store import SessionStore, STORAGE_SNAPSHOT_SCRIPT
+from utils.tracing import tracer
+from utils.log import logger
+
+load_dotenv()
+
+API_BASE_URL = os.getenv("MHRS_API_BASE_URL", "https://prd.mhrs.gov.tr/api").rstrip("/")
+HTTP_TIMEOUT = float(os.getenv("MHRS_HTTP_TIMEOUT", "10"))
+# Opt-in: the endpoints below are read off the SPA and not verified against every MHRS release
+HTTP_BACKEND_ENABLED = os.getenv("MHRS_HTTP_BACKEND", "0") != "0"
+RECORD_DIR = os.getenv("MHRS_API_RECORD_DIR")
+
+# The JSON endpoints the vatandas SPA calls behind its dropdowns and search button
+ENDPOINTS = {
+    "cities": ("GET", "/yonetim/genel/il/selectinput-tree"),
+    "districts": ("GET", "/yonetim/genel/ilce/selectinput/{city_id}"),
+    "clinics": ("GET", "/kurum/kurum/kurum-klinik/il/{city_id}/ilce/{district_id}/kurum/-1/aksiyon/200/select-input"),
+    "hospitals": ("GET", "/kurum/kurum/kurum-klinik/il/{city_id}/ilce/{district_id}/kurum/-1/klinik/{clinic_id}/ana-kurum/select-input"),
+    "doctor_search": ("POST", "/kurum-rss/randevu/slot-sorgulama/arama"),
+    "slots": ("POST", "/kurum-rss/randevu/slot-sorgulama/slot"),
+}
+
+JWT_PATTERN = re.compile(r"^[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+$")
+
+class HttpBackendError(Exception):
+    pass
+
+class HttpAppointmentError(HttpBackendError):
+    # MHRS answered with an RND business error (e.g. RND4030, nothing to book right now)
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+
+def find_auth_token(storage):
+    """Finds the JWT the SPA keeps in local/session storage, possibly wrapped in a JSON value."""
+    for area in ("local", "session"):
+        for value in (storage or {}).get(area, {}).values():
+            if not isinstance(value, str):
+                continue
+            candidate = value.strip().strip('"')
+            if candidate.lower().startswith("bearer "):
+                candidate = candidate[7:]
+            if JWT_PATTERN.match(candidate):
+                return candidate
+            try:
+                decoded = json.loads(value)
+            except ValueError:
+                continue
+            if isinstance(decoded, dict):
+                for key in ("jwt", "token", "accessToken", "access_token"):
+                    token = decoded.get(key)
+                    if isinstance(token, str) and JWT_PATTERN.match(token):
+                        return token
+    return None
+
+def token_expiry(token):
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except Exception:
+        return None
+
+def select_options(data):
+    """Flattens MHRS select-input / selectinput-tree payloads into [{"id", "name"}]."""
+    options = []
+    for item in data or []:
+        if not isinstance(item, dict):
+            continue
+        option_id = item.get("value", item.get("id"))
+        name = item.get("text", item.get("label", item.get("name")))
+        if option_id is not None and name:
+            options.append({"id": option_id, "name": name})
+        options.extend(select_options(item.get("children")))
+    return options
+
+def _walk(node, predicate):
+    if isinstance(node, dict):
+        if predicate(node):
+            yield node
+        for value in node.values():
+            yield from _walk(value, predicate)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value, predicate)
+
+def parse_mhrs_datetime(value):
+    # "2025-05-09 15:40:00" -> ("09.05.2025", "15:40")
+    date_part, _, time_part = value.replace("T", " ").partition(" ")
+    year, month, day = date_part.split("-")
+    return f"{day}.{month}.{year}", time_part[:5]
+
+class HttpMhrsClient:
+    """
+    Serves read-only MHRS lookups as plain JSON calls instead of driving the browser.
+
+    It reuses the auth token the SPA stores after AuthClient.login() and keeps one pooled
+    keep-alive requests.Session. MHRS_API_BASE_URL can point it at a local replay server
+    (see mock/api_replay_server.py), and MHRS_API_RECORD_DIR makes it record every response
+    it gets so such a server can replay them later.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(HttpMhrsClient, cls).__new__(cls)
+            cls._instance.base_url = API_BASE_URL
+            cls._instance.enabled = HTTP_BACKEND_ENABLED
+            cls._instance.token = None
+            cls._instance.rejected_tokens = set()
+            cls._instance.lock = threading.Lock()
+            cls._instance.http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            cls._instance.http.mount("https://", adapter)
+            cls._instance.http.mount("http://", adapter)
+            cls._instance.http.headers.update({"Accept": "application/json", "Content-Type": "application/json"})
+        return cls._instance
+
+    def set_token_from_driver(self, driver):
+        try:
+            self.set_token(find_auth_token(driver.execute_script(STORAGE_SNAPSHOT_SCRIPT)))
+        except Exception as e:
+            logger.warning("Could not capture MHRS API token: {}", e)
+
+    def set_token(self, token):
+        with self.lock:
+            self.token = token
+
+    def is_available(self):
+        if not self.enabled:
+            return False
+        if self.token is None:
+            # A saved session from a previous run is enough, no browser needed
+            snapshot = SessionStore().load()
+            token = find_auth_token(snapshot.get("storage")) if snapshot else None
+            if token not in self.rejected_tokens:
+                self.set_token(token)
+        if self.token is None:
+            return False
+        expires_at = token_expiry(self.token)
+        return expires_at is None or expires_at > time.time() + 30
+
+    def request(self, endpoint, body=None, **path_params):
+        with tracer.span(f"http.{endpoint}"):
+            return self._request(endpoint, body, **path_params)
+
+    def _request(self, endpoint, body, **path_params):
+        method, path = ENDPOINTS[endpoint]
+        url = self.base_url + path.format(**path_params)
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        try:
+            response = self.http.request(method, url, json=body, headers=headers, timeout=HTTP_TIMEOUT)
+        except requests.RequestException as e:
+            raise HttpBackendError(f"{method} {url} failed: {e}")
+
+        if response.status_code in (401, 403):
+            with self.lock:
+                self.rejected_tokens.add(self.token)
+                self.token = None
+            raise HttpBackendError(f"{method} {url} was rejected with {response.status_code}")
+        try:
+            payload = response.json()
+        except ValueError:
+            raise HttpBackendError(f"{method} {url} returned {response.status_code} without JSON")
+        self._record(method, path.format(**path_params), body, response.status_code, payload)
+
+        errors = (payload.get("errors") or []) if isinstance(payload, dict) else []
+        for error in errors:
+            code = error.get("kodu", "")
+            if code.startswith("RND"):
+                raise HttpAppointmentError(code, error.get("mesaj", ""))
+        if response.status_code >= 400 or (isinstance(payload, dict) and payload.get("success") is False):
+            raise HttpBackendError(f"{method} {url} returned {response.status_code}: {errors}")
+        return payload.get("data") if isinstance(payload, dict) else payload
+
+    def _record(self, method, path, body, status, payload):
+        if not RECORD_DIR:
+            return
+        os.makedirs(RECORD_DIR, exist_ok=True)
+        record = {"method": method, "path": path, "body": body, "status": status, "response": payload}
+        with open(os.path.join(RECORD_DIR, "recording.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def options(self, endpoint, **path_params):
+        """
+        The options of a dropdown endpoint. An empty or unrecognised payload raises
+        HttpBackendError: MHRS never offers an empty dropdown, so it means the endpoint
+        changed, and the caller has to fall back to the browser rather than report a
+        name as not found.
+        """
+        data = self.request(endpoint, **path_params)
+        options = select_options(data) if isinstance(data, list) else []
+        if not options:
+            raise HttpBackendError(f"{endpoint} returned no options in a known shape: {str(data)[:200]}")
+        return options
+
+    def cities(self):
+        return self.options("cities")
+
+    def districts(self, city_id):
+        return self.options("districts", city_id=city_id)
+
+    def clinics(self, city_id, district_id):
+        return self.options("clinics", city_id=city_id, district_id=district_id)
+
+    def hospitals(self, city_id, district_id, clinic_id):
+        return self.options("hospitals", city_id=city_id, district_id=district_id, clinic_id=clinic_id)
+
+    def search_doctors(self, city_id, district_id, clinic_id, hospital_id):
+        body = {
+            "aksiyonId": "200",
+            "mhrsHekimId": -1,
+            "mhrsIlId": city_id,
+            "mhrsIlceId": district_id,
+            "mhrsKlinikId": clinic_id,
+            "mhrsKurumId": hospital_id,
+            "muayeneYeriId": -1,
+            "tumRandevular": False,
+            "ekRandevu": True,
+            "randevuZamaniList": [],
+        }
+        data = self.request("doctor_search", body=body)
+
+        doctors = []
+        for entry in _walk(data, lambda node: isinstance(node.get("hekim"), dict)):
+            hekim = entry["hekim"]
+            earliest = entry.get("baslangicZamani") or entry.get("baslangicZamaniStr") or ""
+            doctors.append({
+                "id": hekim.get("mhrsHekimId"),
+                "doctor": f"{hekim.get('ad', '')} {hekim.get('soyad', '')}".strip(),
+                "earliest_date": parse_mhrs_datetime(earliest)[0] if "-" in earliest else earliest,
+                "days_left": entry.get("kalanGunSayisi", ""),
+                "hospital": (entry.get("kurum") or {}).get("kurumAdi", ""),
+                "department": (entry.get("klinik") or {}).get("mhrsKlinikAdi", ""),
+                "clinic": (entry.get("muayeneYeri") or {}).get("adi", ""),
+            })
+        return doctors
+
+    def free_slots(self, doctor_id, clinic_id, hospital_id):
+        """Returns {"DD.MM.YYYY": ["HH:MM", ...]} for every free slot of the doctor."""
+        body = {
+            "mhrsHekimId": doctor_id,
+            "mhrsKlinikId": clinic_id,
+            "mhrsKurumId": hospital_id,
+            "muayeneYeriId": -1,
+            "tumRandevular": False,
+            "ekRandevu": True,
+            "randevuZamaniList": [],
+        }
+        data = self.request("slots", body=body)
+
+        slots = {}
+        for entry in _walk(data, lambda node: "bos" in node):
+            if not entry.get("bos"):
+                continue
+            start = entry.get("baslangicZamani") or (entry.get("slot") or {}).get("baslangicZamani")
+            if not start:
+                continue
+            date, clock = parse_mhrs_datetime(start)
+            slots.setdefault(date, [])
+            if clock not in slots[date]:
+                slots[date].append(clock)
+        for clocks in slots.values():
+            clocks.sort()
+        return slots
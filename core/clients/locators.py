@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from utils.log import logger
+
+load_dotenv()
+
+SELECTOR_HEALTH_FILE = os.path.expanduser(os.getenv("MHRS_SELECTOR_HEALTH_FILE", "~/.mhrs-mcp/selectors.json"))
+# Lookups in a row that found nothing before a locator counts as broken
+BROKEN_AFTER = int(os.getenv("MHRS_SELECTOR_BROKEN_AFTER", "3"))
+# Seconds a broken locator is only probed once instead of waited for
+BROKEN_RECHECK = float(os.getenv("MHRS_SELECTOR_RECHECK", "300"))
+
+DAY_TABS_CHAIN = "div.ant-tabs:nth-child(3) > div:nth-child(1) > div:nth-child(1) > div:nth-child(3) > div:nth-child(1) > div:nth-child(1) > div:nth-child(1)"
+
+# Every CSS locator of the MHRS pages by name, each with the strategies tried in order:
+# the selector the code was written against first, then looser ones that survive layout
+# changes (Ant Design class names, roles) but could match more than intended.
+LOCATORS = {
+    "login.username": ("#LoginForm_username",),
+    "login.password": ("#LoginForm_password",),
+    "login.submit": (".ant-btn.ant-btn-teal.ant-btn-block", "#LoginForm button.ant-btn"),
+    "home.cards": (".randevu-card-dissiz",),
+    "home.patient_card": (
+        "div.randevu-card-dissiz:nth-child(2) > div:nth-child(1) > div:nth-child(1) > div:nth-child(2)",
+        "div.randevu-card-dissiz:nth-child(2) > div > div > div:last-child",
+    ),
+    "search.general_search_button": ("button.randevu-turu-button:nth-child(1)", "button.randevu-turu-button"),
+    "search.city_dropdown": ("#il-tree-select",),
+    "search.district_dropdown": ("#randevuAramaForm_ilce",),
+    "search.clinic_dropdown": ("#klinik-tree-select",),
+    "search.hospital_dropdown": ("#hastane-tree-select",),
+    "search.city_options": (".ant-select-tree li", ".ant-select-dropdown:not(.ant-select-dropdown-hidden) [role='tree'] li"),
+    "search.district_options": (".ant-select-dropdown-menu li", ".ant-select-dropdown:not(.ant-select-dropdown-hidden) [role='listbox'] li"),
+    "search.clinic_options": ("#rc-tree-select-list_2 > ul:nth-child(2) > li", ".ant-select-dropdown:not(.ant-select-dropdown-hidden) [role='tree'] > li"),
+    "search.hospital_options": ("#rc-tree-select-list_3 > ul:nth-child(2) > li", ".ant-select-dropdown:not(.ant-select-dropdown-hidden) [role='tree'] > li"),
+    "search.submit": ("#randevu-ara-buton", "#randevuAramaForm button.ant-btn-primary"),
+    "doctors.list": (".ant-list-items", ".ant-list ul"),
+    "doctors.items": (".ant-list-items li", ".ant-list li.ant-list-item"),
+    "dates.tabs": ("div.ant-tabs-tab", f"{DAY_TABS_CHAIN} > div", ".ant-tabs-nav [role='tab']"),
+    "hours.panels": ("div.ant-tabs-tabpane > div:nth-child(2) > div:nth-child(1) > div:nth-child(2) > div", "div.ant-tabs-tabpane-active div.ant-collapse-item"),
+    "hours.items": ("div.ant-collapse-item",),
+    "hours.slot_buttons": ("div.ant-collapse-content-active button.slot-saat-button", "div.ant-collapse-content-active button"),
+    "appointments.list": (".ant-list-items", ".ant-list ul"),
+    "appointments.items": (".ant-list-items li", ".ant-list li.ant-list-item"),
+    "appointments.cancel_button": (".ant-btn-danger",),
+    "appointments.primary_button": (".ant-btn-primary",),
+    "modal.body": (".ant-modal-body",),
+    "modal.content": (".ant-modal-confirm-content",),
+    "modal.confirm_message": (".ant-modal-confirm > div:nth-child(2)", ".ant-modal-confirm .ant-modal-body"),
+    "modal.second_body": ("div.ant-modal-body:nth-child(2)",),
+    "modal.confirm_first_button": (".ant-modal-confirm-btns > button:nth-child(1)",),
+    "modal.confirm_second_button": (".ant-modal-confirm-btns > button:nth-child(2)",),
+    "modal.footer_second_button": (".ant-modal-footer > div:nth-child(1) > button:nth-child(2)", ".ant-modal-footer button.ant-btn-primary"),
+    "modal.notification_accept": ("button.ant-btn-primary:nth-child(2)",),
+}
+
+# The container each locator lives in, present whenever the locator should match. A miss
+# only counts toward a broken locator while its anchor is on the page; locators that may
+# legitimately be absent there (result lists, optional modals, empty slot panels) have none
+# and never break.
+PASSWORD_INPUT = "input[type='password']"
+SEARCH_FORM = "form .ant-select"
+OPEN_DROPDOWN = ".ant-select-dropdown:not(.ant-select-dropdown-hidden)"
+ANCHORS = {
+    "login.username": PASSWORD_INPUT,
+    "login.password": "form input:not([type='hidden'])",
+    "login.submit": PASSWORD_INPUT,
+    "home.patient_card": ".randevu-card-dissiz",
+    "search.city_dropdown": SEARCH_FORM,
+    "search.district_dropdown": SEARCH_FORM,
+    "search.clinic_dropdown": SEARCH_FORM,
+    "search.hospital_dropdown": SEARCH_FORM,
+    "search.submit": SEARCH_FORM,
+    "search.city_options": OPEN_DROPDOWN,
+    "search.district_options": OPEN_DROPDOWN,
+    "search.clinic_options": OPEN_DROPDOWN,
+    "search.hospital_options": OPEN_DROPDOWN,
+    "doctors.items": ".ant-list",
+    "dates.tabs": ".ant-tabs",
+    "hours.panels": ".ant-tabs-tabpane-active",
+    "hours.items": ".ant-tabs-tabpane-active",
+    "appointments.items": ".ant-list",
+    "modal.confirm_first_button": ".ant-modal-confirm-btns",
+    "modal.confirm_second_button": ".ant-modal-confirm-btns",
+    "modal.footer_second_button": ".ant-modal-footer",
+}
+
+# Returns the elements of the first strategy that matches anything (with usable set, only
+# visible and enabled elements count), and which strategy that was; null when none does.
+PROBE_SCRIPT = """
+var strategies = arguments[0], usable = arguments[1];
+for (var i = 0; i < strategies.length; i++) {
+    var elements = Array.prototype.slice.call(document.querySelectorAll(strategies[i]));
+    if (usable) {
+        elements = elements.filter(function (el) { return !el.disabled && el.getClientRects().length > 0; });
+    }
+    if (elements.length) { return {strategy: i, elements: elements}; }
+}
+return null;
+"""
+
+class LocatorBroken(Exception):
+    # None of the locator's strategies matched in its last lookups; it is failed fast
+    def __init__(self, name):
+        super().__init__(f"Locator {name} matches nothing on the page (known broken)")
+        self.name = name
+
+class LocatorRegistry:
+    """
+    The LOCATORS plus their health: which strategy last matched, hits per strategy and
+    misses. A locator whose last BROKEN_AFTER lookups found nothing while its anchor was on
+    the page (see ANCHORS) is treated as broken for BROKEN_RECHECK seconds, so lookups probe
+    it once and fail fast instead of waiting out the timeout. Health changes (a fallback
+    taking over, a locator breaking or recovering) are logged and written to
+    SELECTOR_HEALTH_FILE; a restart probes every locator afresh.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LocatorRegistry, cls).__new__(cls)
+            cls._instance.path = SELECTOR_HEALTH_FILE
+            cls._instance.lock = threading.Lock()
+            cls._instance.entries = cls._instance._load()
+        return cls._instance
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+            for entry in entries.values():
+                # history only: whether a locator is broken is decided again in this process
+                entry["broken_since"] = None
+                entry["consecutive_misses"] = 0
+            return entries
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning("Ignoring unreadable selector health file: {}", e)
+            return {}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write selector health file: {}", e)
+
+    def strategies(self, name):
+        """The locator's CSS strategies; a name that is not registered is used as CSS itself."""
+        return list(LOCATORS.get(name, (name,)))
+
+    def active(self, name):
+        """Index of the strategy that matched last (the first one until anything matched)."""
+        with self.lock:
+            entry = self.entries.get(name)
+            strategy = entry["strategy"] if entry else None
+            return strategy if strategy is not None and strategy < len(LOCATORS.get(name, (name,))) else 0
+
+    def is_broken(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+            return bool(entry and entry["broken_since"] and time.time() - entry["broken_since"] < BROKEN_RECHECK)
+
+    def record(self, name, strategy, drift=True):
+        """
+        Records a lookup that matched with the strategy-th strategy, or nothing (None).
+        A miss with drift=False (the element may legitimately be absent) is only counted.
+        """
+        if name not in LOCATORS:
+            return
+        now = time.time()
+        with self.lock:
+            entry = self.entries.setdefault(name, {
+                "strategy": None, "hits": {}, "misses": 0, "consecutive_misses": 0,
+                "last_hit_at": None, "last_miss_at": None, "broken_since": None,
+            })
+            changed = False
+            if strategy is None:
+                entry["misses"] += 1
+                entry["last_miss_at"] = now
+                if not drift:
+                    return
+                entry["consecutive_misses"] += 1
+                if entry["consecutive_misses"] >= BROKEN_AFTER:
+                    if not entry["broken_since"]:
+                        logger.warning("locator {} matched nothing in {} lookups, failing it fast for {}s", name, entry["consecutive_misses"], BROKEN_RECHECK)
+                    entry["broken_since"] = now
+                    changed = True
+            else:
+                key = str(strategy)
+                entry["hits"][key] = entry["hits"].get(key, 0) + 1
+                entry["consecutive_misses"] = 0
+                entry["last_hit_at"] = now
+                if entry["broken_since"]:
+                    logger.info("locator {} matches again", name)
+                    entry["broken_since"] = None
+                    changed = True
+                if strategy != entry["strategy"]:
+                    if strategy > 0:
+                        logger.warning("locator {} only matched by fallback {}: {}", name, strategy, LOCATORS[name][strategy])
+                    entry["strategy"] = strategy
+                    changed = True
+            if changed:
+                self._save()
+
+    def health(self):
+        with self.lock:
+            return {
+                name: dict(entry, selector=LOCATORS[name][entry["strategy"]] if entry["strategy"] is not None and entry["strategy"] < len(LOCATORS[name]) else None)
+                for name, entry in self.entries.items() if name in LOCATORS
+            }
+
+def selector_list(name):
+    """All strategies of a locator as one CSS selector list, for in-page scripts."""
+    return ", ".join(LocatorRegistry().strategies(name))
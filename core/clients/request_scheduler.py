@@ -0,0 +1,103 @@
+from collections import deque
+import itertools
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Job classes, most urgent first
+BOOKING_JOB = "booking"        # book / cancel / revert
+QUERY_JOB = "query"            # doctor / date / hour checks
+BACKGROUND_JOB = "background"  # watch polling and other work nobody is waiting on
+PRIORITIES = {BOOKING_JOB: 0, QUERY_JOB: 1, BACKGROUND_JOB: 2}
+
+# 0 means "all sessions but one", which keeps a session free for bookings
+QUERY_CONCURRENCY = int(os.getenv("MHRS_QUERY_CONCURRENCY", "0"))
+BACKGROUND_CONCURRENCY = int(os.getenv("MHRS_BACKGROUND_CONCURRENCY", "1"))
+# A waiter that can reuse an idle session's search may overtake older waiters of its class for this long
+MAX_OVERTAKE_SECONDS = 5.0
+
+class Job:
+    def __init__(self, job_class, affinity, seq):
+        self.job_class = job_class if job_class in PRIORITIES else QUERY_JOB
+        self.priority = PRIORITIES[self.job_class]
+        self.affinity = affinity
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+
+    def order(self):
+        return (self.priority, self.seq)
+
+class RequestScheduler:
+    """
+    Decides which waiter gets the next browser session: lowest priority class first, FIFO
+    within a class, with each class capped at its concurrency limit.
+
+    A waiter whose affinity (the search it is about to run) matches the page an idle session
+    is on may go ahead of older waiters of the same class, so requests for the same search run
+    back to back on the session that already shows it. Not thread-safe on its own; BrowserPool
+    calls it under its condition lock.
+    """
+    def __init__(self, size):
+        query_limit = QUERY_CONCURRENCY or max(1, size - 1)
+        self.limits = {BOOKING_JOB: size, QUERY_JOB: min(size, query_limit), BACKGROUND_JOB: min(size, max(1, BACKGROUND_CONCURRENCY))}
+        self.queue = []
+        self.running = {job_class: 0 for job_class in PRIORITIES}
+        self.completed = {job_class: 0 for job_class in PRIORITIES}
+        self.waits = {job_class: deque(maxlen=200) for job_class in PRIORITIES}
+        self.overtakes = 0
+        self.seq = itertools.count()
+
+    def enqueue(self, job_class=None, affinity=None):
+        job = Job(job_class, affinity, next(self.seq))
+        self.queue.append(job)
+        return job
+
+    def remove(self, job):
+        if job in self.queue:
+            self.queue.remove(job)
+
+    def is_next(self, job, idle_sessions):
+        """Whether job may take a session now, given the idle sessions."""
+        eligible = [j for j in self.queue if self.running[j.job_class] < self.limits[j.job_class]]
+        if job not in eligible:
+            return False
+        best = min(eligible, key=Job.order)
+        if best is job:
+            return True
+        if job.priority != best.priority or job.affinity is None:
+            return False
+        if time.monotonic() - best.enqueued_at > MAX_OVERTAKE_SECONDS:
+            return False
+        searches = [client.nav_state["search"] for client in idle_sessions]
+        if job.affinity in searches and best.affinity not in searches:
+            self.overtakes += 1
+            return True
+        return False
+
+    def start(self, job):
+        self.remove(job)
+        self.running[job.job_class] += 1
+        self.waits[job.job_class].append(time.monotonic() - job.enqueued_at)
+
+    def finish(self, job):
+        self.running[job.job_class] -= 1
+        self.completed[job.job_class] += 1
+
+    def stats(self):
+        classes = {}
+        for job_class in PRIORITIES:
+            waits = sorted(self.waits[job_class])
+            classes[job_class] = {
+                "queued": sum(1 for job in self.queue if job.job_class == job_class),
+                "running": self.running[job_class],
+                "limit": self.limits[job_class],
+                "completed": self.completed[job_class],
+                "wait_seconds": {
+                    "avg": round(sum(waits) / len(waits), 3) if waits else 0,
+                    "p95": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0,
+                    "max": round(waits[-1], 3) if waits else 0,
+                },
+            }
+        return {"queue_depth": len(self.queue), "overtakes": self.overtakes, "classes": classes}
@@ -0,0 +1,92 @@
+from selenium.webdriver.support.ui import WebDriverWait
+import time
+
+from core.clients.adaptive_timeouts import timeout_book
+from utils.tracing import tracer
+from utils.log import logger
+
+# Checked only once a wait has been pending this long, so the happy path pays nothing
+CHECK_GRACE_SECONDS = 2.0
+CHECK_INTERVAL_SECONDS = 2.0
+
+# Modal texts MHRS shows when the token is no longer accepted
+AUTH_ERROR_MARKERS = ["oturum", "tekrar giriş", "yetkisiz", "yetkiniz bulunmamaktadır"]
+
+SESSION_STATE_SCRIPT = """
+var markers = arguments[0];
+if (document.getElementById('LoginForm_username')) { return 'login_form'; }
+var modals = document.querySelectorAll('.ant-modal-body, .ant-modal-confirm-content');
+for (var i = 0; i < modals.length; i++) {
+    var text = (modals[i].innerText || '').toLocaleLowerCase('tr-TR');
+    for (var j = 0; j < markers.length; j++) {
+        if (text.indexOf(markers[j]) !== -1) { return 'auth_error_modal'; }
+    }
+}
+return null;
+"""
+
+class SessionExpired(Exception):
+    pass
+
+class CallCancelled(Exception):
+    # The tool call owning the session hit its deadline or was cancelled by the client
+    pass
+
+def detect_logout(driver):
+    """Returns why the page looks logged out ('login_form', 'auth_error_modal') or None."""
+    try:
+        return driver.execute_script(SESSION_STATE_SCRIPT, AUTH_ERROR_MARKERS)
+    except Exception:
+        return None
+
+class SessionAwareWait(WebDriverWait):
+    """
+    WebDriverWait that notices a dead MHRS session instead of waiting out the full timeout.
+
+    While a condition is still pending it periodically asks the page whether it fell back to
+    the login form or shows an auth error modal. If so the owning BrowserClient is marked as
+    logged out and SessionExpired is raised; later waits on that session fail immediately.
+    Waits also stop with CallCancelled as soon as the tool call owning the session is cancelled.
+
+    Without an explicit timeout a wait gets the one learned for its step and condition
+    (see adaptive_timeouts), falling back to the timeout the wait was created with.
+    """
+    def __init__(self, client, driver, timeout, **kwargs):
+        super().__init__(driver, timeout, **kwargs)
+        self.client = client
+
+    def until(self, method, message="", timeout=None, condition=None):
+        if not self.client.is_logged_in and self.client.session_expired:
+            raise SessionExpired("MHRS session has expired")
+        self.client.raise_if_cancelled()
+
+        started = time.monotonic()
+        last_check = started
+
+        def predicate(driver):
+            nonlocal last_check
+            self.client.raise_if_cancelled()
+            result = method(driver)
+            if result:
+                return result
+
+            now = time.monotonic()
+            if self.client.is_logged_in and now - started >= CHECK_GRACE_SECONDS and now - last_check >= CHECK_INTERVAL_SECONDS:
+                last_check = now
+                reason = detect_logout(driver)
+                if reason:
+                    logger.warning("MHRS session expired ({})", reason)
+                    self.client.mark_expired()
+                    raise SessionExpired(f"MHRS session has expired ({reason})")
+            return result
+
+        # expected_conditions are closures: "visibility_of_element_located.<locals>._predicate"
+        condition = condition or getattr(method, "__qualname__", type(method).__name__).split(".<locals>")[0].rsplit(".", 1)[-1]
+        default = self._timeout
+        with tracer.span("browser.wait", condition=condition) as span, timeout_book.limit(condition, default, timeout) as limit:
+            span.attrs["timeout"] = limit
+            self._timeout = limit
+            try:
+                return super().until(predicate, message)
+            finally:
+                self._timeout = default
@@ -0,0 +1,140 @@
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+import base64
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from utils.log import logger
+
+load_dotenv()
+
+SESSION_FILE = os.path.expanduser(os.getenv("MHRS_SESSION_FILE", "~/.mhrs-mcp/session.bin"))
+SESSION_MAX_AGE = float(os.getenv("MHRS_SESSION_MAX_AGE", str(12 * 60 * 60)))
+
+STORAGE_SNAPSHOT_SCRIPT = """
+function dump(storage) {
+    var data = {};
+    for (var i = 0; i < storage.length; i++) {
+        var key = storage.key(i);
+        data[key] = storage.getItem(key);
+    }
+    return data;
+}
+return {local: dump(window.localStorage), session: dump(window.sessionStorage)};
+"""
+
+STORAGE_RESTORE_SCRIPT = """
+var snapshot = arguments[0];
+Object.keys(snapshot.local || {}).forEach(function (k) { window.localStorage.setItem(k, snapshot.local[k]); });
+Object.keys(snapshot.session || {}).forEach(function (k) { window.sessionStorage.setItem(k, snapshot.session[k]); });
+"""
+
+class SessionStore:
+    """
+    Encrypted on-disk snapshot of an authenticated MHRS session.
+
+    Holds the cookies plus the SPA's localStorage/sessionStorage (where the auth token lives)
+    so a fresh driver can skip the username/password flow. The file is encrypted with a key
+    taken from MHRS_SESSION_KEY, or derived from the MHRS credentials when that is unset.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(SessionStore, cls).__new__(cls)
+            cls._instance.path = SESSION_FILE
+            cls._instance.max_age = SESSION_MAX_AGE
+            cls._instance.lock = threading.Lock()
+            cls._instance._fernets = {}
+        return cls._instance
+
+    def _fernet(self, salt):
+        if salt not in self._fernets:
+            secret = os.getenv("MHRS_SESSION_KEY") or f"{os.getenv('MHRS_USERNAME')}:{os.getenv('MHRS_PASSWORD')}"
+            kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=390000)
+            key = base64.urlsafe_b64encode(kdf.derive(secret.encode("utf-8")))
+            self._fernets[salt] = Fernet(key)
+        return self._fernets[salt]
+
+    def save(self, driver, logged_in_at=None):
+        """Saves the driver's session; logged_in_at is the time.time() of its login, now by default."""
+        try:
+            now = time.time()
+            snapshot = {
+                "saved_at": now,
+                "logged_in_at": logged_in_at or now,
+                "cookies": driver.get_cookies(),
+                "storage": driver.execute_script(STORAGE_SNAPSHOT_SCRIPT),
+            }
+            salt = os.urandom(16)
+            token = self._fernet(salt).encrypt(json.dumps(snapshot).encode("utf-8"))
+            payload = json.dumps({"salt": base64.b64encode(salt).decode("ascii"), "token": token.decode("ascii")})
+
+            with self.lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self.path)
+            logger.debug("saved session snapshot")
+            return True
+        except Exception as e:
+            logger.warning("Could not save session snapshot: {}", e)
+            return False
+
+    def load(self):
+        try:
+            with self.lock:
+                with open(self.path) as f:
+                    payload = json.load(f)
+            salt = base64.b64decode(payload["salt"])
+            snapshot = json.loads(self._fernet(salt).decrypt(payload["token"].encode("ascii")))
+        except FileNotFoundError:
+            return None
+        except (InvalidToken, ValueError, KeyError) as e:
+            logger.warning("Discarding unreadable session snapshot: {}", type(e).__name__)
+            self.clear()
+            return None
+
+        if time.time() - snapshot.get("saved_at", 0) > self.max_age:
+            logger.info("session snapshot is too old, discarding it")
+            self.clear()
+            return None
+        return snapshot
+
+    def restore(self, driver, max_login_age=None):
+        """
+        Injects the saved cookies and storage into a driver already on the MHRS origin and
+        returns the time.time() the saved session logged in at, or None when there is none or
+        its login is older than max_login_age seconds.
+        """
+        snapshot = self.load()
+        if snapshot is None:
+            return None
+        logged_in_at = snapshot.get("logged_in_at", snapshot.get("saved_at", 0))
+        if max_login_age is not None and time.time() - logged_in_at > max_login_age:
+            logger.info("saved session is about to expire, discarding it")
+            self.clear()
+            return None
+
+        for cookie in snapshot["cookies"]:
+            cookie.pop("sameSite", None)  # Firefox rejects some values it reported itself
+            try:
+                driver.add_cookie(cookie)
+            except Exception as e:
+                logger.warning("Could not restore cookie {}: {}", cookie.get('name'), e)
+        driver.execute_script(STORAGE_RESTORE_SCRIPT, snapshot["storage"])
+        driver.refresh()
+        return logged_in_at
+
+    def clear(self):
+        with self.lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
@@ -1,11 +1,31 @@
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import NoSuchElementException
 
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import functools
 import json
-from core.clients.browser_client import BrowserClient
-from utils.string_utils import normalize_string_to_lower
+import re
+import threading
+import time
+from core.clients.browser_pool import browser, BrowserPool, scheduled
+from core.clients.request_scheduler import BOOKING_JOB, QUERY_JOB
+from core.clients.browser_client import (
+    MHRS_URL, HOME_PAGE, SEARCH_FORM_PAGE, DOCTOR_LIST_PAGE, DOCTOR_DATES_PAGE, DAY_HOURS_PAGE
+)
+from utils.string_utils import normalize_string_to_lower, fold_for_search, parse_main_hour
 from core.clients.auth_client import AuthClient
+from core.clients.event_waits import ClickError
+from core.clients.session_monitor import SessionExpired, CallCancelled
+from core.clients.locators import LocatorBroken, selector_list
+from core.clients.http_client import HttpMhrsClient, HttpBackendError, HttpAppointmentError
+from core.services.page_snapshot import snapshot_lines
+from core.services.catalog_cache import CatalogCache, NOT_FOUND_STATUS, find_option
+from core.services.availability_cache import AvailabilityCache, WAIT_SLICE, TTLS
+from utils.name_index import name_index, no_match
+from utils.tracing import tracer, traced
+from utils.log import logger
 
 from core.services.user_service import (
     select_city, select_ilce, select_clinic, select_hospital, 
@@ -20,103 +40,104 @@ from utils.selection_status import SelectionStatus
 from utils.appointment_status import AppointmentStatus
 from utils.status import Status
 
-browser = BrowserClient()
 auth_client = AuthClient()
+browser_pool = BrowserPool()
+http_client = HttpMhrsClient()
+catalog = CatalogCache()
+availability_cache = AvailabilityCache()
+
+RESULT_PAGES = (DOCTOR_LIST_PAGE, DOCTOR_DATES_PAGE, DAY_HOURS_PAGE)
+
+def _search_affinity(city_name, town_name, clinic, hospital, *args, **kwargs):
+    # scheduler affinity of an entry point that starts with a search
+    return _search_key(city_name, town_name, clinic, hospital)
 
+@traced()
 def accept_appointment():
-    print("executing accept_appointment func")
-    button_selector = ".ant-modal-confirm-btns > button:nth-child(2)"
-    browser.click_button(button_selector)
-    print("appointment ACCEPT button successfully clicked")
+    logger.debug("executing accept_appointment func")
+    browser.click_button("modal.confirm_second_button")
+    logger.debug("appointment ACCEPT button successfully clicked")
 
     # Inner function to verify appointment
     def verify_appointment():
-        print("executing verify_appointment func")
-        button_selector = ".ant-modal-footer > div:nth-child(1) > button:nth-child(2)"
-        browser.click_button(button_selector)
-        print("appointment VERIFY button successfully clicked")
+        logger.debug("executing verify_appointment func")
+        browser.click_button("modal.footer_second_button")
+        logger.debug("appointment VERIFY button successfully clicked")
         
     verify_appointment()
     force_appointment()
 
+@traced()
 def has_successfully_booked_appointment():
     success_code = "RND5036"
-    div_selector = ".ant-modal-confirm > div:nth-child(2)"
     try:
-        element = browser.driver.find_element(By.CSS_SELECTOR, div_selector)
-        if success_code in element.text:
+        element = browser.find("modal.confirm_message", required=False)
+        if element is not None and success_code in element.text:
+            logger.info("successfully booked appointment")
             #click ok
-            ok_button_selector = ".ant-modal-confirm-btns > button:nth-child(1)"
-            browser.click_button(ok_button_selector)
-            print("successfully booked appointment")
+            try:
+                browser.click_button("modal.confirm_first_button")
+            except ClickError as e:
+                logger.warning("booked, but could not close the confirmation: {}", e)
             return True
         else:
-            print("failed to book appointment")
+            logger.warning("failed to book appointment")
             return False
     except Exception as e:
-        print("failed to book appointment with error", e)
+        logger.warning("failed to book appointment with error {}", e)
         return False
 
 def has_available_appointment():
     ANY_ERROR = "RND"
-    MODAL_SELECTOR = ".ant-modal-body"
-    OK_BUTTON_SELECTOR = ".ant-modal-confirm-btns > button:nth-child(1)"
 
     try:
-        element = browser.driver.find_element(By.CSS_SELECTOR, MODAL_SELECTOR)
+        element = browser.find("modal.body", required=False)
+        if element is None:
+            logger.debug("No modal found — assuming appointments may be available.")
+            return True
         if ANY_ERROR in element.text:
-            print("Found error starting with RND in modal.")
+            logger.info("Found error starting with RND in modal.")
             return False
         else:
-            print("Modal found but RND not in message. Appointments may be available.")
+            logger.debug("Modal found but RND not in message. Appointments may be available.")
             return True
 
-    except NoSuchElementException:
-        print("No modal found — assuming appointments may be available.")
-        return True
-
     except Exception as e:
-        print("Unexpected error checking appointments:", e)
+        logger.warning("Unexpected error checking appointments: {}", e)
         return False  # or raise, depending on desired behavior
     
 def accept_notification_modal():
     try:
-        ACCEPT_BUTTON_SELECTOR = "button.ant-btn-primary:nth-child(2)"
-        browser.click_button(ACCEPT_BUTTON_SELECTOR)
+        browser.click_button("modal.notification_accept", required=False)
         return True
     except Exception as e:
-        print(f"Failed to accept notification modal: {e}")
+        logger.warning("Failed to accept notification modal: {}", e)
         return False
 
 def modal_has_error_code(error_code):
-    MODAL_SELECTOR = ".ant-modal-body"
-    
     try:
-        element = browser.driver.find_element(By.CSS_SELECTOR, MODAL_SELECTOR)
-        if error_code in element.text:
+        element = browser.find("modal.body", required=False)
+        if element is not None and error_code in element.text:
             return True
         else:
             return False
     except Exception as e:
-        print(f"Failed to detect browser element with MODAL_SELECTOR: {MODAL_SELECTOR} for error code: {error_code}.")
+        logger.debug("Failed to read the modal for error code {}: {}", error_code, e)
         return False
 
 def modal_has_any_error():
     return modal_has_error_code("RND")
 
 def has_modal():
-    MODAL_SELECTOR = ".ant-modal-body"
     try:
-        browser.driver.find_element(By.CSS_SELECTOR, MODAL_SELECTOR)
-        return True
+        return browser.find("modal.body", required=False) is not None
     except Exception as e:
         return False
     
 def return_modal_text():
-    MODAL_SELECTOR = ".ant-modal-confirm-content"
     try:
-        element = browser.driver.find_element(By.CSS_SELECTOR, MODAL_SELECTOR)
-        return element.text
+        element = browser.find("modal.content", required=False)
+        return element.text if element is not None else None
     except Exception as e:
         return None
     
@@ -127,31 +148,31 @@ def get_modal_text_if_present():
         return {"status": Status.FAILURE}
 
 def reject_appointment():
-    print("executing reject_appointment func")
-    button_selector = ".ant-modal-confirm-btns > button:nth-child(1)"
-    browser.click_button(button_selector)
-    print("appointment REJECT button successfully clicked")
+    logger.debug("executing reject_appointment func")
+    browser.click_button("modal.confirm_first_button")
+    logger.debug("appointment REJECT button successfully clicked")
 
 # if exceeded max appointment    count, enforce replacement appointment taking
+@traced()
 def force_appointment():
     randevu_degistirme_pop_up_code = "RND5015"
-    exceeded_max_app_count_pop_up_selector = "div.ant-modal-body:nth-child(2)"
     try:
-        element = browser.driver.find_element(By.CSS_SELECTOR, exceeded_max_app_count_pop_up_selector)
-        if randevu_degistirme_pop_up_code in element.text:
-            print("found text", element.text)
-            ok_button_selector = ".ant-modal-confirm-btns > button:nth-child(2)"
-            browser.click_button(ok_button_selector)
+        element = browser.find("modal.second_body", required=False)
+        if element is not None and randevu_degistirme_pop_up_code in element.text:
+            logger.info("found text {}", element.text)
+            browser.click_button("modal.confirm_second_button")
             return True
         else:
-            print("max count exceeded pop up did not appear")
+            logger.debug("max count exceeded pop up did not appear")
             return False
     except Exception:
-        print("max count exceeded pop up did not appear")
+        logger.debug("max count exceeded pop up did not appear")
         return False
 
+@scheduled(BOOKING_JOB)
+@traced()
 def cancel_appointment(appointment_identifier):
-    auth_client.check_login()
+    auth_client.check_login(browser)
     
     """
     Cancels an existing appointment that matches the given identifier string.
@@ -173,29 +194,39 @@ def cancel_appointment(appointment_identifier):
     """
     
     appointment_identifier = normalize_string_to_lower(appointment_identifier)
-    print(f"executing cancel appointment func for identifier {appointment_identifier}")
+    logger.info("executing cancel appointment func for identifier {}", appointment_identifier)
     try:
     # navigate to mainpage
-        browser.driver.get("https://mhrs.gov.tr/vatandas/#/")
+        browser.driver.get(MHRS_URL)
+        browser.reset_nav_state(HOME_PAGE)
+        # the appointment list is fetched after the page loads
+        browser.wait_loading_screen()
             
-        browser.driver.find_element(By.CSS_SELECTOR, ".ant-list-items")
+        if browser.find("appointments.list", required=False) is None:
+            logger.info("You don't have any appointments to cancel for identifier {}", appointment_identifier)
+            return False
         
-        appointments = browser.driver.find_elements(By.CSS_SELECTOR, ".ant-list-items li")
-        browser.wait_loading_screen()
+        appointments = browser.find_all("appointments.items", required=False)
         for appointment in appointments:
-            if appointment_identifier in normalize_string_to_lower(appointment.text) and "Geri Alınabilir Randevu" not in appointment.text:
-                browser.click_button(".ant-btn-danger") # cancel button
-                browser.click_button(".ant-btn-primary") # verify button
-                browser.click_button(".ant-btn-primary") # ok button
+            appointment_text = appointment.text
+            if appointment_identifier in normalize_string_to_lower(appointment_text) and "Geri Alınabilir Randevu" not in appointment_text:
+                browser.click_button("appointments.cancel_button") # cancel button
+                browser.click_button("appointments.primary_button") # verify button
+                browser.click_button("appointments.primary_button") # ok button
+                availability_cache.invalidate()  # the freed slot could be in any cached answer
                 return True
         return False
+    except (ClickError, LocatorBroken) as e:
+        logger.warning("Could not cancel the appointment for identifier {}: {}", appointment_identifier, e)
+        raise
     except Exception as e:  
-        print(e)
-        print(f"You don't have any appointments to cancel for identifier {appointment_identifier}.")
+        logger.info("You don't have any appointments to cancel for identifier {}: {}", appointment_identifier, e)
         return False
 
+@scheduled(BOOKING_JOB)
+@traced()
 def revert_appointment(appointment_identifier):
-    auth_client.check_login()
+    auth_client.check_login(browser)
     
     """
     Reverts a pending or recently modified appointment that matches the given identifier.
@@ -216,27 +247,36 @@ def revert_appointment(appointment_identifier):
     """
     
     appointment_identifier = normalize_string_to_lower(appointment_identifier)
-    print(f"executing revert appointment func for identifier {appointment_identifier}")
+    logger.info("executing revert appointment func for identifier {}", appointment_identifier)
     # navigate to mainpage
     
     try:
-        browser.driver.get("https://mhrs.gov.tr/vatandas/#/")
+        browser.driver.get(MHRS_URL)
+        browser.reset_nav_state(HOME_PAGE)
+        # the appointment list is fetched after the page loads
+        browser.wait_loading_screen()
             
-        browser.driver.find_element(By.CSS_SELECTOR, ".ant-list-items")
+        if browser.find("appointments.list", required=False) is None:
+            logger.info("You don't have any revertable appointments for identifier {}", appointment_identifier)
+            return False
         
-        appointments = browser.driver.find_elements(By.CSS_SELECTOR, ".ant-list-items li")
-        browser.wait_loading_screen()
+        appointments = browser.find_all("appointments.items", required=False)
         for appointment in appointments:
             if appointment_identifier in normalize_string_to_lower(appointment.text):
-                browser.click_button(".ant-btn-primary") # cancel button
-                browser.click_button(".ant-modal-confirm-btns > button:nth-child(1)") # ok button
+                browser.click_button("appointments.primary_button") # cancel button
+                browser.click_button("modal.confirm_first_button") # ok button
+                availability_cache.invalidate()
                 return True
         return False
+    except (ClickError, LocatorBroken) as e:
+        logger.warning("Could not revert the appointment for identifier {}: {}", appointment_identifier, e)
+        raise
     except Exception as e:
-        print(e)
-        print(f"You don't have any revertable appointments for identifier {appointment_identifier}, sorry :/")
+        logger.info("You don't have any revertable appointments for identifier {}: {}", appointment_identifier, e)
         return False
 
+@scheduled(QUERY_JOB)
+@traced()
 def get_active_appointments():
     """
     Fetches and returns a list of active appointments for the currently logged-in user from the MHRS system.
@@ -245,25 +285,26 @@ def get_active_appointments():
         str or None: A JSON-formatted string containing the user's active appointment data.
                      If no appointments are found or an error occurs, returns None and logs the error.
     """
-    auth_client.check_login()
-    print("logged in")
+    auth_client.check_login(browser)
         
     try:
         
-        browser.driver.get("https://mhrs.gov.tr/vatandas/#/")
+        browser.driver.get(MHRS_URL)
+        browser.reset_nav_state(HOME_PAGE)
         
         browser.wait_loading_screen() 
     
-        browser.driver.find_element(By.CSS_SELECTOR, ".ant-list-items li")
-        appointments_list = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".ant-list-items li")))
+        item_selector, items = browser.locate("appointments.items", required=False)
+        if not items:
+            logger.warning("Error fetching active appointments: no appointment list on the page")
+            return False
+        appointments_list = snapshot_lines(item_selector)
         
-        print("appointments_list size:", len(appointments_list))
-        # Print out the text of each appointment
+        logger.info("found {} active appointments", len(appointments_list))
         appointments_data = []  # List to store all appointment data
 
         # Loop through each appointment and store its data
-        for appointment in appointments_list:
-            data = appointment.text.splitlines()
+        for data in appointments_list:
             appointment_data = {
                 "datetime": data[0],
                 "status": data[1],
@@ -276,19 +317,19 @@ def get_active_appointments():
             appointments_data.append(appointment_data)  # Add the appointment data to the list
 
         # Convert the list of appointment data into a JSON string
-        appointments_json = json.dumps(appointments_data, ensure_ascii=False, indent=4)
-        
-        print("Appointments saved to JSON:")
-        print(appointments_json)
-        
-        return appointments_json
+        return json.dumps(appointments_data, ensure_ascii=False)
     except Exception as e:
-        print(f"Error fetching active appointments: {e}")
+        logger.warning("Error fetching active appointments: {}", e)
         return False
         #return json.dumps([], ensure_ascii=False) 
         
-def appointment_doctor_available(city_name, town_name, clinic, hospital):
-    auth_client.check_login()
+@scheduled(QUERY_JOB, _search_affinity)
+@traced()
+def appointment_doctor_available(city_name, town_name, clinic, hospital, refresh=False):
+    not_found = catalog.precheck(city_name, town_name, clinic, hospital)
+    if not_found:
+        return not_found
+    auth_client.check_login(browser)
     """
     Lists available doctors for a given location and clinic on the MHRS system.
 
@@ -301,6 +342,7 @@ def appointment_doctor_available(city_name, town_name, clinic, hospital):
         town_name (str): Name of the district/town (e.g., "URLA")
         clinic (str): Name or partial name of the clinic (e.g., "CİLDİYE")
         hospital (str): Name or partial name of the hospital (e.g., "URLA")
+        refresh (bool): Search again even when the session still shows recent results of this search
 
     Returns:
         str or None: A message if there are no available appointments, otherwise prints available doctors
@@ -313,48 +355,108 @@ def appointment_doctor_available(city_name, town_name, clinic, hospital):
         - Assumes the user is already logged in via Selenium session.
         - Uses `wait_loading_screen()` and WebDriverWait to handle dynamic content loading.
         - Does not select a doctor or attempt to book; only lists available options.
+        - A name that selects no option, or several, returns a `*_NOT_FOUND` status with
+          `ambiguous` and the candidate options as `suggestions`; against a fresh catalog
+          cache without touching the browser.
     """
-    print(f"list_available_doctors city={city_name}, town={town_name}, clinic={clinic}, hospital={hospital}")
-    genel_randevu_arama()
-    browser.wait_warping() #works
-    
-    status = select_city(city_name)
-    if status != SelectionStatus.SUCCESS:
-        return {"status": SelectionStatus.CITY_NOT_FOUND}
-    
-    status = select_ilce(town_name)
-    if status != SelectionStatus.SUCCESS:
-        return {"status": SelectionStatus.TOWN_NOT_FOUND}
-    
-    status = select_clinic(clinic)
-    print(f"select_clinic status: {status}")
-    if status != SelectionStatus.SUCCESS:
-        return {"status": SelectionStatus.CLINIC_NOT_FOUND}
-    
-    print("I SHOULD NOT BE SEEING THIS")
-    status = select_hospital(hospital)
-    if status != SelectionStatus.SUCCESS:
-        return {"status": SelectionStatus.HOSPITAL_NOT_FOUND}
+    logger.info("list_available_doctors city={}, town={}, clinic={}, hospital={}", city_name, town_name, clinic, hospital)
+    search = _search_key(city_name, town_name, clinic, hospital)
+    state = browser.nav_state
+    if _results_reusable(search, refresh) and state["page"] in RESULT_PAGES and state["doctors"] and _page_shows(f"{selector_list('doctors.list')}, {selector_list('dates.tabs')}"):
+        logger.debug("search results for this selection are already on the page, reusing them")
+        return {"status": SelectionStatus.SUCCESS, "doctors": state["doctors"]}
+
+    # Dropdowns that already hold the wanted value are left alone
+    if state["page"] == SEARCH_FORM_PAGE:
+        done = 0
+        while done < len(state["form"]) and state["form"][done] == search[done]:
+            done += 1
+    else:
+        _go_home()
+        genel_randevu_arama()
+        browser.wait_warping() #works
+        browser.set_nav_state(page=SEARCH_FORM_PAGE, form=())
+        done = 0
+
+    selections = [
+        (select_city, city_name),
+        (select_ilce, town_name),
+        (select_clinic, clinic),
+        (select_hospital, hospital),
+    ]
+    for step in range(done, len(selections)):
+        select, name = selections[step]
+        response = select(name)
+        logger.debug("{} status: {}", select.__name__, response["status"])
+        if response["status"] != SelectionStatus.SUCCESS:
+            _close_open_dropdown()
+            browser.set_nav_state(form=search[:step])
+            return response
+        browser.set_nav_state(form=search[:step + 1])
     
-    print("PASS")
     click_on_appointment_search_button()
+    browser.set_nav_state(page=DOCTOR_LIST_PAGE, search=search, searched_at=time.monotonic(), doctors=None, doctor=None, date=None)
     
     if has_available_appointment():
         try:
             doctors = fetch_all_available_doctor_names()
+            browser.set_nav_state(doctors=doctors)
             return {"status": SelectionStatus.SUCCESS, "doctors": doctors}
         except Exception as e:
             return {"status": SelectionStatus.ERROR, "error": "Doctor fetch failed", "exception": str(e)}
     elif modal_has_error_code("RND4030"):
+        browser.reset_nav_state()
         return {"status": AppointmentStatus.NOTIFY_WHEN_AVAILABLE, "doctors": []}
     elif has_modal():
+        browser.reset_nav_state()
         return {"status": Status.SHOW_MESSAGE, "text": return_modal_text()}
     
     return {"status": AppointmentStatus.NO_AVAILABLE_APPOINTMENT, "doctors": []}  # success, but no available appointments
 
+def _search_key(city_name, town_name, clinic, hospital):
+    return tuple(fold_for_search(name) for name in (city_name, town_name, clinic, hospital))
+
+def _results_reusable(search, refresh=False):
+    # The results already open stand in for a new search only while the cache would keep their answer
+    state = browser.nav_state
+    if refresh or state["search"] != search or state["searched_at"] is None:
+        return False
+    return time.monotonic() - state["searched_at"] < TTLS["doctors"]
+
+def _page_shows(css_selector):
+    return bool(browser.driver.find_elements(By.CSS_SELECTOR, css_selector))
+
+def _go_home():
+    if browser.nav_state["page"] == HOME_PAGE:
+        return
+    browser.driver.get(MHRS_URL)
+    browser.wait_loading_screen()
+    browser.reset_nav_state(HOME_PAGE)
+
+def _close_open_dropdown():
+    try:
+        browser.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
+    except Exception as e:
+        logger.debug("Could not close dropdown: {}", e)
+
+def _return_to_doctor_list():
+    """Goes from a doctor's date page back to the result list of the same search."""
+    browser.driver.back()
+    browser.wait_loading_screen()
+    if browser.find("doctors.items", required=False) is not None:
+        browser.set_nav_state(page=DOCTOR_LIST_PAGE, doctor=None, date=None)
+        return True
+
+    logger.info("browser back did not land on the doctor list, searching again")
+    search = browser.nav_state["search"]
+    browser.reset_nav_state()
+    return appointment_doctor_available(*search)["status"] == SelectionStatus.SUCCESS
+
 def all_selections_successful(*results):
     return all(r["status"] == True for r in results)
 
+@scheduled(BOOKING_JOB)
+@traced()
 def appointment_book_time(appointment_hour):
     """
     Attempts to book an appointment at the specified hour.
@@ -380,12 +482,42 @@ def appointment_book_time(appointment_hour):
     """
     appointment_hour = normalize_to_hour_format(appointment_hour)
     if select_main_hour_slot(appointment_hour) and select_sub_hour_slot(appointment_hour):
+        # the booking modals take the page out of the funnel
+        availability_cache.invalidate(browser.nav_state["search"])
+        browser.reset_nav_state()
         accept_appointment()
         return has_successfully_booked_appointment()
-    print(f"Could not book appointment at {appointment_hour}")
+    logger.info("Could not book appointment at {}", appointment_hour)
     return False
 
-def appointment_doctor_available_dates(doctor_name):
+@scheduled(BOOKING_JOB, _search_affinity)
+@traced()
+def book_appointment(city_name, town_name, clinic, hospital, doctor_name, appointment_date, appointment_hour):
+    """
+    Runs the whole booking flow: search, doctor, date, then the booking of the given hour.
+
+    Returns:
+        dict: {'status': AppointmentStatus.SUCCESS} when booked, otherwise the status of the
+              step that failed.
+    """
+    response = appointment_doctor_available(city_name, town_name, clinic, hospital)
+    if not response["status"] == SelectionStatus.SUCCESS:
+        return response
+
+    if not appointment_doctor_available_dates(doctor_name):
+        return _doctor_failure(AppointmentStatus.NO_DOCTOR_AVAILABLE, response["doctors"], doctor_name)
+
+    if not appointment_available_hours_on(appointment_date):
+        return {"status": AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR}
+
+    if not appointment_book_time(appointment_hour):
+        return {"status": AppointmentStatus.NO_AVAILABLE_HOURS_ON_DATE}
+
+    return {"status": AppointmentStatus.SUCCESS}
+
+@scheduled(QUERY_JOB)
+@traced()
+def appointment_doctor_available_dates(doctor_name, refresh=False):
     """
     Lists all available appointment dates for a given doctor.
 
@@ -396,6 +528,7 @@ def appointment_doctor_available_dates(doctor_name):
     Args:
         doctor_name (str): The name (or part of the name) of the doctor to search for (e.g., "eylem")
         appointment_date (str): The desired appointment date in "DD.MM.YYYY" format (e.g., "30.04.2025")
+        refresh (bool): Search again instead of reusing the date tabs or result list already open
 
     Returns:
         str or None: Returns an error message string if the doctor or date is not found,
@@ -410,16 +543,33 @@ def appointment_doctor_available_dates(doctor_name):
         - Uses `fetch_available_appointment_dates()` and `select_day()` to find valid dates.
         - Uses `list_all_available_hours_of_a_day()` to print time slots for the selected date.
     """
-    auth_client.check_login()
-    print(f"executing appointment_doctor_available_dates func for doctor_name={doctor_name}")
+    auth_client.check_login(browser)
+    logger.info("executing appointment_doctor_available_dates func for doctor_name={}", doctor_name)
+    doctor_key = fold_for_search(doctor_name)
+    state = browser.nav_state
+    if state["page"] in (DOCTOR_DATES_PAGE, DAY_HOURS_PAGE):
+        fresh = _results_reusable(state["search"], refresh)
+        if fresh and state["doctor"] == doctor_key:
+            logger.debug("doctor is already selected, reusing its date tabs")
+            return fetch_available_appointment_dates()
+        if not fresh:
+            logger.debug("results on the page are too old to reuse, searching again")
+            if appointment_doctor_available(*state["search"], refresh=True)["status"] != SelectionStatus.SUCCESS:
+                return False
+        elif not _return_to_doctor_list():
+            return False
+
     if not select_doctor(doctor_name):
-        print(f"Could not find the doctor you are looking for: {doctor_name}")
+        logger.info("Could not find the doctor you are looking for: {}", doctor_name)
         return False
+    browser.set_nav_state(page=DOCTOR_DATES_PAGE, doctor=doctor_key, date=None)
     
     return fetch_available_appointment_dates()
 
+@scheduled(QUERY_JOB)
+@traced()
 def appointment_available_hours_on(appointment_date):
-    auth_client.check_login()
+    auth_client.check_login(browser)
     """
     Lists all available appointment hours for a given doctor on a specific date.
 
@@ -447,10 +597,387 @@ def appointment_available_hours_on(appointment_date):
     appointment_date = normalize_date_format(appointment_date)
     day = select_day(appointment_date)
     if not day:
-        print(f"Could not find available appointments on the date you are looking for: {appointment_date}")
+        logger.info("Could not find available appointments on the date you are looking for: {}", appointment_date)
         return False
     
     click_on_a_day(day)
+    browser.set_nav_state(page=DAY_HOURS_PAGE, date=appointment_date)
     
     #list_all_available_hours_of_a_day(day)
-    return fetch_all_available_time_slots_of_a_day()
\ No newline at end of file
+    return fetch_all_available_time_slots_of_a_day()
+def _match_option(options, name):
+    index = find_option([option["name"] for option in options], name)
+    return options[index] if index is not None else None
+
+def _option_not_found(level, parents, options, name):
+    catalog.note_missing(level, parents, name)
+    return no_match(NOT_FOUND_STATUS[level], [option["name"] for option in options], name), None
+
+def _doctor_failure(status, doctors, doctor_name):
+    # lists the candidate doctors when the name is why the step failed
+    names = [doctor["doctor"] for doctor in doctors or []]
+    if name_index(names).best(doctor_name) is None:
+        return no_match(status, names, doctor_name)
+    return {"status": status}
+
+def _pad_date(date_str):
+    day, month, year = normalize_date_format(date_str).split(".")
+    return f"{int(day):02d}.{int(month):02d}.{year}"
+
+def _group_by_main_hour(clocks):
+    hours = []
+    for clock in clocks:
+        main_hour = f"{parse_main_hour(clock)}:00"
+        if not hours or hours[-1]["main_hour"] != main_hour:
+            hours.append({"main_hour": main_hour, "sub_hours": []})
+        hours[-1]["sub_hours"].append({"sub_hour": clock})
+    return hours
+
+def _http_options(level, parents, options):
+    catalog.record(level, parents, [o["name"] for o in options], [o["id"] for o in options])
+    return options
+
+@traced()
+def _http_search(city_name, town_name, clinic, hospital):
+    """Resolves the four dropdown names to MHRS ids over HTTP, like the browser funnel does by text."""
+    search = (city_name, town_name, clinic, hospital)
+    cities = _http_options("cities", (), http_client.cities())
+    city = _match_option(cities, city_name)
+    if not city:
+        return _option_not_found("cities", (), cities, city_name)
+    towns = _http_options("districts", search[:1], http_client.districts(city["id"]))
+    town = _match_option(towns, town_name)
+    if not town:
+        return _option_not_found("districts", search[:1], towns, town_name)
+    clinics = _http_options("clinics", search[:2], http_client.clinics(city["id"], town["id"]))
+    clinic_option = _match_option(clinics, clinic)
+    if not clinic_option:
+        return _option_not_found("clinics", search[:2], clinics, clinic)
+    hospitals = _http_options("hospitals", search[:3], http_client.hospitals(city["id"], town["id"], clinic_option["id"]))
+    hospital_option = _match_option(hospitals, hospital)
+    if not hospital_option:
+        return _option_not_found("hospitals", search[:3], hospitals, hospital)
+    return None, {"city_id": city["id"], "district_id": town["id"], "clinic_id": clinic_option["id"], "hospital_id": hospital_option["id"]}
+
+@traced()
+def _http_doctors(search):
+    try:
+        doctors = http_client.search_doctors(search["city_id"], search["district_id"], search["clinic_id"], search["hospital_id"])
+    except HttpAppointmentError as e:
+        if e.code == "RND4030":
+            return {"status": AppointmentStatus.NOTIFY_WHEN_AVAILABLE, "doctors": []}
+        return {"status": Status.SHOW_MESSAGE, "text": e.message}
+    if not doctors:
+        return {"status": AppointmentStatus.NO_AVAILABLE_APPOINTMENT, "doctors": []}
+    return {"status": SelectionStatus.SUCCESS, "doctors": doctors}
+
+@traced()
+def _http_doctor_slots(city_name, town_name, clinic, hospital, doctor_name):
+    error, search = _http_search(city_name, town_name, clinic, hospital)
+    if error:
+        return error, None
+    response = _http_doctors(search)
+    if response["status"] != SelectionStatus.SUCCESS:
+        return response, None
+
+    index = name_index([d["doctor"] for d in response["doctors"]]).best(doctor_name)
+    if index is None:
+        return _doctor_failure(AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR, response["doctors"], doctor_name), None
+    doctor = response["doctors"][index]
+    return None, http_client.free_slots(doctor["id"], search["clinic_id"], search["hospital_id"])
+
+def _with_http_backend(http_func, browser_func, *args):
+    # Read-only queries go over HTTP when a token is available, and fall back to the browser otherwise
+    not_found = catalog.precheck(*args[:4])
+    if not_found:
+        return not_found
+    if http_client.is_available():
+        try:
+            return http_func(*args)
+        except HttpBackendError as e:
+            logger.warning("MHRS HTTP backend failed, falling back to the browser: {}", e)
+    return browser_func(*args)
+
+def _http_query_doctors(city_name, town_name, clinic, hospital):
+    error, search = _http_search(city_name, town_name, clinic, hospital)
+    return error or _http_doctors(search)
+
+def _browser_query_doctors(city_name, town_name, clinic, hospital, refresh=False):
+    return appointment_doctor_available(city_name, town_name, clinic, hospital, refresh=refresh)
+
+@scheduled(QUERY_JOB, _search_affinity)
+@traced()
+def query_available_doctors(city_name, town_name, clinic, hospital, refresh=False):
+    """
+    Lists available doctors for a location and clinic, over HTTP when possible.
+    Answers are cached briefly and identical concurrent queries share one run; refresh=True
+    always asks MHRS again, also when the session still shows results of the search.
+
+    Returns the same dict as `appointment_doctor_available()`.
+    """
+    return availability_cache.get_or_load(
+        "doctors", (city_name, town_name, clinic, hospital),
+        lambda: _with_http_backend(_http_query_doctors, functools.partial(_browser_query_doctors, refresh=refresh), city_name, town_name, clinic, hospital),
+        refresh=refresh,
+    )
+
+def _http_query_dates(city_name, town_name, clinic, hospital, doctor_name):
+    error, slots = _http_doctor_slots(city_name, town_name, clinic, hospital, doctor_name)
+    if error:
+        return error
+    if not slots:
+        return {"status": AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR}
+    return {"status": AppointmentStatus.SUCCESS, "data": [{"date": date} for date in slots]}
+
+def _browser_query_dates(city_name, town_name, clinic, hospital, doctor_name):
+    response = appointment_doctor_available(city_name, town_name, clinic, hospital)
+    if not response["status"] == SelectionStatus.SUCCESS:
+        return response
+
+    available_dates = appointment_doctor_available_dates(doctor_name)
+    if not available_dates:
+        return _doctor_failure(AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR, response["doctors"], doctor_name)
+
+    return {"status": AppointmentStatus.SUCCESS, "data": available_dates}
+
+@scheduled(QUERY_JOB, _search_affinity)
+@traced()
+def query_available_dates(city_name, town_name, clinic, hospital, doctor_name):
+    """
+    Lists the dates a doctor has free slots on, over HTTP when possible.
+
+    Returns:
+        dict: {'status': AppointmentStatus.SUCCESS, 'data': [{'date': ...}, ...]} or an error status.
+    """
+    return availability_cache.get_or_load(
+        "dates", (city_name, town_name, clinic, hospital, doctor_name),
+        lambda: _with_http_backend(_http_query_dates, _browser_query_dates, city_name, town_name, clinic, hospital, doctor_name),
+    )
+
+def _http_query_hours(city_name, town_name, clinic, hospital, doctor_name, appointment_date):
+    error, slots = _http_doctor_slots(city_name, town_name, clinic, hospital, doctor_name)
+    if error:
+        return error
+    clocks = slots.get(_pad_date(appointment_date))
+    if not clocks:
+        return {"status": AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR}
+    return {"status": AppointmentStatus.SUCCESS, "data": _group_by_main_hour(clocks)}
+
+def _browser_query_hours(city_name, town_name, clinic, hospital, doctor_name, appointment_date):
+    response = appointment_doctor_available(city_name, town_name, clinic, hospital)
+    if not response["status"] == SelectionStatus.SUCCESS:
+        return response
+
+    if not appointment_doctor_available_dates(doctor_name):
+        return _doctor_failure(AppointmentStatus.NO_DOCTOR_AVAILABLE, response["doctors"], doctor_name)
+
+    available_hours = appointment_available_hours_on(appointment_date)
+    if not available_hours:
+        return {"status": AppointmentStatus.NO_DATE_AVAILABLE_FOR_DOCTOR}
+
+    return {"status": AppointmentStatus.SUCCESS, "data": available_hours}
+
+@scheduled(QUERY_JOB, _search_affinity)
+@traced()
+def query_available_hours(city_name, town_name, clinic, hospital, doctor_name, appointment_date):
+    """
+    Lists a doctor's free time slots on a date, over HTTP when possible.
+
+    Returns:
+        dict: {'status': AppointmentStatus.SUCCESS, 'data': [{'main_hour': ..., 'sub_hours': [...]}, ...]}
+              or an error status.
+    """
+    return availability_cache.get_or_load(
+        "hours", (city_name, town_name, clinic, hospital, doctor_name, appointment_date),
+        lambda: _with_http_backend(_http_query_hours, _browser_query_hours, city_name, town_name, clinic, hospital, doctor_name, appointment_date),
+    )
+
+def _tab_date(date_text):
+    match = re.search(r"\d{1,2}[./-]\d{1,2}[./-]\d{4}", date_text)
+    return match.group(0) if match else date_text.strip()
+
+def _http_full_availability(city_name, town_name, clinic, hospital, max_doctors, max_dates):
+    error, search = _http_search(city_name, town_name, clinic, hospital)
+    if error:
+        return error
+    response = _http_doctors(search)
+    if response["status"] != SelectionStatus.SUCCESS:
+        return response
+
+    data = []
+    for doctor in response["doctors"][:max_doctors]:
+        slots = http_client.free_slots(doctor["id"], search["clinic_id"], search["hospital_id"])
+        dates = [{"date": date, "hours": _group_by_main_hour(clocks)} for date, clocks in list(slots.items())[:max_dates]]
+        data.append(dict(doctor, dates=dates))
+    return {"status": AppointmentStatus.SUCCESS, "data": data}
+
+@traced()
+def _browser_collect_doctor(doctor, max_dates=None):
+    """Adds the doctor's dates and their hour slots, starting from the search results page."""
+    doctor_data = dict(doctor, dates=[])
+    try:
+        dates = appointment_doctor_available_dates(doctor["doctor"])
+        for date_info in (dates or [])[:max_dates]:
+            date = _tab_date(date_info["date"])
+            hours = appointment_available_hours_on(date)
+            doctor_data["dates"].append({"date": date, "hours": hours or []})
+    except (CallCancelled, SessionExpired, LocatorBroken):
+        raise
+    except Exception as e:
+        # one doctor's failure leaves the others of the sweep alone; the next one searches again
+        logger.warning("Could not collect the dates of {}: {}", doctor["doctor"], e)
+        doctor_data["error"] = str(e)
+        browser.reset_nav_state()
+    return doctor_data
+
+def _browser_full_availability(city_name, town_name, clinic, hospital, max_doctors, max_dates):
+    # One search funnel; every doctor and day below it is reached from the page already open
+    response = appointment_doctor_available(city_name, town_name, clinic, hospital)
+    if response["status"] != SelectionStatus.SUCCESS:
+        return response
+
+    data = [_browser_collect_doctor(doctor, max_dates) for doctor in response["doctors"][:max_doctors]]
+    return {"status": AppointmentStatus.SUCCESS, "data": data}
+
+@scheduled(QUERY_JOB, _search_affinity)
+@traced()
+def query_full_availability(city_name, town_name, clinic, hospital, max_doctors=None, max_dates=None):
+    """
+    Lists every doctor of a search with their available dates and the hour slots of each date,
+    in a single traversal.
+
+    Args:
+        city_name, town_name, clinic, hospital (str): The search, as for `appointment_doctor_available()`
+        max_doctors (int, optional): Only expand the first N doctors of the result list
+        max_dates (int, optional): Only expand the first N dates of each doctor
+
+    Returns:
+        dict: {'status': AppointmentStatus.SUCCESS, 'data': [{<doctor fields>, 'dates': [{'date': ..., 'hours': [...]}]}]}
+              or the error status of the search.
+    """
+    return availability_cache.get_or_load(
+        "full", (city_name, town_name, clinic, hospital, max_doctors, max_dates),
+        lambda: _with_http_backend(_http_full_availability, _browser_full_availability, city_name, town_name, clinic, hospital, max_doctors, max_dates),
+    )
+
+def _timed(collect, doctor):
+    started = time.monotonic()
+    doctor_data = collect(doctor)
+    doctor_data["seconds"] = round(time.monotonic() - started, 2)
+    return doctor_data
+
+@traced()
+def _sweep_chunk_in_session(search, doctors, refresh=False):
+    # Runs on a session of its own: one funnel, then the chunk's doctors from that page
+    response = appointment_doctor_available(*search, refresh=refresh)
+    if response["status"] != SelectionStatus.SUCCESS:
+        return [dict(doctor, dates=[], error=str(response["status"].value)) for doctor in doctors]
+    return [_timed(_browser_collect_doctor, doctor) for doctor in doctors]
+
+def _chunk_result(future, chunk):
+    # Waits in slices so the caller's own cancellation is noticed; None when the chunk failed
+    while True:
+        try:
+            return future.result(timeout=WAIT_SLICE)
+        except FutureTimeout:
+            browser_pool.raise_if_cancelled()
+        except Exception as e:
+            logger.warning("sweep chunk of {} doctors failed ({}: {}), sweeping it on this session", len(chunk), type(e).__name__, e)
+            return None
+
+def _browser_sweep(city_name, town_name, clinic, hospital, doctor_name, refresh=False):
+    search = (city_name, town_name, clinic, hospital)
+    response = appointment_doctor_available(*search, refresh=refresh)
+    if response["status"] != SelectionStatus.SUCCESS:
+        return response
+
+    doctors = response["doctors"]
+    if doctor_name:
+        index = name_index([d["doctor"] for d in doctors]).best(doctor_name)
+        if index is None:
+            return _doctor_failure(AppointmentStatus.NO_DOCTOR_AVAILABLE, doctors, doctor_name)
+        doctors = [doctors[index]]
+
+    # This session sweeps the first chunk; the others fan out to the sessions idle right now,
+    # without waiting for one, and are swept here as well when there are none
+    job = (QUERY_JOB, _search_key(*search))
+    clients = []
+    while len(clients) + 1 < min(browser_pool.size, len(doctors)):
+        client = browser_pool.try_acquire(job)
+        if client is None:
+            break
+        clients.append(client)
+    sessions = len(clients) + 1
+    chunks = [doctors[i::sessions] for i in range(sessions)]
+
+    cancel_event = threading.Event()
+    with ThreadPoolExecutor(max_workers=len(clients) or 1) as executor:
+        futures = [
+            executor.submit(tracer.bind(browser_pool.run_on), client, _sweep_chunk_in_session, search, chunk, refresh, cancel_event=cancel_event)
+            for client, chunk in zip(clients, chunks[1:])
+        ]
+        try:
+            data = [_timed(_browser_collect_doctor, doctor) for doctor in chunks[0]]
+            for future, chunk in zip(futures, chunks[1:]):
+                chunk_data = _chunk_result(future, chunk)
+                if chunk_data is None:
+                    chunk_data = [_timed(_browser_collect_doctor, doctor) for doctor in chunk]
+                data.extend(chunk_data)
+        except BaseException:
+            cancel_event.set()  # the chunks stop at their next wait and give their sessions back
+            raise
+
+    order = {doctor["doctor"]: i for i, doctor in enumerate(doctors)}
+    data.sort(key=lambda doctor_data: order.get(doctor_data["doctor"], len(order)))
+    return {"status": AppointmentStatus.SUCCESS, "data": data, "stats": {"sessions": sessions}}
+
+def _http_sweep(city_name, town_name, clinic, hospital, doctor_name):
+    error, search = _http_search(city_name, town_name, clinic, hospital)
+    if error:
+        return error
+    response = _http_doctors(search)
+    if response["status"] != SelectionStatus.SUCCESS:
+        return response
+
+    doctors = response["doctors"]
+    if doctor_name:
+        index = name_index([d["doctor"] for d in doctors]).best(doctor_name)
+        if index is None:
+            return _doctor_failure(AppointmentStatus.NO_DOCTOR_AVAILABLE, doctors, doctor_name)
+        doctors = [doctors[index]]
+
+    def collect(doctor):
+        slots = http_client.free_slots(doctor["id"], search["clinic_id"], search["hospital_id"])
+        return dict(doctor, dates=[{"date": date, "hours": _group_by_main_hour(clocks)} for date, clocks in slots.items()])
+
+    with ThreadPoolExecutor(max_workers=min(8, max(1, len(doctors)))) as executor:
+        data = list(executor.map(lambda doctor: _timed(collect, doctor), doctors))
+    return {"status": AppointmentStatus.SUCCESS, "data": data, "stats": {"sessions": 0}}
+
+@scheduled(QUERY_JOB, _search_affinity)
+@traced()
+def sweep_slot_matrix(city_name, town_name, clinic, hospital, doctor_name=None, refresh=False):
+    """
+    Collects the complete doctor × date slot matrix of a search: every available date of one
+    doctor (or of every doctor when doctor_name is omitted) with all of its hour slots.
+
+    When more than one browser session is available the doctors are split across sessions.
+    refresh=True searches again even where a session still shows results of the search.
+
+    Returns:
+        dict: {'status': AppointmentStatus.SUCCESS,
+               'data': [{<doctor fields>, 'seconds': ..., 'dates': [{'date': ..., 'hours': [...]}]}],
+               'stats': {'elapsed_seconds', 'doctors', 'dates', 'slots', 'sessions'}}
+              or the error status of the search.
+    """
+    started = time.monotonic()
+    response = _with_http_backend(_http_sweep, functools.partial(_browser_sweep, refresh=refresh), city_name, town_name, clinic, hospital, doctor_name)
+    if response.get("status") == AppointmentStatus.SUCCESS:
+        data = response["data"]
+        response["stats"].update({
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+            "doctors": len(data),
+            "dates": sum(len(doctor["dates"]) for doctor in data),
+            "slots": sum(len(hour["sub_hours"]) for doctor in data for date in doctor["dates"] for hour in date["hours"]),
+        })
+    return response
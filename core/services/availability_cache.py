@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from core.clients.browser_pool import BrowserPool, TOOL_TIMEOUT
+from utils.selection_status import SelectionStatus
+from utils.status import Status
+from utils.string_utils import fold_for_search
+from utils.log import logger
+
+load_dotenv()
+
+# Seconds an answer stays valid, per query level; hour slots move fastest
+TTLS = {
+    "doctors": float(os.getenv("MHRS_DOCTORS_CACHE_TTL", "60")),
+    "dates": float(os.getenv("MHRS_DATES_CACHE_TTL", "60")),
+    "hours": float(os.getenv("MHRS_HOURS_CACHE_TTL", "30")),
+}
+TTLS["full"] = TTLS["hours"]  # a full availability answer is as fresh as its hour slots
+
+# Answers that describe a failed run rather than MHRS' availability are never cached
+UNCACHEABLE_STATUSES = (SelectionStatus.ERROR, SelectionStatus.TIMEOUT, Status.SHOW_MESSAGE, Status.FAILURE)
+# Seconds between the checks of a waiting caller for its own cancellation
+WAIT_SLICE = 0.5
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class AvailabilityCache:
+    """
+    In-process TTL cache for doctor / date / hour availability answers.
+
+    Keys are the level plus the folded (city, town, clinic, hospital[, doctor[, date]]) query.
+    Concurrent identical queries are coalesced: the first caller runs the loader and the
+    others wait for its answer. A waiter stops waiting when its own tool call is cancelled
+    and runs the loader itself when the first caller fails (its cancellation, deadline or
+    expired session is not the waiter's) or takes longer than a tool call may.
+    Booking and cancelling invalidate the affected entries.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AvailabilityCache, cls).__new__(cls)
+            cls._instance.entries = {}
+            cls._instance.inflight = {}
+            cls._instance.lock = threading.Lock()
+        return cls._instance
+
+    @staticmethod
+    def key(level, params):
+        return (level,) + tuple(fold_for_search(str(p)) for p in params)
+
+    def get_or_load(self, level, params, loader, refresh=False):
+        """
+        The cached answer for the query, else the answer of loader(), shared with identical
+        concurrent callers. refresh=True skips the cached answer (a run already in flight is
+        still joined, it is fresh) and caches the new one.
+        """
+        key = self.key(level, params)
+        deadline = time.monotonic() + TOOL_TIMEOUT
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if not refresh and entry is not None and entry[0] > time.monotonic():
+                    logger.debug("availability cache hit for {}", key)
+                    return entry[1]
+                call = self.inflight.get(key)
+                owner = call is None
+                if owner:
+                    call = self.inflight[key] = _InFlight()
+            if owner:
+                break
+
+            logger.debug("waiting for identical in-flight query {}", key)
+            while not call.done.wait(WAIT_SLICE):
+                BrowserPool().raise_if_cancelled()
+                if time.monotonic() > deadline:
+                    break
+            if call.done.is_set() and call.error is None:
+                return call.result
+            if call.done.is_set():
+                logger.debug("identical query failed ({}), running {} itself", type(call.error).__name__, key)
+                continue  # the next round owns a fresh run, or joins another waiter's
+            logger.warning("identical query {} is still running after {}s, running it again", key, TOOL_TIMEOUT)
+            return loader()
+
+        try:
+            call.result = loader()
+            if isinstance(call.result, dict) and call.result.get("status") not in UNCACHEABLE_STATUSES:
+                with self.lock:
+                    self.entries[key] = (time.monotonic() + TTLS[level], call.result)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            call.done.set()
+
+    def invalidate(self, search=None):
+        """Drops every entry for the given (city, town, clinic, hospital), or all entries."""
+        with self.lock:
+            if search is None:
+                self.entries.clear()
+                return
+            prefix = tuple(fold_for_search(p) for p in search)
+            for key in [k for k in self.entries if k[1:5] == prefix]:
+                del self.entries[key]
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from core.clients.http_client import HttpMhrsClient, HttpBackendError
+from utils.selection_status import SelectionStatus
+from utils.string_utils import fold_for_search
+from utils.name_index import name_index, no_match
+from utils.log import logger
+
+load_dotenv()
+
+CATALOG_FILE = os.path.expanduser(os.getenv("MHRS_CATALOG_FILE", "~/.mhrs-mcp/catalog.json"))
+CATALOG_TTL = float(os.getenv("MHRS_CATALOG_TTL", str(7 * 24 * 60 * 60)))
+
+# One level per search dropdown, in funnel order
+LEVELS = ("cities", "districts", "clinics", "hospitals")
+NOT_FOUND_STATUS = {
+    "cities": SelectionStatus.CITY_NOT_FOUND,
+    "districts": SelectionStatus.TOWN_NOT_FOUND,
+    "clinics": SelectionStatus.CLINIC_NOT_FOUND,
+    "hospitals": SelectionStatus.HOSPITAL_NOT_FOUND,
+}
+
+def find_option(names, query):
+    """Index of the one option query selects (see NameIndex.best), or None."""
+    return name_index(names).best(query)
+
+class CatalogCache:
+    """
+    On-disk cache of the city / district / clinic / hospital dropdown options.
+
+    Entries are keyed by level plus the parent selections as the caller typed them
+    (e.g. "clinics|İZMİR|URLA") and remember the option names in page order and, when they
+    came from the JSON API, their MHRS ids. A name a fresh entry does not offer is looked up
+    on MHRS once more, as the option may be new, and from then on fails fast until the options
+    are read again; stale entries are still used to jump to an option and are refreshed in
+    the background when the HTTP backend is available.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CatalogCache, cls).__new__(cls)
+            cls._instance.path = CATALOG_FILE
+            cls._instance.ttl = CATALOG_TTL
+            cls._instance.lock = threading.Lock()
+            cls._instance.refreshing = set()
+            cls._instance.entries = cls._instance._load()
+        return cls._instance
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning("Ignoring unreadable catalog cache: {}", e)
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(level, parents):
+        return "|".join([level] + [fold_for_search(p) for p in parents])
+
+    def get(self, level, parents):
+        with self.lock:
+            return self.entries.get(self.key(level, parents))
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry["updated_at"] < self.ttl
+
+    def record(self, level, parents, names, ids=None):
+        names = [name for name in names if name.strip()]
+        if not names:
+            return
+        entry = {"names": names, "ids": ids, "updated_at": time.time()}
+        with self.lock:
+            previous = self.entries.get(self.key(level, parents))
+            if previous and previous.get("ids") and not ids and previous["names"] == names:
+                entry["ids"] = previous["ids"]  # keep ids learned over HTTP when the page agrees
+            self.entries[self.key(level, parents)] = entry
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("Could not save catalog cache: {}", e)
+
+    def discard(self, level, parents):
+        with self.lock:
+            if self.entries.pop(self.key(level, parents), None) is None:
+                return
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("Could not save catalog cache: {}", e)
+
+    def note_missing(self, level, parents, name):
+        """Remembers that options just read from MHRS do not offer name, see precheck."""
+        with self.lock:
+            entry = self.entries.get(self.key(level, parents))
+            if entry is None or fold_for_search(name) in entry.setdefault("missing", []):
+                return
+            entry["missing"].append(fold_for_search(name))
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("Could not save catalog cache: {}", e)
+
+    def known_index(self, level, parents, name):
+        """Position of the option to click according to the cache (fresh or stale), or None."""
+        entry = self.get(level, parents)
+        if entry is None:
+            return None
+        if not self.is_fresh(entry):
+            self.refresh_in_background(level, parents)
+        return find_option(entry["names"], name)
+
+    def precheck(self, city_name, town_name, clinic, hospital):
+        """
+        Rejects a search whose names are missing from fresh cached option lists before the
+        browser is touched, once MHRS itself confirmed the miss (note_missing). Returns an
+        error response, or None when the search may proceed.
+        """
+        search = (city_name, town_name, clinic, hospital)
+        for depth, level in enumerate(LEVELS):
+            entry = self.get(level, search[:depth])
+            if not self.is_fresh(entry):
+                if entry is not None:
+                    self.refresh_in_background(level, search[:depth])
+                return None
+            if find_option(entry["names"], search[depth]) is None:
+                if fold_for_search(search[depth]) not in entry.get("missing", ()):
+                    # possibly added since the list was read: the search reads it again
+                    logger.info("{} is not among the cached {}, checking MHRS", search[depth], level)
+                    return None
+                logger.info("{} is not among the cached {}, failing fast", search[depth], level)
+                return no_match(NOT_FOUND_STATUS[level], entry["names"], search[depth])
+        return None
+
+    def refresh_in_background(self, level, parents):
+        key = self.key(level, parents)
+        with self.lock:
+            if key in self.refreshing or not HttpMhrsClient().is_available():
+                return
+            self.refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(level, tuple(parents), key), name="mhrs-catalog-refresh", daemon=True).start()
+
+    def _refresh(self, level, parents, key):
+        http_client = HttpMhrsClient()
+        try:
+            # Walk the parents to their ids, then fetch the options of the wanted level
+            ids = []
+            options = http_client.cities()
+            for depth, parent in enumerate(parents):
+                index = find_option([o["name"] for o in options], parent)
+                if index is None:
+                    return
+                ids.append(options[index]["id"])
+                fetch = [http_client.districts, http_client.clinics, http_client.hospitals][depth]
+                options = fetch(*ids)
+            self.record(level, parents, [o["name"] for o in options], [o["id"] for o in options])
+            logger.debug("refreshed catalog entry {}", key)
+        except HttpBackendError as e:
+            logger.warning("Could not refresh catalog entry {}: {}", key, e)
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
@@ -0,0 +1,83 @@
+from selenium.webdriver.common.by import By
+from core.clients.browser_pool import browser
+from core.clients.event_waits import CLICK_SETTLE_MS
+
+# Reads every matching element in one WebDriver round trip. Hidden elements come back as ""
+# like Selenium's .text does, so the callers' filtering keeps working unchanged.
+TEXTS_SCRIPT = """
+var elements = document.querySelectorAll(arguments[0]);
+var texts = [];
+for (var i = 0; i < elements.length; i++) {
+    var el = elements[i];
+    var visible = el.getClientRects().length > 0;
+    texts.push(visible ? (el.innerText || '') : '');
+}
+return texts;
+"""
+
+def snapshot_texts(css_selector):
+    """Returns the visible text of every element matching css_selector, in DOM order."""
+    return browser.driver.execute_script(TEXTS_SCRIPT, css_selector) or []
+
+def snapshot_lines(css_selector):
+    """Like snapshot_texts, but splits each element's text into its non-empty lines."""
+    return [
+        [line.strip() for line in text.splitlines() if line.strip()]
+        for text in snapshot_texts(css_selector)
+    ]
+
+# Opens every hour panel of the selected day in turn, inside the page, and reads its slot
+# buttons once they render. Panels are handled one after another so accordion mode (one
+# open panel at a time) works too; the whole day costs a single WebDriver round trip.
+# A panel that settled without buttons (open and no spinner for settleMs, or showing an
+# empty-state marker) is read as empty at once instead of after panelTimeoutMs.
+HOUR_SLOTS_SCRIPT = """
+var panelSelector = arguments[0], panelTimeoutMs = arguments[1], settleMs = arguments[2], done = arguments[arguments.length - 1];
+var panels = Array.prototype.slice.call(document.querySelectorAll(panelSelector));
+var result = [];
+
+function spinning() { return document.querySelector('.ant-spin-spinning') !== null; }
+function slotTexts(panel) {
+    var buttons = panel.querySelectorAll('.ant-collapse-content button, div > button');
+    var texts = [];
+    for (var i = 0; i < buttons.length; i++) {
+        var text = (buttons[i].innerText || '').trim();
+        if (text && texts.indexOf(text) === -1) { texts.push(text); }
+    }
+    return texts;
+}
+function header(panel) {
+    var el = panel.querySelector('.ant-collapse-header') || panel;
+    return el;
+}
+function emptyMarker(panel) { return panel.querySelector('.ant-empty, .ant-empty-description') !== null; }
+function opened(panel) { return panel.querySelector('.ant-collapse-content-active') !== null; }
+function readPanel(index) {
+    if (index >= panels.length) { done(result); return; }
+    var panel = panels[index];
+    var mainHour = (header(panel).innerText || '').trim().split('\\n')[0];
+    if (!panel.classList.contains('ant-collapse-item-active')) { header(panel).click(); }
+    var started = Date.now(), quietSince = started;
+    (function poll() {
+        var texts = slotTexts(panel), now = Date.now();
+        if (spinning()) { quietSince = now; }
+        var settled = now - quietSince >= settleMs && (opened(panel) || emptyMarker(panel));
+        if ((texts.length && !spinning()) || settled || now - started > panelTimeoutMs) {
+            result.push({main_hour: mainHour, sub_hours: texts});
+            readPanel(index + 1);
+        } else {
+            setTimeout(poll, 50);
+        }
+    })();
+}
+readPanel(0);
+"""
+
+def snapshot_hour_slots(panel_selector, panel_timeout=5):
+    """
+    Returns [{"main_hour": "15:00", "sub_hours": ["15:00", "15:20", ...]}, ...] for every
+    hour panel matching panel_selector, expanding the panels in one scripted pass.
+    """
+    panels = browser.driver.find_elements(By.CSS_SELECTOR, panel_selector)
+    browser.set_script_timeout(panel_timeout * max(1, len(panels)) + 5)
+    return browser.driver.execute_async_script(HOUR_SLOTS_SCRIPT, panel_selector, int(panel_timeout * 1000), CLICK_SETTLE_MS) or []
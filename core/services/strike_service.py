@@ -0,0 +1,327 @@
+from collections import deque
+import os
+import statistics
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+from core.clients.browser_pool import browser, BrowserPool
+from core.clients.request_scheduler import BOOKING_JOB
+from core.clients.browser_client import DOCTOR_DATES_PAGE, DAY_HOURS_PAGE
+from core.clients.auth_client import AuthClient
+from core.clients.session_monitor import SessionExpired
+from core.clients.locators import selector_list
+from core.services.appointment_service import (
+    appointment_doctor_available, appointment_doctor_available_dates, _return_to_doctor_list
+)
+from core.services.availability_cache import AvailabilityCache
+from utils.hold_status import HoldStatus
+from utils.selection_status import SelectionStatus
+from utils.status import Status
+from utils.string_utils import normalize_date_format, normalize_to_hour_format, parse_main_hour, fold_for_search
+from utils.log import logger
+
+load_dotenv()
+
+POLL_INTERVAL = float(os.getenv("MHRS_STRIKE_POLL_INTERVAL", "5"))
+REPARK_INTERVAL = float(os.getenv("MHRS_STRIKE_REPARK_INTERVAL", "60"))
+MAX_HOLD_MINUTES = float(os.getenv("MHRS_STRIKE_MAX_MINUTES", "30"))
+SCRIPT_TIMEOUT_MS = 8000
+MAX_CONSECUTIVE_ERRORS = 5
+
+# The buttons accept_appointment() clicks: the confirm dialog, then the verification dialog
+CONFIRM_STEPS = [selector_list("modal.confirm_second_button"), selector_list("modal.footer_second_button")]
+FORCE_BUTTON_SELECTOR = selector_list("modal.confirm_second_button")
+OK_BUTTON_SELECTOR = selector_list("modal.confirm_first_button")
+MODAL_BODY_SELECTOR = selector_list("modal.body")
+# The day tabs, hour panels and slot buttons PROBE_SCRIPT looks for
+PROBE_SELECTORS = [selector_list("dates.tabs"), selector_list("hours.items"), selector_list("hours.slot_buttons")]
+
+# Refreshes the parked day and clicks the target slot as soon as it renders, in one round trip.
+# Tabs only reload their day when the selection changes, so an already active target tab is
+# left for a neighbour first. The tab / hour panel / slot button selectors are the locator
+# registry's (PROBE_SELECTORS).
+PROBE_SCRIPT = """
+var targetDate = arguments[0], mainHour = arguments[1], targetClock = arguments[2], timeoutMs = arguments[3];
+var tabSelector = arguments[4], panelSelector = arguments[5], slotSelector = arguments[6];
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+
+function spinning() { return document.querySelector('.ant-spin-spinning') !== null; }
+function text(el) { return (el.innerText || '').trim(); }
+function active(el, cls) { return el.className.indexOf(cls) !== -1; }
+function find(selector, root, predicate) {
+    var els = root.querySelectorAll(selector);
+    for (var i = 0; i < els.length; i++) { if (predicate(els[i])) { return els[i]; } }
+    return null;
+}
+function waitFor(getter, then) {
+    (function poll() {
+        var value = spinning() ? null : getter();
+        if (value || Date.now() - started > timeoutMs) { then(value); }
+        else { setTimeout(poll, 25); }
+    })();
+}
+
+var tab = find(tabSelector, document, function (el) { return text(el).indexOf(targetDate) !== -1; });
+if (!tab) {
+    done({state: document.querySelector(tabSelector) ? 'no_date' : 'no_tabs'});
+    return;
+}
+
+function openDay() {
+    tab.click();
+    waitFor(function () { return active(tab, 'ant-tabs-tab-active'); }, function () {
+        var panel = find(panelSelector, document, function (el) { return text(el).indexOf(mainHour + ':') === 0; });
+        if (!panel) { done({state: 'no_slot', probe_ms: Date.now() - started}); return; }
+        if (!active(panel, 'ant-collapse-item-active')) { (panel.querySelector('.ant-collapse-header') || panel).click(); }
+        waitFor(function () {
+            return find(slotSelector, panel, function (el) { return text(el).indexOf(targetClock) !== -1; });
+        }, function (button) {
+            if (!button) { done({state: 'no_slot', probe_ms: Date.now() - started}); return; }
+            button.click();
+            done({state: 'clicked', probe_ms: Date.now() - started});
+        });
+    });
+}
+
+var other = active(tab, 'ant-tabs-tab-active') && find(tabSelector, document, function (el) { return el !== tab; });
+if (other) {
+    other.click();
+    waitFor(function () { return active(other, 'ant-tabs-tab-active'); }, openDay);
+} else {
+    openDay();
+}
+"""
+
+# Clicks through the confirm / verify dialogs the moment each button is usable, accepts the
+# RND5015 replacement dialog if it comes up, and reports the RND code of the outcome.
+CONFIRM_SCRIPT = """
+var steps = arguments[0], forceSelector = arguments[1], okSelector = arguments[2], timeoutMs = arguments[3];
+var bodySelector = arguments[4];
+var done = arguments[arguments.length - 1];
+var started = Date.now(), timings = [], forced = false;
+var stale = Array.prototype.slice.call(document.querySelectorAll(bodySelector));
+
+function spinning() { return document.querySelector('.ant-spin-spinning') !== null; }
+function usable(el) { return el && !el.disabled && el.getClientRects().length > 0; }
+function timedOut() { return Date.now() - started > timeoutMs; }
+
+function click(index) {
+    if (index >= steps.length) { outcome(Date.now()); return; }
+    var stepStarted = Date.now();
+    (function poll() {
+        var el = document.querySelector(steps[index]);
+        if (usable(el) && !spinning()) {
+            el.click();
+            timings.push(Date.now() - stepStarted);
+            click(index + 1);
+        } else if (timedOut()) {
+            done({code: null, failed_step: index, steps_ms: timings, total_ms: Date.now() - started});
+        } else {
+            setTimeout(poll, 25);
+        }
+    })();
+}
+function outcome(waitStarted) {
+    var bodies = document.querySelectorAll(bodySelector);
+    for (var i = 0; i < bodies.length; i++) {
+        if (stale.indexOf(bodies[i]) !== -1) { continue; }
+        var match = (bodies[i].innerText || '').match(/RND\\d{4}/);
+        if (!match) { continue; }
+        if (match[0] === 'RND5015' && !forced) {
+            var force = document.querySelector(forceSelector);
+            if (usable(force)) { force.click(); forced = true; stale.push(bodies[i]); }
+            break;
+        }
+        if (match[0] === 'RND5036') {
+            var ok = document.querySelector(okSelector);
+            if (usable(ok)) { ok.click(); }
+        }
+        timings.push(Date.now() - waitStarted);
+        done({code: match[0], forced: forced, steps_ms: timings, total_ms: Date.now() - started});
+        return;
+    }
+    if (timedOut()) { done({code: null, forced: forced, steps_ms: timings, total_ms: Date.now() - started}); return; }
+    setTimeout(function () { outcome(waitStarted); }, 25);
+}
+click(0);
+"""
+
+SUCCESS_CODE = "RND5036"
+
+auth_client = AuthClient()
+browser_pool = BrowserPool()
+availability_cache = AvailabilityCache()
+
+class StrikeManager:
+    """
+    Hold-and-strike booking: each hold parks a dedicated browser session on the target
+    doctor's date page and keeps it fresh, so booking a freed slot is two in-page scripts
+    (refresh + slot click, then the confirm chain) instead of the whole search funnel.
+
+    Every strike records its latency; `latency()` summarises the recent ones.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StrikeManager, cls).__new__(cls)
+            cls._instance.holds = {}
+            cls._instance.stops = {}
+            cls._instance.strikes = deque(maxlen=100)
+            cls._instance.lock = threading.Lock()
+        return cls._instance
+
+    def hold(self, city, district, specialty, hospital, doctor_name, date, hour, max_minutes=MAX_HOLD_MINUTES):
+        with self.lock:
+            active = [h for h in self.holds.values() if h["status"] in (HoldStatus.PARKING.value, HoldStatus.PARKED.value)]
+            # keep at least one session free for the other tools
+            if len(active) + 1 >= browser_pool.size:
+                return {"status": Status.FAILURE, "message": f"All {browser_pool.size - 1} browser sessions that can be held are in use, raise MHRS_BROWSER_POOL_SIZE to hold more"}
+            hold = {
+                "id": uuid.uuid4().hex[:8],
+                "search": [city, district, specialty, hospital],
+                "doctor_name": doctor_name,
+                "date": normalize_date_format(date),
+                "time": normalize_to_hour_format(hour),
+                "status": HoldStatus.PARKING.value,
+                "created_at": time.time(),
+                "expires_at": time.time() + max_minutes * 60,
+                "probes": 0,
+                "parks": 0,
+                "last_probe": None,
+                "strike": None,
+                "error": None,
+            }
+            self.holds[hold["id"]] = hold
+            self.stops[hold["id"]] = threading.Event()
+        threading.Thread(target=self._run, args=(hold,), name=f"mhrs-hold-{hold['id']}", daemon=True).start()
+        return {"status": Status.SUCCESS, "data": dict(hold)}
+
+    def list(self):
+        with self.lock:
+            return [dict(hold) for hold in self.holds.values()]
+
+    def release(self, hold_id):
+        with self.lock:
+            stop = self.stops.get(hold_id)
+        if stop is None:
+            return None
+        stop.set()
+        return dict(self.holds[hold_id])
+
+    def latency(self):
+        totals = [strike["total_ms"] for strike in self.strikes]
+        if not totals:
+            return {"strikes": 0}
+        return {
+            "strikes": len(totals),
+            "booked": sum(1 for strike in self.strikes if strike["code"] == SUCCESS_CODE),
+            "last_ms": totals[-1],
+            "median_ms": statistics.median(totals),
+            "max_ms": max(totals),
+        }
+
+    def _run(self, hold):
+        stop = self.stops[hold["id"]]
+        errors = 0
+        try:
+            with browser_pool.session(job=(BOOKING_JOB, None)):
+                last_park = 0
+                while not stop.is_set():
+                    if time.time() > hold["expires_at"]:
+                        hold["status"] = HoldStatus.EXPIRED.value
+                        return
+                    try:
+                        if not self._is_parked(hold) or time.monotonic() - last_park > REPARK_INTERVAL:
+                            hold["status"] = HoldStatus.PARKING.value
+                            if not self._park(hold):
+                                stop.wait(POLL_INTERVAL)
+                                continue
+                            hold["status"] = HoldStatus.PARKED.value
+                            last_park = time.monotonic()
+                        if self._probe_and_strike(hold):
+                            return
+                        errors = 0
+                    except SessionExpired:
+                        logger.info("hold {}: session expired, logging in again", hold['id'])
+                        auth_client.relogin(browser_pool.checked_out())
+                    except Exception as e:
+                        errors += 1
+                        hold["error"] = str(e)
+                        logger.warning("hold {} error {}/{}: {}", hold['id'], errors, MAX_CONSECUTIVE_ERRORS, e)
+                        if errors >= MAX_CONSECUTIVE_ERRORS:
+                            hold["status"] = HoldStatus.FAILED.value
+                            return
+                        browser.reset_nav_state()
+                    stop.wait(POLL_INTERVAL)
+                hold["status"] = HoldStatus.RELEASED.value
+        except Exception as e:
+            hold["status"] = HoldStatus.FAILED.value
+            hold["error"] = str(e)
+            logger.warning("hold {} could not get a browser session: {}", hold['id'], e)
+
+    def _is_parked(self, hold):
+        state = browser.nav_state
+        return state["page"] in (DOCTOR_DATES_PAGE, DAY_HOURS_PAGE) and state["doctor"] == fold_for_search(hold["doctor_name"])
+
+    def _park(self, hold):
+        """Walks to the doctor's date tabs; from the tabs page itself only the doctor is re-opened."""
+        auth_client.check_login(browser)
+        hold["parks"] += 1
+        if self._is_parked(hold):
+            if not _return_to_doctor_list():
+                return False
+        else:
+            response = appointment_doctor_available(*hold["search"])
+            if response["status"] != SelectionStatus.SUCCESS:
+                hold["error"] = str(response["status"].value)
+                return False
+        dates = appointment_doctor_available_dates(hold["doctor_name"])
+        if dates is False:
+            hold["error"] = f"doctor {hold['doctor_name']} is not listed"
+            return False
+        hold["error"] = None
+        return True
+
+    def _probe_and_strike(self, hold):
+        driver = browser.driver
+        browser.set_script_timeout(SCRIPT_TIMEOUT_MS / 1000 * 2 + 5)
+        main_hour = f"{int(parse_main_hour(hold['time'])):02d}"
+        hold["probes"] += 1
+        probe_started = time.monotonic()
+        probe = driver.execute_async_script(PROBE_SCRIPT, hold["date"], main_hour, hold["time"], SCRIPT_TIMEOUT_MS, *PROBE_SELECTORS) or {}
+        hold["last_probe"] = {"at": time.time(), "state": probe.get("state"), "ms": round((time.monotonic() - probe_started) * 1000)}
+        if probe.get("state") == "no_tabs":
+            browser.reset_nav_state()  # not on the tabs page any more, park again
+            return False
+        if probe.get("state") != "clicked":
+            browser.set_nav_state(page=DOCTOR_DATES_PAGE)
+            return False
+
+        # From here on every millisecond counts: no Selenium waits, a single round trip
+        clicked_at = time.monotonic()
+        result = driver.execute_async_script(CONFIRM_SCRIPT, CONFIRM_STEPS, FORCE_BUTTON_SELECTOR, OK_BUTTON_SELECTOR, SCRIPT_TIMEOUT_MS, MODAL_BODY_SELECTOR) or {}
+        strike = {
+            "at": time.time(),
+            "code": result.get("code"),
+            "forced": result.get("forced", False),
+            "probe_ms": probe.get("probe_ms"),
+            "steps_ms": result.get("steps_ms", []),
+            "total_ms": round((time.monotonic() - clicked_at) * 1000),
+        }
+        self.strikes.append(strike)
+        hold["strike"] = strike
+        logger.info("hold {} struck {} {}: {} in {}ms", hold['id'], hold['date'], hold['time'], strike['code'], strike['total_ms'])
+
+        availability_cache.invalidate(hold["search"])
+        browser.reset_nav_state()
+        if strike["code"] == SUCCESS_CODE:
+            hold["status"] = HoldStatus.BOOKED.value
+        else:
+            # an MHRS refusal is not going to change on retry, leave it to the user
+            hold["status"] = HoldStatus.FAILED.value
+            hold["error"] = strike["code"] or "no booking outcome within the script timeout"
+        return True
@@ -3,11 +3,19 @@ from selenium.webdriver.support import expected_conditions as EC
 import json
 import time
 import re
-from core.clients.browser_client import BrowserClient
-from utils.string_utils import normalize_string_to_lower, normalize_string_to_upper, parse_main_hour, normalize_to_hour_format
+from core.clients.browser_pool import browser
+from core.clients.session_monitor import SessionExpired, CallCancelled
+from core.clients.locators import LocatorBroken
+from core.services.page_snapshot import snapshot_texts, snapshot_lines, snapshot_hour_slots
+from core.services.catalog_cache import CatalogCache, find_option
+from utils.name_index import name_index, no_match
+from utils.tracing import traced
+from utils.log import logger, sampled
+from utils.string_utils import normalize_string_to_lower, normalize_string_to_upper, parse_main_hour, normalize_to_hour_format, fold_for_search
 
 from utils.selection_status import SelectionStatus
-browser = BrowserClient()
+
+catalog = CatalogCache()
 
 def select_dropdown(selection_name, dropdown_selector, item_selector):
     selection_name = normalize_string_to_upper(selection_name)
@@ -18,152 +26,106 @@ def select_dropdown(selection_name, dropdown_selector, item_selector):
         
         items = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, item_selector)))
         
-        for item in items:
-            print(f"item name is {item.text}")
-            if selection_name in normalize_string_to_upper(item.text):
+        for index, item in enumerate(items):
+            item_text = item.text
+            if sampled(index):
+                logger.debug("item name is {}", item_text)
+            if selection_name in normalize_string_to_upper(item_text):
                 item.click()
-                print(f"Selected item: {item.text}")
+                logger.info("Selected item: {}", item_text)
                 browser.wait_loading_screen()
                 return SelectionStatus.SUCCESS
-            print(f"item not found: {selection_name}")
+        logger.info("item not found: {}", selection_name)
         return SelectionStatus.ITEM_NOT_FOUND
     except Exception as e:
-        print(f"Error selecting item: {e}")
+        logger.warning("Error selecting item: {}", e)
         return SelectionStatus.ERROR   
 
 
-def select_city(city_name):
-    # Normalize and convert to uppercase
-    city_name = normalize_string_to_upper(city_name)
-    try:
-        # Select the div container for the city dropdown
-        browser.wait_loading_screen()
-        city_selection = browser.wait.until(EC.element_to_be_clickable((By.ID, 'il-tree-select'))).click()
-        browser.wait_loading_screen()
+def select_search_option(level, option_name, dropdown_locator, items_locator, not_found_status):
+    """
+    Opens one of the search form dropdowns and clicks the option option_name selects.
 
-        # Find list items within the dropdown
-        city_items = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.ant-select-tree li')))
-        
-        print("traversing city names")
-        # Click on the city that matches our criteria
-        for city in city_items:
-            print(f"city name is {city.text}")
-            if city_name in normalize_string_to_upper(city.text):
-                city.click()
-                print(f"Selected city: {city.text}")
-                browser.wait_loading_screen()
-                return SelectionStatus.SUCCESS
-        
-        print(f"City not found: {city_name}")
-        return SelectionStatus.CITY_NOT_FOUND
-    except Exception as e:
-        print(f"Error selecting city: {e}")
-        return SelectionStatus.ERROR
+    Option lists are recorded in the catalog cache under the selections already made on the
+    form. When the cache knows the option's position and the list still has the same length,
+    only that option's text is read, to make sure MHRS did not reorder the list, before it
+    is clicked.
 
-def select_ilce(town_name):
-    # Normalize and convert to uppercase
-    town_name = normalize_string_to_upper(town_name)
+    Returns {"status": SelectionStatus.SUCCESS}, not_found_status with the candidate
+    options (see name_index.no_match) when the name selects no option or several, or
+    SelectionStatus.ERROR when the dropdown could not be read.
+    """
+    option_name = normalize_string_to_upper(option_name)
+    parents = browser.nav_state["form"]
     try:
-        # Select the div container for the town dropdown
         browser.wait_loading_screen()
-        town_selection = browser.wait.until(EC.element_to_be_clickable((By.ID, 'randevuAramaForm_ilce'))).click()
+        browser.find(dropdown_locator, usable=True).click()
         browser.wait_loading_screen()
 
         # Find list items within the dropdown
-        town_items = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.ant-select-dropdown-menu li')))
-        
-        # Click on the town that matches our criteria
-        for town in town_items:
-            print(f"town name is {town.text}")
-            if town_name in normalize_string_to_upper(town.text):
-                town.click()
-                print(f"Selected town: {town.text}")
-                browser.wait_loading_screen()
-                return SelectionStatus.SUCCESS
-        
-        print(f"Town not found: {town_name}")
-        return SelectionStatus.TOWN_NOT_FOUND
-    except Exception as e:
-        print(f"Error selecting town: {e}")
-        return SelectionStatus.ERROR
+        item_selector, items = browser.locate(items_locator)
+        logger.debug("Found {} {} options", len(items), level)
 
-def select_clinic(clinic_name):
-    # Normalize and convert to uppercase
-    clinic_name = normalize_string_to_upper(clinic_name)
-    try:
-        # Select the div container for the clinic dropdown
-        browser.wait_loading_screen()
-        clinic_selection = browser.wait.until(EC.element_to_be_clickable((By.ID, 'klinik-tree-select'))).click()
-        browser.wait_loading_screen()
+        entry = catalog.get(level, parents)
+        index = catalog.known_index(level, parents, option_name)
+        if index is not None and len(entry["names"]) == len(items) and fold_for_search(items[index].text) != fold_for_search(entry["names"][index]):
+            logger.info("cached {} option {} is no longer at position {}, reading the options again", level, entry["names"][index], index)
+            catalog.discard(level, parents)
+            index = None
+        if index is None or len(entry["names"]) != len(items):
+            names = snapshot_texts(item_selector)
+            catalog.record(level, parents, names)
+            index = find_option(names, option_name)
+            if index is None:
+                logger.info("{} option not found: {}", level, option_name)
+                catalog.note_missing(level, parents, option_name)
+                return no_match(not_found_status, names, option_name)
+        else:
+            logger.debug("jumping to cached {} option {}", level, entry["names"][index])
 
-        # Find list items within the dropdown
-        clinic_items = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, '#rc-tree-select-list_2 > ul:nth-child(2) > li')))
-        
-        # Debug print
-        print(f"Found {len(clinic_items)} clinic options")
-        # Click on the clinic that matches our criteria
-        for clinic in clinic_items:
-            print(f"Clinic : {clinic.text}")
-            print(f"trying to find: {normalize_string_to_upper(clinic.text)} for {clinic_name}")
-            if clinic_name in normalize_string_to_upper(clinic.text):
-                clinic.click()
-                print(f"Selected clinic: {clinic.text}")
-                browser.wait_loading_screen()
-                return SelectionStatus.SUCCESS
-        
-                
-        print(f"Clinic not found: {clinic_name}")
-        return SelectionStatus.CLINIC_NOT_FOUND
+        items[index].click()
+        logger.info("Selected {} option: {}", level, option_name)
+        browser.wait_loading_screen()
+        return {"status": SelectionStatus.SUCCESS}
+    except (CallCancelled, SessionExpired, LocatorBroken):
+        raise
     except Exception as e:
-        print(f"Error selecting clinic: {e}")
-        return SelectionStatus.ERROR
+        # a failed read says nothing about whether the option exists, so it is never NOT_FOUND
+        logger.warning("Error selecting {} option: {}", level, e)
+        return {"status": SelectionStatus.ERROR}
 
-def select_hospital(hospital_name):
-    hospital_name = normalize_string_to_upper(hospital_name)
-    try:
-        # Set the hospital dropdown to be focused
-        browser.wait_loading_screen()
-        hospital_selection = browser.wait.until(EC.element_to_be_clickable((By.ID, 'hastane-tree-select'))).click()
-        browser.wait_loading_screen()
+@traced()
+def select_city(city_name):
+    return select_search_option("cities", city_name, "search.city_dropdown", "search.city_options", SelectionStatus.CITY_NOT_FOUND)
 
-        # Find list items within the dropdown
-        hospital_items = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, '#rc-tree-select-list_3 > ul:nth-child(2) > li')))
-        
-        # Debug print
-        print(f"Found {len(hospital_items)} hospital options")
-        for h in hospital_items:
-            print(f"Hospital option: {h.text}")
-            
-        # Click on the hospital that matches our criteria
-        for hospital in hospital_items:
-            if hospital_name in normalize_string_to_upper(hospital.text):
-                hospital.click()
-                print(f"Selected hospital: {hospital.text}")
-                browser.wait_loading_screen()
-                return SelectionStatus.SUCCESS 
-                
-        print(f"Hospital not found: {hospital_name}")
-        return SelectionStatus.HOSPITAL_NOT_FOUND
-    except Exception as e:
-        print(f"Error selecting hospital: {e}")
-        return SelectionStatus.ERROR
+@traced()
+def select_ilce(town_name):
+    return select_search_option("districts", town_name, "search.district_dropdown", "search.district_options", SelectionStatus.TOWN_NOT_FOUND)
+
+@traced()
+def select_clinic(clinic_name):
+    return select_search_option("clinics", clinic_name, "search.clinic_dropdown", "search.clinic_options", SelectionStatus.CLINIC_NOT_FOUND)
+
+@traced()
+def select_hospital(hospital_name):
+    return select_search_option("hospitals", hospital_name, "search.hospital_dropdown", "search.hospital_options", SelectionStatus.HOSPITAL_NOT_FOUND)
     
+@traced()
 def genel_randevu_arama():
     browser.wait_loading_screen()
 
     browser.wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, "ant-modal-wrap")))
     
-    hasta_randevusu_button = browser.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div.randevu-card-dissiz:nth-child(2) > div:nth-child(1) > div:nth-child(1) > div:nth-child(2)")))
+    hasta_randevusu_button = browser.find("home.patient_card", usable=True)
     hasta_randevusu_button.click()
     browser.wait_loading_screen()
     
-    genel_arama_button = browser.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.randevu-turu-button:nth-child(1)")))
+    genel_arama_button = browser.find("search.general_search_button", usable=True)
     genel_arama_button.click()
 
+@traced()
 def click_on_appointment_search_button():
-    button_selector = "#randevu-ara-buton"
-    browser.click_button(button_selector)
-    browser.wait_loading_screen()
+    browser.click_button("search.submit")
     return True
 
 def check_if_any_available_appointment():
@@ -173,20 +135,17 @@ def check_if_any_available_appointment():
     except Exception:
         return False
 
+@traced()
 def fetch_all_available_doctor_names():
     try:
-        print("fetching available doctors")
-        ul_selector = ".ant-list-items"
+        logger.debug("fetching available doctors")
         # Wait for the <ul> element to be present in the DOM
-        ul_element = browser.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ul_selector)))
+        browser.locate("doctors.list")
         
-        # Find all <li> elements under the <ul> element
-        li_elements = ul_element.find_elements(By.TAG_NAME, "li")
+        # Read all <li> elements under the <ul> element in one round trip
+        item_selector, _ = browser.locate("doctors.items", required=False)
         doctor_data = []
-        
-        # Print the text of each <li> element
-        for li in li_elements:
-            lines = li.text.strip().splitlines()
+        for lines in snapshot_lines(item_selector):
             doctor_info = {
                     "doctor": lines[0],
                     "earliest_date": lines[2],
@@ -196,125 +155,118 @@ def fetch_all_available_doctor_names():
                     "clinic": lines[6]
             }
             doctor_data.append(doctor_info)
-            
-        doctors_json = json.dumps(doctor_data, ensure_ascii=False, indent=4)
-        print("Doctors (JSON):")
-        print(doctors_json)
-        # Return the list of <li> elements
+
+        logger.info("found {} doctors", len(doctor_data))
+        logger.opt(lazy=True).debug("doctors: {}", lambda: json.dumps(doctor_data, ensure_ascii=False))
         return doctor_data
     except Exception as e:
-        print(f"Error fetching doctor names: {e}")
+        logger.warning("Error fetching doctor names: {}", e)
         return False
         #return json.dumps([], ensure_ascii=False)
 
+@traced()
 def select_doctor(doctor_name):
     try:
-        print(f"selecting doctor: {doctor_name}")
-        doctor_name = normalize_string_to_lower(doctor_name)
-        doctor_list = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".ant-list-items li")))
+        logger.debug("selecting doctor: {}", doctor_name)
+        item_selector, doctor_list = browser.locate("doctors.items")
+        # Match on the doctor's name line only, so a hospital or clinic name can't pick the wrong doctor
+        names = [lines[0] if lines else "" for lines in snapshot_lines(item_selector)]
         
-        for doctor_item in doctor_list:
-            #doctor_name_div = doctor_item.find_element(By.CSS_SELECTOR, "div:nth-child(3) > div:nth-child(1)")
-            if doctor_name in normalize_string_to_lower(doctor_item.text):
-                doctor_item.click()
-                print(f"Selected doctor: {doctor_item.text}")
-                browser.wait_loading_screen()
-                return True
+        index = name_index(names).best(doctor_name) if len(names) == len(doctor_list) else None
+        if index is not None:
+            doctor_list[index].click()
+            logger.info("Selected doctor: {}", names[index])
+            browser.wait_loading_screen()
+            return True
         
-        print(f"Doctor not found: {doctor_name}")
+        logger.info("Doctor not found: {}", doctor_name)
         return False
     except Exception as e:
-        print(f"Error selecting doctor: {e}")
+        logger.warning("Error selecting doctor: {}", e)
         return False
 
+@traced()
 def fetch_available_appointment_dates():
     try:
         browser.wait_loading_screen()
         # Select all date divs within the appointment calendar
-        date_divs = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.ant-tabs-tab")))
-        print(f"found {len(date_divs)} date divs")
+        tab_selector, _ = browser.locate("dates.tabs")
+        date_texts = snapshot_texts(tab_selector)
+        logger.debug("found {} date divs", len(date_texts))
         available_dates_data = []
-        for date_div in date_divs:
-            date_text = date_div.text
+        for date_text in date_texts:
             if date_text.strip():  # Only process non-empty date divs
                 date_info = {
                     "date": date_text
                 }
                 available_dates_data.append(date_info)
 
-        dates_json = json.dumps(available_dates_data, ensure_ascii=False, indent=4)    
-        print("DATES JSON:")
-        print(dates_json)
+        logger.info("found {} available dates", len(available_dates_data))
+        logger.opt(lazy=True).debug("dates: {}", lambda: json.dumps(available_dates_data, ensure_ascii=False))
         return available_dates_data
     except Exception as e:
-        print(f"Error fetching appointment dates: {e}")
-        return json.dumps([], ensure_ascii=False)
+        logger.warning("Error fetching appointment dates: {}", e)
+        return []
 
+@traced()
 def select_day(day):
-    print("selecting day")
-    parent_div_selector = "div.ant-tabs:nth-child(3) > div:nth-child(1) > div:nth-child(1) > div:nth-child(3) > div:nth-child(1) > div:nth-child(1) > div:nth-child(1)"
-    parent_div = browser.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, parent_div_selector)))
-    date_divs = parent_div.find_elements(By.CSS_SELECTOR, "div > div")  # Adjust the selector as needed
+    logger.debug("selecting day {}", day)
+    date_divs = browser.find_all("dates.tabs")
     
     target_day = normalize_string_to_lower(day)
     for date_div in date_divs:
         normalized_date = normalize_string_to_lower(date_div.text)
         if target_day in normalized_date:
-            print(f"found target day {target_day}")
+            logger.debug("found target day {}", target_day)
             return date_div
-    print(f"Could not find available appointments on the date you are looking for: {day}")
+    logger.info("Could not find available appointments on the date you are looking for: {}", day)
     return None
 
+@traced()
 def click_on_a_day(day):
-    print("trying to click on day")
+    logger.debug("trying to click on day")
     browser.wait_loading_screen()
     day_div = browser.wait.until(EC.element_to_be_clickable(day))
     browser.wait_loading_screen()
     day_div.click()
-    print(f"clicked on day {day.text}")
+    logger.opt(lazy=True).debug("clicked on day {}", lambda: day.text)
 
+@traced()
 def fetch_all_available_time_slots_of_a_day():
     # Wait for all the divs inside .ant-tabs-tabpane to be present
     browser.wait_loading_screen()
     
-    clock_divs = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.ant-tabs-tabpane > div:nth-child(2) > div:nth-child(1) > div:nth-child(2) > div")))
-    
-    print(f"Found {len(clock_divs)} tab pane divs.")
-    browser.wait_loading_screen()
+    clock_selector, _ = browser.locate("hours.panels")
     
+    # Expand and read every hour panel in one scripted pass instead of clicking them one by one
     full_hour_data = []
-    # Iterate over each tab pane div and print or interact with the content
-    for clock_div in clock_divs:
-        main_hour_data = clock_div.text
-        print(f"Tab content: {clock_div.text}")
-        sub_hour_data = click_on_a_clock_and_list_details(clock_div)
-        
-        if not sub_hour_data:
+    for panel in snapshot_hour_slots(clock_selector):
+        if not panel["sub_hours"]:
             continue
         
         full_hour_info = {
-            "main_hour": main_hour_data,    
-            "sub_hours": sub_hour_data
+            "main_hour": panel["main_hour"],    
+            "sub_hours": [{"sub_hour": sub_hour} for sub_hour in panel["sub_hours"]]
         }
         full_hour_data.append(full_hour_info)
     
-    full_hour_JSON = json.dumps(full_hour_data, ensure_ascii=False, indent=4)
-    print("full hour JSON:")
-    print(full_hour_JSON)
+    logger.info("Found {} hour blocks with free slots.", len(full_hour_data))
+    logger.opt(lazy=True).debug("hours: {}", lambda: json.dumps(full_hour_data, ensure_ascii=False))
     return full_hour_data
 
 def click_on_a_clock_and_list_details(clock_div):
     browser.wait_loading_screen()
     clock_div.click()
-    print(f"clicked on clock {clock_div.text.strip().split()[0]}")
+    logger.opt(lazy=True).debug("clicked on clock {}", lambda: clock_div.text.strip().split()[0])
     
     sub_hour_data = []
     clickable_buttons = clock_div.find_elements(By.CSS_SELECTOR, "div > button")
-    for button in clickable_buttons:
+    for index, button in enumerate(clickable_buttons):
         sub_hour_slot = {
             "sub_hour": button.text
         }
-        print(f"button text is {button.text}")
+        if sampled(index):
+            logger.debug("button text is {}", sub_hour_slot["sub_hour"])
         sub_hour_data.append(sub_hour_slot)
         
     return sub_hour_data
@@ -326,14 +278,19 @@ def select_clock_hour(target_hour, clock_divs):
     return None
 
 # both clicks and returns the button
+@traced()
 def select_main_hour_slot(target_clock):
     #input clock=16:20
     target_clock_hour = parse_main_hour(target_clock)
-    print(f"clock is {target_clock_hour}")
-    clock_divs = browser.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.ant-collapse-item")))
+    logger.debug("clock is {}", target_clock_hour)
+    clock_divs = browser.find_all("hours.items")
     for clock_div in clock_divs:
-        if target_clock_hour in clock_div.text:
-            print(f"found target clock {target_clock_hour} in {clock_div.text}")
+        clock_text = clock_div.text
+        if target_clock_hour in clock_text:
+            logger.debug("found target clock {} in {}", target_clock_hour, clock_text)
+            # the panel may already be open after fetch_all_available_time_slots_of_a_day, clicking would collapse it
+            if "ant-collapse-item-active" in (clock_div.get_attribute("class") or ""):
+                return clock_div
             browser.wait_loading_screen()
             clock_div.click()
             return clock_div
@@ -341,16 +298,19 @@ def select_main_hour_slot(target_clock):
     return None
 
 # both clicks and returns the button
+@traced()
 def select_sub_hour_slot(target_clock):
     target_clock = normalize_to_hour_format(target_clock)
     #input clock=16:20
     #clickable_clock_buttons = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".ant-collapse-content-active > div")))
-    clickable_clock_buttons = browser.driver.find_elements(By.CSS_SELECTOR, "div.ant-collapse-content-active button.slot-saat-button")
-    print(f"found {len(clickable_clock_buttons)} time slot buttons")
-    for button in clickable_clock_buttons:
-        print(f"current button is {button.text} and looking for {target_clock}")
-        if target_clock in button.text:
-            print(f"found target clock {target_clock} in {button.text}")
+    clickable_clock_buttons = browser.find_all("hours.slot_buttons", required=False)
+    logger.debug("found {} time slot buttons", len(clickable_clock_buttons))
+    for index, button in enumerate(clickable_clock_buttons):
+        button_text = button.text
+        if sampled(index):
+            logger.debug("current button is {} and looking for {}", button_text, target_clock)
+        if target_clock in button_text:
+            logger.debug("found target clock {} in {}", target_clock, button_text)
             button.click()
             browser.wait_loading_screen()
             return button
@@ -0,0 +1,247 @@
+from datetime import datetime
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+from core.clients.browser_pool import BrowserPool
+from core.clients.request_scheduler import BACKGROUND_JOB
+from core.services.appointment_service import sweep_slot_matrix, book_appointment
+from core.services.availability_cache import UNCACHEABLE_STATUSES
+from utils.appointment_status import AppointmentStatus
+from utils.watch_status import WatchStatus
+from utils.string_utils import normalize_date_format, normalize_to_hour_format
+from utils.log import logger
+
+load_dotenv()
+
+WATCH_FILE = os.path.expanduser(os.getenv("MHRS_WATCH_FILE", "~/.mhrs-mcp/watches.json"))
+BASE_INTERVAL = float(os.getenv("MHRS_WATCH_INTERVAL", "120"))
+MIN_INTERVAL = float(os.getenv("MHRS_WATCH_MIN_INTERVAL", "30"))
+MAX_INTERVAL = float(os.getenv("MHRS_WATCH_MAX_INTERVAL", "900"))
+JITTER = 0.2
+# Times of day ("HH:MM-HH:MM") when cancelled slots are typically released back to MHRS
+HOT_WINDOWS = os.getenv("MHRS_WATCH_HOT_WINDOWS", "07:55-08:20,12:55-13:15,16:55-17:15")
+
+def _pad_date(date_str):
+    day, month, year = normalize_date_format(date_str).split(".")
+    return f"{int(day):02d}.{int(month):02d}.{year}"
+
+def _parse_windows(spec):
+    windows = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        start, _, end = part.partition("-")
+        windows.append((normalize_to_hour_format(start), normalize_to_hour_format(end)))
+    return windows
+
+def in_hot_window(now, windows):
+    clock = now.strftime("%H:%M")
+    for start, end in windows:
+        if (start <= clock <= end) if start <= end else (clock >= start or clock <= end):
+            return True
+    return False
+
+class WatchScheduler:
+    """
+    Persistent availability watches, e.g. for searches that answered RND4030.
+
+    A background thread polls each active watch with its own interval: it halves after a
+    check that saw availability move and grows by half after a quiet one, is pinned to the
+    minimum inside hot windows and in hours where releases were seen before, and gets ±20%
+    jitter. On a match the watch either records it for the user or books it right away.
+    Checks run outside the lock but change the watch under it, and only while it is still
+    active, so a cancel() that lands mid-check is never overwritten.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(WatchScheduler, cls).__new__(cls)
+            cls._instance.path = WATCH_FILE
+            cls._instance.hot_windows = _parse_windows(HOT_WINDOWS)
+            cls._instance.condition = threading.Condition()
+            cls._instance.thread = None
+            state = cls._instance._load()
+            cls._instance.watches = state.get("watches", {})
+            for watch in cls._instance.watches.values():
+                if watch["status"] == WatchStatus.BOOKING.value:
+                    watch["status"] = WatchStatus.ACTIVE.value  # the process stopped mid-booking
+            # release hour -> count of checks that found new slots in that hour
+            cls._instance.release_hours = state.get("release_hours", {})
+        return cls._instance
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning("Ignoring unreadable watch file: {}", e)
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"watches": self.watches, "release_hours": self.release_hours}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def start(self):
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._loop, name="mhrs-watch-scheduler", daemon=True)
+                self.thread.start()
+
+    def register(self, city, district, specialty, hospital, doctor_name=None, date=None, time_from=None, time_to=None, auto_book=False):
+        watch = {
+            "id": uuid.uuid4().hex[:8],
+            "search": [city, district, specialty, hospital],
+            "doctor_name": doctor_name,
+            "date": _pad_date(date) if date else None,
+            "time_from": normalize_to_hour_format(time_from) if time_from else None,
+            "time_to": normalize_to_hour_format(time_to) if time_to else None,
+            "auto_book": bool(auto_book),
+            "status": WatchStatus.ACTIVE.value,
+            "created_at": time.time(),
+            "interval": BASE_INTERVAL,
+            "next_check_at": time.time(),
+            "checks": 0,
+            "last_checked_at": None,
+            "last_slot_count": None,
+            "last_slots": None,
+            "match": None,
+            "events": [],
+        }
+        with self.condition:
+            self.watches[watch["id"]] = watch
+            self._save()
+            self.condition.notify_all()
+        self.start()
+        return watch
+
+    def list(self):
+        with self.condition:
+            return [dict(watch) for watch in self.watches.values()]
+
+    def cancel(self, watch_id):
+        with self.condition:
+            watch = self.watches.get(watch_id)
+            if watch is None:
+                return None
+            watch["status"] = WatchStatus.CANCELLED.value
+            self._save()
+            self.condition.notify_all()
+            return dict(watch)
+
+    def _loop(self):
+        while True:
+            with self.condition:
+                active = [w for w in self.watches.values() if w["status"] == WatchStatus.ACTIVE.value]
+                if not active:
+                    self.condition.wait()
+                    continue
+                watch = min(active, key=lambda w: w["next_check_at"])
+                delay = watch["next_check_at"] - time.time()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+            try:
+                self._check(watch)
+            except Exception as e:
+                logger.warning("Watch {} check failed: {}", watch['id'], e)
+                with self.condition:
+                    self._event(watch, "error", str(e))
+            with self.condition:
+                watch["next_check_at"] = time.time() + self._next_interval(watch)
+                self._save()
+
+    def _matching_slots(self, watch, data):
+        slots = []
+        for doctor in data:
+            for date in doctor["dates"]:
+                if watch["date"] and _pad_date(date["date"]) != watch["date"]:
+                    continue
+                for hour in date["hours"]:
+                    for sub_hour in hour["sub_hours"]:
+                        clock = normalize_to_hour_format(sub_hour["sub_hour"])
+                        if watch["time_from"] and clock < watch["time_from"]:
+                            continue
+                        if watch["time_to"] and clock > watch["time_to"]:
+                            continue
+                        slots.append({"doctor": doctor["doctor"], "date": _pad_date(date["date"]), "time": clock})
+        slots.sort(key=lambda slot: (slot["date"][6:], slot["date"][3:5], slot["date"][:2], slot["time"]))
+        return slots
+
+    def _check(self, watch):
+        with self.condition:
+            watch["checks"] += 1
+            watch["last_checked_at"] = time.time()
+        search = watch["search"]
+
+        # A fresh search every time, never results still open in a session (a release would be
+        # seen late); the sweep stops after the doctor list when MHRS offers nothing at all
+        sweep = BrowserPool().run(sweep_slot_matrix, *search, watch["doctor_name"], refresh=True, lazy=True, job=(BACKGROUND_JOB, None))
+        slots = []
+        if sweep["status"] == AppointmentStatus.SUCCESS:
+            slots = self._matching_slots(watch, sweep["data"])
+
+        # a failed sweep says nothing about the slots, it must not look like they all went away
+        answered = sweep["status"] not in UNCACHEABLE_STATUSES
+        seen = {f"{slot['doctor']}|{slot['date']}|{slot['time']}" for slot in slots}
+        with self.condition:
+            previous = watch.get("last_slots")  # None for watches saved before the slots were kept
+            if answered and previous is not None and seen != set(previous):
+                watch["interval"] = max(MIN_INTERVAL, watch["interval"] / 2)
+                if seen - set(previous):  # slots taken by others are no release
+                    hour = str(datetime.now().hour)
+                    self.release_hours[hour] = self.release_hours.get(hour, 0) + 1
+            else:
+                watch["interval"] = min(MAX_INTERVAL, watch["interval"] * 1.5)
+            if answered:
+                watch["last_slots"] = sorted(seen)
+                watch["last_slot_count"] = len(slots)
+
+            if not slots or watch["status"] != WatchStatus.ACTIVE.value:
+                return
+            slot = slots[0]
+            watch["match"] = slot
+            if not watch["auto_book"]:
+                watch["status"] = WatchStatus.MATCHED.value
+                self._event(watch, "match", f"{slot['doctor']} {slot['date']} {slot['time']} is available")
+                return
+            # claimed under the lock: a cancel() from here on is seen when the booking returns
+            watch["status"] = WatchStatus.BOOKING.value
+
+        result = None
+        try:
+            result = BrowserPool().run(book_appointment, *search, slot["doctor"], slot["date"], slot["time"], lazy=True)
+        finally:
+            with self.condition:
+                cancelled = watch["status"] == WatchStatus.CANCELLED.value
+                if result is not None and result["status"] == AppointmentStatus.SUCCESS:
+                    watch["status"] = WatchStatus.BOOKED.value
+                    note = " (the watch was cancelled while booking)" if cancelled else ""
+                    self._event(watch, "booked", f"Booked {slot['doctor']} {slot['date']} {slot['time']}{note}")
+                else:
+                    if not cancelled:
+                        # stay active: the slot was probably taken first, keep watching for the next one
+                        watch["status"] = WatchStatus.ACTIVE.value
+                    if result is not None:
+                        self._event(watch, "booking_failed", f"{slot['date']} {slot['time']}: {result['status']}")
+
+    def _event(self, watch, kind, message):
+        logger.info("watch {} {}: {}", watch['id'], kind, message)
+        watch["events"] = (watch["events"] + [{"at": time.time(), "kind": kind, "message": message}])[-20:]
+
+    def _next_interval(self, watch):
+        now = datetime.now()
+        interval = watch["interval"]
+        counts = self.release_hours.values()
+        hot_hour = counts and self.release_hours.get(str(now.hour), 0) > sum(counts) / 24 * 2
+        if in_hot_window(now, self.hot_windows) or hot_hour:
+            interval = MIN_INTERVAL
+        return interval * random.uniform(1 - JITTER, 1 + JITTER)
@@ -0,0 +1 @@
+# Mock MHRS servers package initialization
\ No newline at end of file
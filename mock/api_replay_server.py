@@ -0,0 +1,73 @@
+"""
+Local stand-in for the MHRS JSON API that replays responses recorded by HttpMhrsClient.
+
+Record a session against the real site with MHRS_API_RECORD_DIR=<dir>, then serve it with
+
+    python mock/api_replay_server.py <dir>/recording.jsonl --port 8765
+
+and point the client at it with MHRS_API_BASE_URL=http://127.0.0.1:8765/api
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import threading
+
+
+def load_recording(path):
+    responses = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            key = (record["method"], record["path"], json.dumps(record.get("body"), sort_keys=True))
+            # the last response recorded for a request wins
+            responses[key] = (record["status"], record["response"])
+    return responses
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    responses = {}
+    api_prefix = "/api"
+
+    def _replay(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        path = self.path[len(self.api_prefix):] if self.path.startswith(self.api_prefix) else self.path
+
+        status, payload = self.responses.get(
+            (method, path, json.dumps(body, sort_keys=True)),
+            (404, {"success": False, "errors": [{"kodu": "REPLAY404", "mesaj": f"No recorded response for {method} {path}"}]}),
+        )
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._replay("GET")
+
+    def do_POST(self):
+        self._replay("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+def start_replay_server(recording_path, host="127.0.0.1", port=0):
+    """Starts the server on a background thread and returns it; server.server_port has the port."""
+    handler = type("RecordedReplayHandler", (ReplayHandler,), {"responses": load_recording(recording_path)})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded MHRS API responses")
+    parser.add_argument("recording", help="recording.jsonl written by HttpMhrsClient")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = start_replay_server(args.recording, args.host, args.port)
+    print(f"Replaying {args.recording} on http://{args.host}:{server.server_port}/api")
+    threading.Event().wait()
@@ -0,0 +1,450 @@
+// Mock of the MHRS citizen app. The markup mirrors the Ant Design DOM of the real site closely
+// enough for the selectors in core/services; the data comes from mhrs_spa_server.py.
+(function () {
+    var TOKEN_KEY = 'mhrs-mock-token';
+    var root = document.getElementById('root');
+    var modalRoot = document.getElementById('modal-root');
+    var spinRoot = document.getElementById('spin-root');
+    var pending = 0;
+    var optionCache = {};
+    var state = {form: {}, openDropdown: null, doctors: null, slots: null};
+
+    var LEVELS = [
+        {key: 'city', level: 'cities', label: 'İl', id: 'il-tree-select'},
+        {key: 'district', level: 'districts', label: 'İlçe', id: 'randevuAramaForm_ilce'},
+        {key: 'clinic', level: 'clinics', label: 'Klinik', id: 'klinik-tree-select'},
+        {key: 'hospital', level: 'hospitals', label: 'Hastane', id: 'hastane-tree-select'}
+    ];
+
+    function el(tag, attrs, children) {
+        var node = document.createElement(tag);
+        Object.keys(attrs || {}).forEach(function (name) {
+            if (name === 'onclick') { node.onclick = attrs[name]; }
+            else if (name === 'text') { node.textContent = attrs[name]; }
+            else { node.setAttribute(name, attrs[name]); }
+        });
+        (children || []).forEach(function (child) { if (child) { node.appendChild(child); } });
+        return node;
+    }
+
+    function updateSpinner() {
+        spinRoot.innerHTML = '';
+        if (pending > 0) { spinRoot.appendChild(el('div', {'class': 'ant-spin ant-spin-spinning'}, [el('span', {'class': 'ant-spin-dot'})])); }
+    }
+
+    // The spinner shows from the moment a call starts until its callback has run, so calls
+    // chained from a callback keep it up without a gap.
+    function call(action, body, onSuccess) {
+        pending++;
+        updateSpinner();
+        fetch('/mock-api/' + action, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'Authorization': 'Bearer ' + (localStorage.getItem(TOKEN_KEY) || '')},
+            body: JSON.stringify(body || {})
+        }).then(function (response) {
+            return response.json().then(function (data) { return {status: response.status, data: data}; });
+        }).then(function (result) {
+            if (result.status === 401) {
+                localStorage.removeItem(TOKEN_KEY);
+                confirmModal('Uyarı', result.data.error.message, [{label: 'Tamam', primary: true}]);
+                goHome();
+            } else {
+                onSuccess(result.data);
+            }
+        }).catch(function (e) {
+            confirmModal('Hata', 'Beklenmeyen bir hata oluştu: ' + e, [{label: 'Tamam', primary: true}]);
+        }).then(function () {
+            pending--;
+            updateSpinner();
+        });
+    }
+
+    // --- modals ---------------------------------------------------------------------------
+
+    function closeModal(wrap) {
+        if (wrap.parentNode) { wrap.parentNode.removeChild(wrap); }
+    }
+
+    function buttons(specs, wrap) {
+        return specs.map(function (spec) {
+            return el('button', {
+                type: 'button',
+                'class': 'ant-btn' + (spec.primary ? ' ant-btn-primary' : ''),
+                text: spec.label,
+                onclick: function () {
+                    closeModal(wrap);
+                    if (spec.onClick) { spec.onClick(); }
+                }
+            });
+        });
+    }
+
+    // Ant's Modal.confirm: the text sits in .ant-modal-confirm-content, the buttons in .ant-modal-confirm-btns
+    function confirmModal(title, text, specs) {
+        var wrap = el('div', {'class': 'ant-modal-wrap', role: 'dialog'});
+        var btns = el('div', {'class': 'ant-modal-confirm-btns'}, buttons(specs, wrap));
+        wrap.appendChild(el('div', {'class': 'ant-modal ant-modal-confirm'}, [
+            el('div', {tabindex: '0', 'aria-hidden': 'true', style: 'width: 0; height: 0; overflow: hidden;'}),
+            el('div', {'class': 'ant-modal-content'}, [
+                el('div', {'class': 'ant-modal-header', text: title}),
+                el('div', {'class': 'ant-modal-body'}, [
+                    el('div', {'class': 'ant-modal-confirm-body-wrapper'}, [
+                        el('div', {'class': 'ant-modal-confirm-body'}, [
+                            el('span', {'class': 'ant-modal-confirm-title', text: title}),
+                            el('div', {'class': 'ant-modal-confirm-content', text: text})
+                        ]),
+                        btns
+                    ])
+                ])
+            ])
+        ]));
+        modalRoot.appendChild(wrap);
+        return wrap;
+    }
+
+    // A plain Modal with its buttons in the footer
+    function footerModal(title, text, specs) {
+        var wrap = el('div', {'class': 'ant-modal-wrap', role: 'dialog'});
+        wrap.appendChild(el('div', {'class': 'ant-modal'}, [
+            el('div', {tabindex: '0', 'aria-hidden': 'true', style: 'width: 0; height: 0; overflow: hidden;'}),
+            el('div', {'class': 'ant-modal-content'}, [
+                el('div', {'class': 'ant-modal-header', text: title}),
+                el('div', {'class': 'ant-modal-body', text: text}),
+                el('div', {'class': 'ant-modal-footer'}, [el('div', {}, buttons(specs, wrap))])
+            ])
+        ]));
+        modalRoot.appendChild(wrap);
+        return wrap;
+    }
+
+    function errorModal(error) {
+        confirmModal('Uyarı', error.message, [{label: 'Tamam', primary: true}]);
+    }
+
+    // --- pages ----------------------------------------------------------------------------
+
+    function loginPage() {
+        var username = el('input', {id: 'LoginForm_username', 'class': 'ant-input', placeholder: 'T.C. Kimlik Numarası'});
+        var password = el('input', {id: 'LoginForm_password', 'class': 'ant-input', type: 'password', placeholder: 'Parola'});
+        var login = el('button', {type: 'button', 'class': 'ant-btn ant-btn-teal ant-btn-block', text: 'Giriş Yap', onclick: function () {
+            if (!username.value || !password.value) {
+                errorModal({message: 'Kimlik numarası ve parola zorunludur.'});
+                return;
+            }
+            call('login', {username: username.value, password: password.value}, function (data) {
+                localStorage.setItem(TOKEN_KEY, data.token);
+                goHome();
+                confirmModal('Bilgilendirme', 'Şikayetinize uygun kliniği bulmak için "Neyim Var?" özelliğini kullanabilirsiniz.', [{label: 'Kapat'}, {label: 'Neyim Var?', primary: true}]);
+            });
+        }});
+        return el('div', {'class': 'login-page'}, [el('form', {id: 'LoginForm', 'class': 'ant-form'}, [username, password, login])]);
+    }
+
+    function card(title, onclick) {
+        return el('div', {'class': 'randevu-card-dissiz'}, [
+            el('div', {}, [el('div', {}, [
+                el('div', {'class': 'card-icon'}),
+                el('div', {'class': 'card-title', text: title, onclick: onclick})
+            ])])
+        ]);
+    }
+
+    function appointmentItem(appointment) {
+        var revertable = appointment.status === 'Geri Alınabilir Randevu';
+        var lines = [
+            appointment.date + ' ' + appointment.time,
+            appointment.status,
+            revertable ? 'Randevu değişikliğinizi geri alabilirsiniz.' : 'Randevu saatinden 15 dakika önce hastanede olunuz.',
+            appointment.hospital,
+            appointment.department,
+            appointment.clinic,
+            appointment.doctor
+        ].map(function (line) { return el('div', {text: line}); });
+        var action = revertable
+            ? el('button', {type: 'button', 'class': 'ant-btn ant-btn-primary', text: 'Geri Al', onclick: function () {
+                confirmModal('Geri Al', 'Randevu değişikliği geri alınsın mı?', [{label: 'Geri Al', primary: true, onClick: function () {
+                    call('revert', {id: appointment.id}, function (data) {
+                        if (data.error) { errorModal(data.error); } else { render(); }
+                    });
+                }}, {label: 'Vazgeç'}]);
+            }})
+            : el('button', {type: 'button', 'class': 'ant-btn ant-btn-danger', text: 'İptal Et', onclick: function () {
+                confirmModal('Randevu İptali', 'Randevunuz iptal edilsin mi?', [{label: 'Vazgeç'}, {label: 'Evet', primary: true, onClick: function () {
+                    call('cancel', {id: appointment.id}, function (data) {
+                        if (data.error) { errorModal(data.error); return; }
+                        confirmModal('Bilgilendirme', data.message, [{label: 'Tamam', primary: true, onClick: render}]);
+                    });
+                }}]);
+            }});
+        return el('li', {'class': 'ant-list-item'}, lines.concat([el('div', {'class': 'ant-list-item-action'}, [action])]));
+    }
+
+    function homePage() {
+        var page = el('div', {'class': 'home'}, [
+            el('div', {'class': 'randevu-cards'}, [
+                card('Randevularım'),
+                card('Hastaneden Randevu Al', function () { location.hash = '#/randevu-turu'; }),
+                card('Aile Hekiminden Randevu Al')
+            ]),
+            el('h3', {text: 'Randevularım'})
+        ]);
+        call('appointments', {}, function (data) {
+            if (data.appointments.length) {
+                page.appendChild(el('ul', {'class': 'ant-list-items'}, data.appointments.map(appointmentItem)));
+            } else {
+                page.appendChild(el('div', {'class': 'ant-empty-description', text: 'Aktif randevunuz bulunmamaktadır.'}));
+            }
+        });
+        return page;
+    }
+
+    function appointmentTypePage() {
+        return el('div', {'class': 'randevu-turu'}, [
+            el('button', {type: 'button', 'class': 'ant-btn randevu-turu-button', text: 'Genel Randevu Arama', onclick: function () {
+                state.form = {};
+                state.openDropdown = null;
+                location.hash = '#/genel-randevu-arama';
+            }}),
+            el('button', {type: 'button', 'class': 'ant-btn randevu-turu-button', text: 'Hekime Randevu Arama'})
+        ]);
+    }
+
+    function parentsOf(index) {
+        return LEVELS.slice(0, index).map(function (level) { return state.form[level.key]; });
+    }
+
+    function withOptions(index, then) {
+        var cacheKey = LEVELS[index].level + '|' + parentsOf(index).join('|');
+        if (optionCache[cacheKey]) { then(optionCache[cacheKey]); return; }
+        call('options', {level: LEVELS[index].level, parents: parentsOf(index)}, function (data) {
+            optionCache[cacheKey] = data.options;
+            then(data.options);
+        });
+    }
+
+    function selectOption(index, name) {
+        state.form[LEVELS[index].key] = name;
+        LEVELS.slice(index + 1).forEach(function (level) { delete state.form[level.key]; });
+        state.openDropdown = null;
+        renderForm();
+        // like the real form, picking a value loads the next dropdown's options right away
+        if (index + 1 < LEVELS.length) { withOptions(index + 1, function () {}); }
+    }
+
+    function optionList(index, names) {
+        var items = names.map(function (name) {
+            return el('li', {title: name, onclick: function () { selectOption(index, name); }}, [el('span', {'class': 'ant-select-tree-title', text: name})]);
+        });
+        if (index === 0) {
+            return el('div', {'class': 'ant-select-dropdown'}, [el('ul', {'class': 'ant-select-tree', role: 'tree'}, items)]);
+        }
+        if (index === 1) {
+            items.forEach(function (item) { item.className = 'ant-select-dropdown-menu-item'; });
+            return el('div', {'class': 'ant-select-dropdown'}, [el('ul', {'class': 'ant-select-dropdown-menu', role: 'listbox'}, items)]);
+        }
+        return el('div', {'class': 'ant-select-dropdown'}, [
+            el('div', {id: 'rc-tree-select-list_' + index}, [
+                el('span', {'class': 'ant-select-tree-treenode-switcher'}),
+                el('ul', {'class': 'ant-select-tree-list', role: 'tree'}, items)
+            ])
+        ]);
+    }
+
+    function renderForm() {
+        var form = document.getElementById('randevuAramaForm');
+        if (!form) { return; }
+        LEVELS.forEach(function (level, index) {
+            var slot = document.getElementById(level.id + '-dropdown');
+            slot.innerHTML = '';
+            document.getElementById(level.id).textContent = state.form[level.key] || 'Seçiniz';
+            if (state.openDropdown === index && optionCache[level.level + '|' + parentsOf(index).join('|')]) {
+                slot.appendChild(optionList(index, optionCache[level.level + '|' + parentsOf(index).join('|')]));
+            }
+        });
+    }
+
+    function searchFormPage() {
+        var items = LEVELS.map(function (level, index) {
+            return el('div', {'class': 'ant-form-item'}, [
+                el('label', {text: level.label}),
+                el('div', {id: level.id, 'class': 'ant-select', role: 'combobox', onclick: function () {
+                    if (index > 0 && !state.form[LEVELS[index - 1].key] && index !== 2) { return; }
+                    state.openDropdown = state.openDropdown === index ? null : index;
+                    renderForm();
+                    if (state.openDropdown === index) { withOptions(index, renderForm); }
+                }}),
+                el('div', {id: level.id + '-dropdown'})
+            ]);
+        });
+        var search = el('button', {id: 'randevu-ara-buton', type: 'button', 'class': 'ant-btn ant-btn-primary', text: 'Randevu Ara', onclick: function () {
+            if (!state.form.city || !state.form.clinic) {
+                errorModal({message: 'İl ve klinik seçimi zorunludur.'});
+                return;
+            }
+            state.openDropdown = null;
+            renderForm();
+            call('search', state.form, function (data) {
+                if (data.error && data.error.code === 'RND4030') {
+                    confirmModal('Bilgilendirme', data.error.message, [{label: 'Hayır'}, {label: 'Evet', primary: true}]);
+                } else if (data.error) {
+                    errorModal(data.error);
+                } else {
+                    state.doctors = data.doctors;
+                    location.hash = '#/randevu/hekimler';
+                }
+            });
+        }});
+        var page = el('div', {'class': 'genel-randevu-arama'}, [el('form', {id: 'randevuAramaForm', 'class': 'ant-form'}, items.concat([search]))]);
+        setTimeout(renderForm, 0);
+        return page;
+    }
+
+    function doctorListPage() {
+        return el('div', {'class': 'hekim-listesi'}, [
+            el('ul', {'class': 'ant-list-items'}, state.doctors.map(function (doctor) {
+                return el('li', {'class': 'ant-list-item', onclick: function () { location.hash = '#/randevu/hekim/' + doctor.id; }},
+                    [doctor.name, 'En Erken Randevu', doctor.earliest, doctor.days_left, doctor.hospital, doctor.department, doctor.clinic].map(function (line) {
+                        return el('div', {text: line});
+                    }));
+            }))
+        ]);
+    }
+
+    function book(doctor, date, clock, force) {
+        call('book', {doctor: doctor.id, date: date, time: clock, force: force}, function (data) {
+            if (data.error && data.error.code === 'RND5015') {
+                confirmModal('Uyarı', data.error.message, [{label: 'Hayır'}, {label: 'Evet', primary: true, onClick: function () { book(doctor, date, clock, true); }}]);
+            } else if (data.error) {
+                errorModal(data.error);
+            } else {
+                confirmModal('Bilgilendirme', data.message, [{label: 'Tamam', primary: true, onClick: goHome}]);
+            }
+        });
+    }
+
+    function slotButton(doctor, date, clock) {
+        return el('div', {}, [el('button', {type: 'button', 'class': 'ant-btn slot-saat-button', text: clock, onclick: function () {
+            confirmModal('Randevu Onayı', doctor.name + ' ' + date + ' ' + clock + ' randevusunu almak istiyor musunuz?', [
+                {label: 'Vazgeç'},
+                {label: 'Evet', primary: true, onClick: function () {
+                    footerModal('Randevu Bilgileri', doctor.hospital + ' / ' + doctor.clinic + ' / ' + date + ' ' + clock, [
+                        {label: 'Vazgeç'},
+                        {label: 'Randevuyu Onayla', primary: true, onClick: function () { book(doctor, date, clock, false); }}
+                    ]);
+                }}
+            ]);
+        }})]);
+    }
+
+    // Accordion of hour panels; a panel's slot buttons only exist while it is open
+    function hourPanels(doctor, date, hours) {
+        var collapse = el('div', {'class': 'ant-collapse ant-collapse-icon-position-left', role: 'tablist'});
+        hours.forEach(function (hour) {
+            var item = el('div', {'class': 'ant-collapse-item'});
+            var header = el('div', {'class': 'ant-collapse-header', role: 'button', text: hour.hour});
+            item.appendChild(header);
+            item.onclick = function (event) {
+                if (event.target.closest('.ant-collapse-content')) { return; }
+                var open = item.classList.contains('ant-collapse-item-active');
+                Array.prototype.forEach.call(collapse.children, function (other) {
+                    other.classList.remove('ant-collapse-item-active');
+                    var content = other.querySelector('.ant-collapse-content');
+                    if (content) { other.removeChild(content); }
+                });
+                if (!open) {
+                    item.classList.add('ant-collapse-item-active');
+                    item.appendChild(el('div', {'class': 'ant-collapse-content ant-collapse-content-active', role: 'tabpanel'}, [
+                        el('div', {'class': 'ant-collapse-content-box'}, [el('div', {}, hour.slots.map(function (clock) { return slotButton(doctor, date, clock); }))])
+                    ]));
+                }
+            };
+            collapse.appendChild(item);
+        });
+        return el('div', {'class': 'ant-tabs-tabpane ant-tabs-tabpane-active', role: 'tabpanel'}, [
+            el('div', {'class': 'gun-ozeti', text: date + ' tarihli uygun saatler'}),
+            el('div', {}, [el('div', {}, [el('div', {'class': 'saat-baslik', text: 'Saat Seçiniz'}), collapse])])
+        ]);
+    }
+
+    function doctorPage(doctor) {
+        var tabRow = el('div', {});
+        var content = el('div', {'class': 'ant-tabs-content ant-tabs-top-content'});
+        var page = el('div', {'class': 'hekim-sayfasi'}, [
+            el('div', {'class': 'sayfa-basligi', text: 'Randevu Tarihi Seçiniz'}),
+            el('div', {'class': 'hekim-bilgisi', text: doctor.name + ' - ' + doctor.hospital}),
+            el('div', {'class': 'ant-tabs ant-tabs-top'}, [
+                el('div', {'class': 'ant-tabs-bar', role: 'tablist'}, [
+                    el('div', {'class': 'ant-tabs-nav-container'}, [
+                        el('span', {'class': 'ant-tabs-tab-prev'}),
+                        el('span', {'class': 'ant-tabs-tab-next'}),
+                        el('div', {'class': 'ant-tabs-nav-wrap'}, [
+                            el('div', {'class': 'ant-tabs-nav-scroll'}, [el('div', {'class': 'ant-tabs-nav'}, [tabRow])])
+                        ])
+                    ])
+                ]),
+                content
+            ])
+        ]);
+
+        function selectTab(tab, date) {
+            Array.prototype.forEach.call(tabRow.children, function (other) { other.classList.remove('ant-tabs-tab-active'); });
+            tab.classList.add('ant-tabs-tab-active');
+            content.innerHTML = '';
+            call('slots', {doctor: doctor.id, date: date}, function (data) {
+                if (tab.classList.contains('ant-tabs-tab-active')) { content.appendChild(hourPanels(doctor, date, data.hours)); }
+            });
+        }
+
+        call('dates', {doctor: doctor.id}, function (data) {
+            data.dates.forEach(function (date, index) {
+                var tab = el('div', {'class': 'ant-tabs-tab', role: 'tab', text: date});
+                tab.onclick = function () {
+                    // like the real tabs, an already selected day is not reloaded
+                    if (!tab.classList.contains('ant-tabs-tab-active')) { selectTab(tab, date); }
+                };
+                tabRow.appendChild(tab);
+                if (index === 0) { selectTab(tab, date); }
+            });
+        });
+        return page;
+    }
+
+    // --- routing --------------------------------------------------------------------------
+
+    function goHome() {
+        if (location.hash === '#/') { render(); } else { location.hash = '#/'; }
+    }
+
+    function render() {
+        var route = location.hash.replace(/^#/, '') || '/';
+        var page;
+        if (!localStorage.getItem(TOKEN_KEY)) {
+            page = loginPage();
+        } else if (route === '/randevu-turu') {
+            page = appointmentTypePage();
+        } else if (route === '/genel-randevu-arama') {
+            page = searchFormPage();
+        } else if (route === '/randevu/hekimler' && state.doctors) {
+            page = doctorListPage();
+        } else if (route.indexOf('/randevu/hekim/') === 0 && state.doctors) {
+            var id = route.split('/').pop();
+            var doctor = state.doctors.filter(function (d) { return d.id === id; })[0];
+            page = doctor ? doctorPage(doctor) : doctorListPage();
+        } else if (route.indexOf('/randevu') === 0) {
+            page = appointmentTypePage();
+        } else {
+            page = homePage();
+        }
+        root.innerHTML = '';
+        root.appendChild(page);
+    }
+
+    document.addEventListener('keydown', function (event) {
+        if (event.key === 'Escape' && state.openDropdown !== null) {
+            state.openDropdown = null;
+            renderForm();
+        }
+    });
+    window.addEventListener('hashchange', render);
+    render();
+})();
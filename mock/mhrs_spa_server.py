@@ -0,0 +1,330 @@
+"""
+Local stand-in for the MHRS citizen web app (https://mhrs.gov.tr/vatandas/), for offline runs
+and benchmarks of the browser tools.
+
+The page in mock/mhrs_spa/ reproduces the DOM the selectors in user_service and
+appointment_service rely on: the login form, the landing cards, the search form dropdown
+trees, the doctor list, date tabs, hour panels, `.ant-spin-spinning` while a request is in
+flight and the confirm modals with their RND codes. Its data comes from a generated fixture
+served by the JSON endpoints below, each delayed by the configured latency.
+
+    python mock/mhrs_spa_server.py --port 8766 --latency 300 --jitter 100
+
+and point the server at it with MHRS_BASE_URL=http://127.0.0.1:8766/vatandas/#/
+(any username / password logs in).
+"""
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+SPA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mhrs_spa")
+APP_PREFIX = "/vatandas"
+API_PREFIX = "/mock-api/"
+
+CITIES = {
+    "İZMİR": ["URLA", "KARŞIYAKA", "BORNOVA"],
+    "ANKARA": ["ÇANKAYA", "KEÇİÖREN"],
+    "İSTANBUL": ["KADIKÖY", "ÜSKÜDAR", "BEŞİKTAŞ"],
+}
+CLINICS = ["DERMATOLOJİ (CİLDİYE)", "GÖZ HASTALIKLARI", "KARDİYOLOJİ", "KULAK BURUN BOĞAZ HASTALIKLARI", "ORTOPEDİ VE TRAVMATOLOJİ"]
+# Searches in this clinic never have free slots and answer RND4030, like a fully booked clinic
+FULL_CLINIC = "KULAK BURUN BOĞAZ HASTALIKLARI"
+FIRST_NAMES = ["AYŞE", "MEHMET", "ELİF", "MUSTAFA", "ZEYNEP", "EMRE", "FATMA", "BURAK", "EYLEM", "CAN"]
+LAST_NAMES = ["YILMAZ", "KAYA", "DEMİR", "ŞAHİN", "ÇELİK", "YILDIZ", "ÖZTÜRK", "AYDIN", "ARSLAN", "KOÇ"]
+HOURS = ["08:00", "09:00", "10:00", "11:00", "13:00", "14:00", "15:00", "16:00"]
+MINUTES = ["00", "10", "20", "30", "40", "50"]
+
+RND4030 = "RND4030 Aradığınız kriterlere uygun randevu bulunamamıştır. Uygun randevu açıldığında bildirim almak ister misiniz?"
+RND5015 = "RND5015 Aynı klinikte aktif randevunuz bulunmaktadır. Mevcut randevunuz iptal edilerek yeni randevu alınsın mı?"
+RND5036 = "RND5036 Randevunuz başarıyla oluşturulmuştur."
+RND4010 = "RND4010 Seçtiğiniz randevu saati başka bir kullanıcı tarafından alınmıştır."
+
+def hospitals_of(district):
+    return [f"{district} DEVLET HASTANESİ", f"{district} EĞİTİM VE ARAŞTIRMA HASTANESİ"]
+
+def format_date(day):
+    return day.strftime("%d.%m.%Y")
+
+class MockMhrs:
+    """
+    The fixture and the per-user state (bookings, cancellations) behind the mock API.
+
+    Doctors, their working days and free slots are generated from `seed`, so two servers
+    started with the same arguments serve the same data. Booked slots disappear from the
+    listings and reappear when the appointment is cancelled.
+    """
+    def __init__(self, seed=1, days=14, doctors=4, session_ttl=0):
+        self.seed = seed
+        self.days = days
+        self.doctors_per_search = doctors
+        self.session_ttl = session_ttl
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            rng = random.Random(self.seed)
+            today = date.today()
+            workdays = [today + timedelta(days=n) for n in range(1, self.days * 2) if (today + timedelta(days=n)).weekday() < 5][:self.days]
+            self.doctors = {}
+            self.searches = {}
+            for city, districts in CITIES.items():
+                for district in districts:
+                    for clinic in CLINICS:
+                        for hospital in hospitals_of(district):
+                            ids = []
+                            if clinic != FULL_CLINIC:
+                                for _ in range(rng.randint(1, self.doctors_per_search)):
+                                    doctor_id = uuid.UUID(int=rng.getrandbits(128)).hex[:10]
+                                    slots = {}
+                                    for day in sorted(rng.sample(workdays, rng.randint(1, len(workdays)))):
+                                        clocks = [f"{hour[:2]}:{minute}" for hour in sorted(rng.sample(HOURS, rng.randint(1, 4))) for minute in MINUTES if rng.random() < 0.5]
+                                        if clocks:
+                                            slots[format_date(day)] = clocks
+                                    self.doctors[doctor_id] = {
+                                        "id": doctor_id,
+                                        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                                        "hospital": hospital,
+                                        "department": clinic,
+                                        "clinic": f"{clinic.split(' (')[0]} POLİKLİNİĞİ",
+                                        "slots": slots,
+                                    }
+                                    ids.append(doctor_id)
+                            self.searches[(city, district, clinic, hospital)] = ids
+            self.appointments = []
+            self.tokens = {}
+            self.calls = {}
+        self.reset_appointments()
+
+    def reset_appointments(self):
+        """
+        Frees every booked slot and puts back the account's starting appointments: one plain
+        and one still revertable, like an account that used MHRS before.
+        """
+        with self.lock:
+            for appointment in list(self.appointments):
+                self._free(appointment)
+            doctors = list(self.doctors.values())
+            for status, doctor in (("Aktif Randevu", doctors[0]), ("Geri Alınabilir Randevu", doctors[len(doctors) // 2])):
+                day = next(day for day, clocks in doctor["slots"].items() if clocks)
+                self._add_appointment(doctor, day, doctor["slots"][day].pop(0), status)
+
+    def _add_appointment(self, doctor, day, clock, status="Aktif Randevu"):
+        self.appointments.append({
+            "id": uuid.uuid4().hex[:10],
+            "doctor_id": doctor["id"],
+            "date": day,
+            "time": clock,
+            "status": status,
+            "hospital": doctor["hospital"],
+            "department": doctor["department"],
+            "clinic": doctor["clinic"],
+            "doctor": doctor["name"],
+        })
+
+    def _free(self, appointment):
+        slots = self.doctors[appointment["doctor_id"]]["slots"].setdefault(appointment["date"], [])
+        slots.append(appointment["time"])
+        slots.sort()
+        self.appointments.remove(appointment)
+
+    def authorized(self, token):
+        issued = self.tokens.get(token)
+        if issued is None:
+            return False
+        return not self.session_ttl or time.time() - issued < self.session_ttl
+
+    def handle(self, action, body, token):
+        """Returns (http status, payload) for one API call."""
+        with self.lock:
+            self.calls[action] = self.calls.get(action, 0) + 1
+            if action == "login":
+                token = uuid.uuid4().hex
+                self.tokens[token] = time.time()
+                return 200, {"token": token}
+            if action == "stats":
+                return 200, {"calls": dict(self.calls), "appointments": len(self.appointments)}
+            if not self.authorized(token):
+                return 401, {"error": {"code": "AUTH401", "message": "Oturumunuz sonlanmıştır, lütfen tekrar giriş yapınız."}}
+            handler = getattr(self, f"_{action}", None)
+            if handler is None:
+                return 404, {"error": {"code": "MOCK404", "message": f"Unknown action {action}"}}
+            return 200, handler(body)
+
+    def _options(self, body):
+        parents = body.get("parents", [])
+        level = body["level"]
+        if level == "cities":
+            return {"options": list(CITIES)}
+        if level == "districts":
+            return {"options": CITIES.get(parents[0], [])}
+        if level == "clinics":
+            return {"options": CLINICS}
+        return {"options": hospitals_of(parents[1]) if len(parents) > 1 else []}
+
+    def _search(self, body):
+        ids = self.searches.get((body.get("city"), body.get("district"), body.get("clinic"), body.get("hospital")), [])
+        doctors = []
+        today = date.today()
+        for doctor_id in ids:
+            doctor = self.doctors[doctor_id]
+            days = [day for day, clocks in doctor["slots"].items() if clocks]
+            if not days:
+                continue
+            earliest = min(days, key=lambda d: (d[6:], d[3:5], d[:2]))
+            day, month, year = map(int, earliest.split("."))
+            doctors.append({
+                "id": doctor_id,
+                "name": doctor["name"],
+                "earliest": f"{earliest} {min(doctor['slots'][earliest])}",
+                "days_left": f"{(date(year, month, day) - today).days} gün sonra",
+                "hospital": doctor["hospital"],
+                "department": doctor["department"],
+                "clinic": doctor["clinic"],
+            })
+        if not doctors:
+            return {"error": {"code": "RND4030", "message": RND4030}}
+        return {"doctors": doctors}
+
+    def _dates(self, body):
+        doctor = self.doctors[body["doctor"]]
+        return {"dates": [day for day, clocks in doctor["slots"].items() if clocks]}
+
+    def _slots(self, body):
+        hours = {}
+        for clock in sorted(self.doctors[body["doctor"]]["slots"].get(body["date"], [])):
+            hours.setdefault(f"{clock[:2]}:00", []).append(clock)
+        return {"hours": [{"hour": hour, "slots": slots} for hour, slots in hours.items()]}
+
+    def _book(self, body):
+        doctor = self.doctors[body["doctor"]]
+        slots = doctor["slots"].get(body["date"], [])
+        if body["time"] not in slots:
+            return {"error": {"code": "RND4010", "message": RND4010}}
+        same_clinic = [a for a in self.appointments if a["department"] == doctor["department"]]
+        if same_clinic and not body.get("force"):
+            return {"error": {"code": "RND5015", "message": RND5015}}
+        for appointment in same_clinic:
+            self._free(appointment)
+        slots.remove(body["time"])
+        self._add_appointment(doctor, body["date"], body["time"])
+        return {"code": "RND5036", "message": RND5036}
+
+    def _appointments(self, body):
+        return {"appointments": self.appointments}
+
+    def _cancel(self, body):
+        for appointment in self.appointments:
+            if appointment["id"] == body["id"]:
+                self._free(appointment)
+                return {"message": "Randevunuz iptal edilmiştir."}
+        return {"error": {"code": "RND1001", "message": "RND1001 Randevu bulunamadı."}}
+
+    def _revert(self, body):
+        for appointment in self.appointments:
+            if appointment["id"] == body["id"] and appointment["status"] == "Geri Alınabilir Randevu":
+                self._free(appointment)
+                return {"message": "Randevu değişikliğiniz geri alınmıştır."}
+        return {"error": {"code": "RND1002", "message": "RND1002 Geri alınabilir randevu bulunamadı."}}
+
+class SpaHandler(BaseHTTPRequestHandler):
+    mhrs = None
+    config = {}
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self, action):
+        latency = self.config["latency"].get(action, self.config["latency"]["default"])
+        delay = max(0, latency + random.uniform(-1, 1) * self.config["jitter"]) / 1000
+        if delay:
+            time.sleep(delay)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/":
+            self.send_response(302)
+            self.send_header("Location", f"{APP_PREFIX}/")
+            self.end_headers()
+            return
+        if path in (APP_PREFIX, f"{APP_PREFIX}/", f"{APP_PREFIX}/index.html"):
+            with open(os.path.join(SPA_DIR, "index.html"), encoding="utf-8") as f:
+                page = f.read().replace("/*MOCK_CONFIG*/", f"window.MOCK_CONFIG = {json.dumps(self.config)};")
+            self._send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+            return
+        name = os.path.basename(path)
+        if path.startswith(f"{APP_PREFIX}/") and os.path.isfile(os.path.join(SPA_DIR, name)):
+            with open(os.path.join(SPA_DIR, name), "rb") as f:
+                content_type = "application/javascript" if name.endswith(".js") else "text/css"
+                self._send(200, f.read(), f"{content_type}; charset=utf-8")
+            return
+        self._send(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        if not self.path.startswith(API_PREFIX):
+            self._send(404, b"not found", "text/plain")
+            return
+        action = self.path[len(API_PREFIX):].split("?")[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        if action == "reset":
+            self.mhrs.reset()
+            status, payload = 200, {"reset": True}
+        else:
+            self._delay(action)
+            token = (self.headers.get("Authorization") or "").replace("Bearer ", "")
+            status, payload = self.mhrs.handle(action, body, token)
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def log_message(self, format, *args):
+        pass
+
+def parse_latencies(specs):
+    """["search=1500", "book=800"] -> {"search": 1500, "book": 800}"""
+    latencies = {}
+    for spec in specs or []:
+        action, _, ms = spec.partition("=")
+        latencies[action.strip()] = float(ms)
+    return latencies
+
+def start_spa_server(host="127.0.0.1", port=0, latency=200, jitter=50, action_latency=None, seed=1, days=14, doctors=4, session_ttl=0):
+    """
+    Starts the server on a background thread and returns it; server.server_port has the port
+    and server.mhrs the fixture state. Latencies are in milliseconds, `action_latency`
+    overrides them per API action (login, options, search, dates, slots, book, ...).
+    """
+    config = {"latency": dict({"default": latency}, **(action_latency or {})), "jitter": jitter}
+    mhrs = MockMhrs(seed=seed, days=days, doctors=doctors, session_ttl=session_ttl)
+    handler = type("ConfiguredSpaHandler", (SpaHandler,), {"mhrs": mhrs, "config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.mhrs = mhrs
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local mock of the MHRS web app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=200, help="milliseconds added to every API call")
+    parser.add_argument("--jitter", type=float, default=50, help="± milliseconds of random latency on top")
+    parser.add_argument("--action-latency", action="append", metavar="ACTION=MS", help="latency of one API action, e.g. search=1500")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=14, help="working days doctors can have slots on")
+    parser.add_argument("--doctors", type=int, default=4, help="most doctors per search")
+    parser.add_argument("--session-ttl", type=float, default=0, help="seconds a login stays valid, 0 for ever")
+    args = parser.parse_args()
+
+    server = start_spa_server(args.host, args.port, args.latency, args.jitter, parse_latencies(args.action_latency), args.seed, args.days, args.doctors, args.session_ttl)
+    print(f"Serving the mock MHRS app on http://{args.host}:{server.server_port}{APP_PREFIX}/#/")
+    threading.Event().wait()
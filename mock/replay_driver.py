@@ -0,0 +1,170 @@
+"""
+WebDriver stand-in that serves a recorded browser session from memory.
+
+Record a session once with MHRS_DRIVER_RECORD_DIR=<dir> (against the real site or the mock
+app of mhrs_spa_server.py); every browser session then writes <dir>/driver-<id>.jsonl. A
+ReplayDriver built from such a file answers find_element(s), .text, .click(), scripts and
+waits with the recorded responses, without a browser, so the services can be run thousands
+of times per second and their WebDriver round trips counted:
+
+    client = replay_client("<dir>/driver-<id>.jsonl", call="appointment_check_doctor_tool")
+    with BrowserPool().bind(client):
+        query_available_doctors("İZMİR", "URLA", "CİLDİYE", "URLA")
+    print(client.driver.command_count, client.driver.commands, client.driver.step_commands)
+
+Commands are matched on their name and parameters (scripts on the name of the constant
+holding them, without their timing arguments, see driver_recorder.command_key), and each
+one gets the next response recorded for it. The polls of a wait that came back empty
+before the wait succeeded are dropped, so replayed waits succeed on their first poll. A
+command that was never recorded raises ReplayMiss: the code sends a round trip it did not
+send when the session was recorded.
+"""
+from collections import Counter, defaultdict
+import json
+import os
+import sys
+import time
+
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.remote.webdriver import WebDriver
+
+# Add the project root to the path to fix imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.clients.driver_recorder import command_key, recorded_params
+from utils.tracing import tracer
+
+# Longest command sequence (e.g. find + isDisplayed + isEnabled of a clickability wait) that
+# is recognised as one poll of a wait when it repeats back to back
+MAX_POLL_LENGTH = 4
+# Commands answered without a recording: the session itself and driver settings, which a
+# recorded call may not contain when the session had them set before the call started
+SESSION_COMMANDS = {"newSession": {"sessionId": "replay", "capabilities": {"browserName": "replay"}}, "quit": None, "setTimeouts": None}
+
+class ReplayMiss(Exception):
+    pass
+
+def load_calls(path):
+    """Returns the recorded tool calls of a recording: [{"call", "call_id", "at", "monotonic", "nav_state", "commands": [...]}]."""
+    calls = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "command" in record:
+                calls[record["call_id"]]["commands"].append(record)
+            else:
+                calls[record["call_id"]] = dict(record, commands=[])
+    return list(calls.values())
+
+def collapse_polls(commands):
+    """Drops all but the last repetition of command sequences repeated back to back."""
+    keys = [command_key(c["command"], c["params"]) for c in commands]
+    kept = []
+    i = 0
+    while i < len(commands):
+        for length in range(1, MAX_POLL_LENGTH + 1):
+            if keys[i:i + length] == keys[i + length:i + 2 * length]:
+                i += length
+                break
+        else:
+            kept.append(commands[i])
+            i += 1
+    return kept
+
+class ReplayExecutor:
+    """
+    Command executor answering from a recording; counts the commands it serves, in total and
+    per span (tool call, service step) they were sent in.
+    """
+    def __init__(self, commands):
+        self.responses = defaultdict(list)
+        for record in collapse_polls(commands):
+            self.responses[command_key(record["command"], record["params"])].append(json.dumps(record["response"]))
+        self.served = Counter()
+        self.commands = Counter()
+        self.spans = Counter()
+        self.misses = []
+
+    def execute(self, command, params):
+        if command in SESSION_COMMANDS:
+            return {"value": SESSION_COMMANDS[command]}
+        key = command_key(command, recorded_params(command, params))
+        responses = self.responses.get(key)
+        if not responses:
+            self.misses.append(key)
+            raise ReplayMiss(f"{command} {key[1][:200]} is not in the recording")
+        self.commands[command] += 1
+        span = tracer.current()
+        while span is not None:
+            self.spans[span] += 1
+            span = span.parent
+        # the next recorded response, then the last one again for as long as it is asked for
+        index = min(self.served[key], len(responses) - 1)
+        self.served[key] += 1
+        return json.loads(responses[index])
+
+class ReplayDriver(WebDriver):
+    """A Remote WebDriver whose commands are served by a ReplayExecutor."""
+    def __init__(self, commands):
+        super().__init__(command_executor=ReplayExecutor(commands), options=Options())
+
+    @property
+    def commands(self):
+        return self.command_executor.commands
+
+    @property
+    def command_count(self):
+        return sum(self.command_executor.commands.values())
+
+    @property
+    def step_commands(self):
+        """{span name: the most commands one span of that name sent}, e.g. {"select_city": 4}."""
+        steps = {}
+        for span, count in self.command_executor.spans.items():
+            steps[span.name] = max(count, steps.get(span.name, 0))
+        return steps
+
+    @property
+    def misses(self):
+        return self.command_executor.misses
+
+def find_call(path, call=None, occurrence=0):
+    """The occurrence-th recorded call named `call` (any call when None) in a recording."""
+    calls = [c for c in load_calls(path) if call is None or c["call"] == call]
+    if occurrence >= len(calls):
+        raise ReplayMiss(f"{path} has {len(calls)} recorded {call or 'calls'}")
+    return calls[occurrence]
+
+def replay_client(path, call=None, occurrence=0, recorded_call=None):
+    """
+    A logged-in BrowserClient driving a ReplayDriver over one recorded call, with the
+    nav_state the session had when the call started.
+    """
+    from core.clients.browser_client import BrowserClient
+    from core.clients.session_monitor import SessionAwareWait
+
+    recorded_call = recorded_call or find_call(path, call, occurrence)
+    client = BrowserClient()
+    client.driver = ReplayDriver(recorded_call["commands"])
+    client.wait = SessionAwareWait(client, client.driver, 30)
+    client.mark_logged_in()
+    nav_state = dict(recorded_call["nav_state"] or {})
+    for name in ("form", "search"):
+        if isinstance(nav_state.get(name), list):
+            nav_state[name] = tuple(nav_state[name])
+    if nav_state.get("searched_at") is not None and "monotonic" in recorded_call:
+        # results as old as they were when the call was recorded
+        nav_state["searched_at"] = time.monotonic() - (recorded_call["monotonic"] - nav_state["searched_at"])
+    client.set_nav_state(**nav_state)
+    return client
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List the tool calls in a WebDriver recording")
+    parser.add_argument("recording", help="driver-<id>.jsonl written with MHRS_DRIVER_RECORD_DIR")
+    args = parser.parse_args()
+    for recorded in load_calls(args.recording):
+        commands = collapse_polls(recorded["commands"])
+        print(f"{time.strftime('%H:%M:%S', time.localtime(recorded['at']))} {recorded['call']}: {len(recorded['commands'])} commands, {len(commands)} without repeated polls")
@@ -0,0 +1,42 @@
+"""
+Replays the recorded session in tests/fixtures/budget_recording through
+benchmarks/check_command_budget.py against benchmarks/command_budgets.json.
+
+The recording holds a doctor search, the dates and the hours of one of its doctors and an
+accept_notification_modal_tool call against the mock app's data, so the selector steps of
+user_service (select_city ... select_hospital, the doctor / date / hour reads) are budgeted
+too. When a change to the flows is intended, record it again (see check_command_budget.py)
+and update the budgets with --update; retuned waits and edited scripts replay unchanged.
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.clients.driver_recorder import command_key, recorded_params
+from core.clients.event_waits import PAGE_SCRIPT
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECORDING = os.path.join(ROOT, "tests", "fixtures", "budget_recording")
+CHECK = os.path.join(ROOT, "benchmarks", "check_command_budget.py")
+
+class CommandBudgetTest(unittest.TestCase):
+    def test_recorded_session_stays_within_budget(self):
+        # its own process: the server modules read their settings at import time
+        result = subprocess.run([sys.executable, CHECK, RECORDING], cwd=ROOT, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        for name in ("appointment_check_hours_tool", "select_city", "select_hospital", "fetch_all_available_time_slots_of_a_day"):
+            self.assertIn(name, result.stdout)
+
+    def test_scripts_are_matched_by_name_without_timings(self):
+        def key(slice_ms, settle_ms):
+            params = {"script": PAGE_SCRIPT, "args": [["#randevu-ara-buton"], "click", slice_ms, settle_ms, {"ignore": "", "stale_ms": 10000}]}
+            return command_key("w3cExecuteScriptAsync", recorded_params("w3cExecuteScriptAsync", params))
+
+        self.assertEqual(recorded_params("w3cExecuteScriptAsync", {"script": PAGE_SCRIPT})["script"], "event_waits.PAGE_SCRIPT")
+        self.assertEqual(key(2000, 60), key(850, 150))
+        self.assertNotIn("MutationObserver", key(2000, 60)[1])
+
+if __name__ == "__main__":
+    unittest.main()
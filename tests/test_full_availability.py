@@ -0,0 +1,70 @@
+"""
+Collects the availability of a search whose doctors' pages do not all load: the doctors
+that fail come back without dates (and with the error, when the step raised) instead of
+failing the whole traversal or sweep.
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.clients.browser_pool import BrowserPool
+from core.services import appointment_service, user_service
+from utils.appointment_status import AppointmentStatus
+from utils.selection_status import SelectionStatus
+
+DOCTORS = [{"doctor": "AYŞE YILMAZ"}, {"doctor": "MEHMET KAYA"}, {"doctor": "ELİF DEMİR"}]
+HOURS = [{"main_hour": "09:00", "sub_hours": [{"sub_hour": "09:00"}]}]
+
+class PageClient:
+    # Stands in for a BrowserClient whose page stops loading for one doctor
+    def __init__(self):
+        self.nav_state = {}
+        self.doctor = None
+
+    def wait_loading_screen(self):
+        if self.doctor == "MEHMET KAYA":
+            raise TimeoutError("spinner did not go away")
+
+    def locate(self, name):
+        return "div.tab", []
+
+    def reset_nav_state(self):
+        self.nav_state = {}
+
+class FullAvailabilityTest(unittest.TestCase):
+    def setUp(self):
+        self.client = PageClient()
+        patches = [
+            mock.patch.object(appointment_service, "appointment_doctor_available", return_value={"status": SelectionStatus.SUCCESS, "doctors": DOCTORS}),
+            mock.patch.object(appointment_service, "appointment_doctor_available_dates", side_effect=self.dates),
+            mock.patch.object(appointment_service, "appointment_available_hours_on", return_value=HOURS),
+            mock.patch.object(user_service, "snapshot_texts", return_value=["12.05.2025 Pazartesi"]),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def dates(self, doctor_name):
+        # the real date read, on the page of the doctor just selected
+        self.client.doctor = doctor_name
+        if doctor_name == "ELİF DEMİR":
+            raise RuntimeError("doctor page did not open")
+        return user_service.fetch_available_appointment_dates()
+
+    def test_failing_doctors_are_skipped(self):
+        with BrowserPool().bind(self.client):
+            response = appointment_service._browser_full_availability("İZMİR", "URLA", "CİLDİYE", "URLA", None, None)
+
+        self.assertEqual(response["status"], AppointmentStatus.SUCCESS)
+        by_doctor = {doctor["doctor"]: doctor for doctor in response["data"]}
+        self.assertEqual(list(by_doctor), [d["doctor"] for d in DOCTORS])
+        self.assertEqual(len(by_doctor["AYŞE YILMAZ"]["dates"]), 1)
+        self.assertEqual(by_doctor["AYŞE YILMAZ"]["dates"][0]["hours"], HOURS)
+        self.assertEqual(by_doctor["MEHMET KAYA"]["dates"], [])
+        self.assertEqual(by_doctor["ELİF DEMİR"]["dates"], [])
+        self.assertIn("did not open", by_doctor["ELİF DEMİR"]["error"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,9 @@
+from enum import Enum
+
+class HoldStatus(Enum):
+    PARKING = "PARKING"
+    PARKED = "PARKED"
+    BOOKED = "BOOKED"
+    FAILED = "FAILED"
+    EXPIRED = "EXPIRED"
+    RELEASED = "RELEASED"
\ No newline at end of file
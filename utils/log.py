@@ -0,0 +1,26 @@
+from loguru import logger
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_FILE = os.path.expanduser(os.getenv("MHRS_LOG_FILE", "~/.mhrs-mcp/mhrs.log"))
+LOG_LEVEL = os.getenv("MHRS_LOG_LEVEL", "INFO").upper()
+# Loops over page items (options, buttons, slots) log only this many of them at debug level
+ITEM_SAMPLE = int(os.getenv("MHRS_LOG_ITEM_SAMPLE", "3"))
+
+def configure():
+    """
+    Routes logs to a rotating file and warnings to stderr, both written from a background
+    thread (enqueue=True). Nothing goes to stdout: it carries the MCP stdio protocol.
+    """
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING", enqueue=True, format="{time:HH:mm:ss} | {level} | {name}:{function} - {message}")
+    logger.add(LOG_FILE, level=LOG_LEVEL, enqueue=True, rotation="10 MB", retention=5, encoding="utf-8")
+
+def sampled(index):
+    """Whether the index-th item of a loop gets its own debug line."""
+    return index < ITEM_SAMPLE
+
+configure()
@@ -0,0 +1,143 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from utils.string_utils import fold_for_search
+
+# Scores for the ways a folded query can sit inside a folded name; any substring hit
+# outranks a fuzzy one, so a typo never beats a real match
+EXACT_SCORE = 1.0
+WHOLE_WORDS_SCORE = 0.95
+WORD_PREFIX_SCORE = 0.9
+SUBSTRING_SCORE = 0.8
+FUZZY_WEIGHT = 0.75
+LENGTH_PENALTY = 0.05
+
+# Fuzzy (trigram) matches below this Dice similarity are not ranked at all; fuzzy matches
+# are only ever suggested, never selected
+MIN_FUZZY_SIMILARITY = 0.6
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class NameIndex:
+    """
+    Precomputed search index over a list of names (doctors, hospitals, clinics...).
+
+    Names are folded with `fold_for_search`; exact hits are a dict lookup and other queries
+    only score the names sharing trigrams with them. Ranking prefers exact, whole-word,
+    word-prefix and then inner substring matches, shorter names first, and falls back to
+    trigram similarity for misspellings. Only exact and substring matches are selected (see
+    `matches`); a misspelt name is answered with suggestions, since a near miss like
+    "Mehmet Yılmazoğlu" for "Mehmet Yılmaz" is usually somebody else.
+    """
+    def __init__(self, names):
+        self.names = list(names)
+        self.folded = [fold_for_search(name) for name in self.names]
+        self.exact = {}
+        self.postings = defaultdict(set)
+        self.gram_counts = []
+        for index, folded in enumerate(self.folded):
+            self.exact.setdefault(folded, index)
+            grams = trigrams(f" {folded} ")
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings[gram].add(index)
+
+    def _match_kind(self, query, index):
+        name = self.folded[index]
+        if query not in name:
+            return None
+        if f" {query} " in f" {name} ":
+            return WHOLE_WORDS_SCORE
+        if f" {query}" in f" {name}":
+            return WORD_PREFIX_SCORE
+        return SUBSTRING_SCORE
+
+    def _substring_score(self, query, index):
+        score = self._match_kind(query, index)
+        if score is None:
+            return None
+        return score - LENGTH_PENALTY * (1 - len(query) / len(self.folded[index]))
+
+    def rank(self, query, limit=5, fuzzy=True):
+        """Returns up to `limit` (score, index) pairs, best first."""
+        query = fold_for_search(query)
+        if not query:
+            return []
+        if query in self.exact:
+            return [(EXACT_SCORE, self.exact[query])]
+
+        inner = trigrams(query)
+        if inner:
+            # a name containing the query contains every trigram of it
+            candidates = set.intersection(*(self.postings.get(gram, set()) for gram in inner))
+        else:
+            candidates = range(len(self.names))  # too short for trigrams
+
+        scored = []
+        for index in candidates:
+            score = self._substring_score(query, index)
+            if score is not None:
+                scored.append((score, index))
+
+        if not scored and fuzzy:
+            padded = trigrams(f" {query} ")
+            overlaps = defaultdict(int)
+            for gram in padded:
+                for index in self.postings.get(gram, ()):
+                    overlaps[index] += 1
+            for index, overlap in overlaps.items():
+                similarity = 2 * overlap / (len(padded) + self.gram_counts[index])
+                if similarity >= MIN_FUZZY_SIMILARITY:
+                    scored.append((FUZZY_WEIGHT * similarity, index))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+    def matches(self, query):
+        """
+        Indexes of the names query may select, best first: the exact hit, else every name
+        containing query in the best way any name does (whole words, word prefix, inside).
+        More than one index means query is ambiguous.
+        """
+        ranked = self.rank(query, limit=len(self.names), fuzzy=False)
+        if not ranked or ranked[0][0] == EXACT_SCORE:
+            return [index for _, index in ranked]
+        folded = fold_for_search(query)
+        kind = self._match_kind(folded, ranked[0][1])
+        return [index for _, index in ranked if self._match_kind(folded, index) == kind]
+
+    def best(self, query):
+        """Index of the one name query selects, or None when it matches none or several."""
+        matches = self.matches(query)
+        return matches[0] if len(matches) == 1 else None
+
+    def candidates(self, query, limit=5):
+        """(ambiguous, names) to show when best() is None: the names matching equally well, or suggestions."""
+        matches = self.matches(query)
+        if len(matches) > 1:
+            return True, [self.names[index] for index in matches[:limit]]
+        return False, self.suggestions(query, limit)
+
+    def suggestions(self, query, limit=5):
+        # looser than best(): anything sharing trigrams is worth showing to the user
+        query_grams = trigrams(f" {fold_for_search(query)} ")
+        overlaps = defaultdict(int)
+        for gram in query_grams:
+            for index in self.postings.get(gram, ()):
+                overlaps[index] += 1
+        ranked = sorted(overlaps, key=lambda index: (-2 * overlaps[index] / (len(query_grams) + self.gram_counts[index]), index))
+        return [self.names[index] for index in ranked[:limit]]
+
+@lru_cache(maxsize=256)
+def _cached_index(names):
+    return NameIndex(names)
+
+def name_index(names):
+    """Shared NameIndex for a list of names, built once per distinct list."""
+    return _cached_index(tuple(names))
+
+def no_match(status, names, query):
+    """Response for a query that selects none of names: status plus the candidates to choose from."""
+    ambiguous, candidates = name_index(names).candidates(query)
+    return {"status": status, "ambiguous": ambiguous, "suggestions": candidates}
@@ -3,4 +3,6 @@ from enum import Enum
 class Status(Enum):
     SUCCESS = "SUCCESS"
     FAILURE = "FAILURE"
-    SHOW_MESSAGE = "SHOW_MESSAGE"
\ No newline at end of file
+    SHOW_MESSAGE = "SHOW_MESSAGE"
+    TIMEOUT = "TIMEOUT"
+    CANCELLED = "CANCELLED"
\ No newline at end of file
@@ -1,4 +1,5 @@
 import re
+import unicodedata
 
 def normalize_string_to_lower(string):
     return string.strip().replace("İ","i").lower()
@@ -19,4 +20,21 @@ def normalize_to_hour_format(time_str):
 
 def normalize_date_format(date_str):
     parts = re.split(r'[-/.:]', date_str.strip())
-    return f"{parts[0]}.{parts[1]}.{parts[2]}"
\ No newline at end of file
+    return f"{parts[0]}.{parts[1]}.{parts[2]}"
+
+TURKISH_UPPER_TO_LOWER = str.maketrans({"İ": "i", "I": "ı"})
+TURKISH_TO_ASCII = str.maketrans({"ı": "i", "ğ": "g", "ü": "u", "ş": "s", "ö": "o", "ç": "c", "â": "a", "î": "i", "û": "u"})
+
+def turkish_casefold(string):
+    # İ -> i and I -> ı before lower(), which would otherwise give "i̇" and "i"
+    return string.translate(TURKISH_UPPER_TO_LOWER).lower()
+
+def fold_for_search(string):
+    """
+    Folds a name to the form used for matching: Turkish casefolding, then ASCII folding
+    (ı/i, ş/s, ğ/g... become equal, so "ISPARTA", "ıspartA" and "İSPARTA" all give "isparta"),
+    with punctuation turned into single spaces.
+    """
+    folded = unicodedata.normalize("NFKD", turkish_casefold(string).translate(TURKISH_TO_ASCII))
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", folded).split())
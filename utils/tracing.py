@@ -0,0 +1,180 @@
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import functools
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from utils.log import logger
+
+load_dotenv()
+
+METRICS_FILE = os.path.expanduser(os.getenv("MHRS_METRICS_FILE", "~/.mhrs-mcp/metrics.json"))
+METRICS_WRITE_INTERVAL = float(os.getenv("MHRS_METRICS_WRITE_INTERVAL", "10"))
+RECENT_TRACES = 50
+SAMPLES_PER_STEP = 1000
+
+# Exceptions that mean a step ran out of time rather than failed
+TIMEOUT_ERRORS = ("TimeoutException", "TimeoutError", "BrowserPoolTimeout", "ClickTimeout")
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class Span:
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs or {}
+        self.children = []
+        self.counters = {}
+        self.status = "ok"
+        self.started_at = time.time()
+        self.started = time.monotonic()
+        self.duration = None
+
+    def count(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def to_dict(self):
+        span = {
+            "name": self.name,
+            "started_at": self.started_at,
+            "ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+            "status": self.status,
+        }
+        if self.attrs:
+            span["attrs"] = self.attrs
+        if self.counters:
+            span["counters"] = self.counters
+        if self.children:
+            span["children"] = [child.to_dict() for child in list(self.children)]
+        return span
+
+class Tracer:
+    """
+    Nested timing spans for tool calls, service steps and browser waits / clicks.
+
+    Spans nest through a per-thread stack; work handed to other threads keeps its parent when
+    the callable is wrapped with `bind`. Finished spans feed per-step metrics (p50/p95/p99,
+    error, timeout and retry counts) that are written to METRICS_FILE, and finished root spans
+    are kept as the recent traces.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Tracer, cls).__new__(cls)
+            cls._instance.local = threading.local()
+            cls._instance.lock = threading.Lock()
+            cls._instance.traces = deque(maxlen=RECENT_TRACES)
+            cls._instance.durations = defaultdict(lambda: deque(maxlen=SAMPLES_PER_STEP))
+            cls._instance.totals = defaultdict(lambda: defaultdict(int))
+            cls._instance.last_write = 0
+        return cls._instance
+
+    def current(self):
+        stack = getattr(self.local, "stack", None)
+        return stack[-1] if stack else getattr(self.local, "parent", None)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        parent = self.current()
+        span = Span(name, parent, attrs)
+        if parent is not None:
+            with self.lock:
+                parent.children.append(span)
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "timeout" if type(e).__name__ in TIMEOUT_ERRORS else "error"
+            span.attrs.setdefault("error", f"{type(e).__name__}: {e}"[:200])
+            raise
+        finally:
+            span.duration = time.monotonic() - span.started
+            stack.pop()
+            self._finish(span)
+
+    def count(self, counter, amount=1):
+        """Adds to a counter (e.g. retries) of the innermost open span, if any."""
+        span = self.current()
+        if span is not None:
+            span.count(counter, amount)
+
+    def bind(self, func):
+        """Wraps func so that, run on another thread, its spans nest under the current span."""
+        parent = self.current()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            previous = getattr(self.local, "parent", None)
+            self.local.parent = parent
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.local.parent = previous
+        return wrapper
+
+    def _finish(self, span):
+        with self.lock:
+            self.durations[span.name].append(span.duration)
+            totals = self.totals[span.name]
+            totals["count"] += 1
+            if span.status != "ok":
+                totals[span.status + "s"] += 1
+            for counter, amount in span.counters.items():
+                totals[counter] += amount
+            if span.parent is None:
+                self.traces.append(span)
+            write = span.parent is None and time.monotonic() - self.last_write > METRICS_WRITE_INTERVAL
+            if write:
+                self.last_write = time.monotonic()
+        if write:
+            self.write_metrics()
+
+    def metrics(self):
+        with self.lock:
+            steps = {}
+            for name, samples in self.durations.items():
+                values = sorted(samples)
+                steps[name] = dict(self.totals[name], **{
+                    "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                    "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                    "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                    "max_ms": round(values[-1] * 1000, 1) if values else 0,
+                })
+            return {"updated_at": time.time(), "steps": steps}
+
+    def recent_traces(self, limit=10):
+        with self.lock:
+            traces = list(self.traces)[-limit:]
+        return [trace.to_dict() for trace in reversed(traces)]
+
+    def write_metrics(self):
+        try:
+            os.makedirs(os.path.dirname(METRICS_FILE), exist_ok=True)
+            tmp_path = f"{METRICS_FILE}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.metrics(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, METRICS_FILE)
+        except OSError as e:
+            logger.warning("Could not write metrics file: {}", e)
+
+tracer = Tracer()
+
+def traced(name=None):
+    """Decorator running the function inside a span named after it (or `name`)."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,8 @@
+from enum import Enum
+
+class WatchStatus(Enum):
+    ACTIVE = "ACTIVE"
+    MATCHED = "MATCHED"
+    BOOKING = "BOOKING"  # an auto-book watch is booking its match right now
+    BOOKED = "BOOKED"
+    CANCELLED = "CANCELLED"
\ No newline at end of file